@@ -0,0 +1,132 @@
+import typing
+
+import numpy as np
+import numpy.typing as npt
+from soso import state
+from soso.state import scheduling
+
+StateT = typing.TypeVar("StateT")
+
+Points = typing.Dict[str, npt.NDArray[typing.Any]]
+
+
+class TraceSink(typing.Protocol):
+    def extend(self, points: Points) -> None:
+        """Append points, e.g., {'x': [...], 'y': [...]}"""
+        ...
+
+    def reset(self, points: Points) -> None:
+        """Replace all points"""
+        ...
+
+
+class ColumnBinding(typing.Generic[StateT]):
+    """Push the points appended to columns of a model to a sink.
+
+    Only the appended points are pushed, at most once per scheduler flush
+    (e.g., per frame), so the cost of a tick does not depend on how much
+    history the columns hold. Any other change resets the sink from the
+    current columns.
+    """
+
+    def __init__(self, model: state.protocols.Model[StateT],
+                 columns: typing.Mapping[str, typing.Callable[[StateT], typing.Any]],
+                 sink: TraceSink, scheduler: scheduling.Scheduler) -> None:
+        self.__model = model
+        self.__columns = dict(columns)
+        self.__sink = sink
+        self.__scheduler = scheduler
+        # Points the sink has for each column and changes since then
+        self.__lengths = {name: 0 for name in columns}
+        self.__pending: typing.Dict[str, typing.List[state.ListChange]] = {
+            name: [] for name in columns
+        }
+        self.__subscriptions = state.SubscriptionGroup()
+        with self.__subscriptions.collect():
+            for name, column in columns.items():
+                model.observe_list_changes(column, self.__on_changes(name))
+
+    def close(self) -> None:
+        self.__subscriptions.close()
+
+    def __on_changes(
+            self, name: str) -> typing.Callable[[typing.List[state.ListChange]], None]:
+        def on_changes(changes: typing.List[state.ListChange]) -> None:
+            self.__pending[name].extend(changes)
+            self.__scheduler.call(self, self.__flush, None)
+
+        return on_changes
+
+    def __flush(self, _: None) -> None:
+        pending = self.__pending
+        self.__pending = {name: [] for name in pending}
+        appended: Points = {}
+        for name, changes in pending.items():
+            length = self.__lengths[name]
+            for change in changes:
+                if change.removed or change.start != length:
+                    self.__reset()
+                    return
+                length += len(change.inserted)
+            if changes:
+                appended[name] = np.concatenate([np.asarray(c.inserted) for c in changes])
+            self.__lengths[name] = length
+        if appended:
+            self.__sink.extend(appended)
+
+    def __reset(self) -> None:
+        current = self.__model.state
+        points = {name: np.asarray(column(current)) for name, column in self.__columns.items()}
+        self.__lengths = {name: len(values) for name, values in points.items()}
+        self.__sink.reset(points)
+
+
+class PlotlyTrace:
+    """Sink for a trace of a plotly FigureWidget.
+
+    FigureWidget has no message to extend a trace in the browser, so each
+    flush sends the trace's points at once. Only the latest max_points are
+    kept, in buffers with room for twice as many, so that a flush costs at
+    most max_points however long the trace has been running.
+    """
+
+    def __init__(self, figure: typing.Any, index: int = 0, max_points: int = 1000) -> None:
+        if max_points <= 0:
+            raise ValueError(f"max_points must be positive, got {max_points}")
+        self.__figure = figure
+        self.__index = index
+        self.__max_points = max_points
+        self.__buffers: Points = {}
+        self.__lengths: typing.Dict[str, int] = {}
+
+    def extend(self, points: Points) -> None:
+        self.__update({name: self.__append(name, values) for name, values in points.items()})
+
+    def reset(self, points: Points) -> None:
+        for name in points:
+            self.__lengths[name] = 0
+        self.extend(points)
+
+    def __append(self, name: str, values: npt.NDArray[typing.Any]) -> npt.NDArray[typing.Any]:
+        values = np.asarray(values)[-self.__max_points:]
+        length = self.__lengths.get(name, 0)
+        buffer = self.__buffers.get(name)
+        if buffer is None or not np.can_cast(values.dtype, buffer.dtype):
+            previous = buffer[:length] if buffer is not None else values[:0]
+            buffer = np.empty(2 * self.__max_points, np.result_type(previous, values))
+            buffer[:length] = previous
+            self.__buffers[name] = buffer
+        if length + len(values) > len(buffer):
+            # Move the points that stay to the front, once every max_points
+            keep = self.__max_points - len(values)
+            buffer[:keep] = buffer[length - keep:length]
+            length = keep
+        buffer[length:length + len(values)] = values
+        length += len(values)
+        self.__lengths[name] = length
+        return buffer[max(0, length - self.__max_points):length]
+
+    def __update(self, points: Points) -> None:
+        # The trace copies the views, so the buffers can be written again
+        with self.__figure.batch_update():
+            self.__figure.data[self.__index].update(points)
@@ -1,3 +1,4 @@
+import asyncio
 import typing
 
 from examples.notebooks.model import Model
@@ -5,9 +6,12 @@ from examples.notebooks.ui import UI
 from IPython.core import display
 
 
-def run() -> typing.Tuple[Model, UI]:
+def run(live: bool = False) -> typing.Tuple[Model, UI]:
     model = Model()
     gui = UI(model)
     display.display(gui)  # type: ignore
+    if live:
+        # Append a bar every second, only new bars are pushed to the chart
+        asyncio.ensure_future(model.run_live())
 
     return model, gui
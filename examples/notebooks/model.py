@@ -1,3 +1,4 @@
+import asyncio
 import datetime as dt
 import math
 import typing
@@ -5,15 +6,16 @@ from dataclasses import dataclass, field
 
 import numpy as np
 from soso import state
+from soso.state.columns import Column
 
 
 @dataclass
 class Bars:
-    date: typing.List[dt.datetime] = field(default_factory=list)
-    open: typing.List[float] = field(default_factory=list)
-    high: typing.List[float] = field(default_factory=list)
-    low: typing.List[float] = field(default_factory=list)
-    close: typing.List[float] = field(default_factory=list)
+    date: Column = field(default_factory=lambda: Column(dtype='datetime64[m]'))
+    open: Column = field(default_factory=Column)
+    high: Column = field(default_factory=Column)
+    low: Column = field(default_factory=Column)
+    close: Column = field(default_factory=Column)
 
 
 @dataclass
@@ -31,12 +33,19 @@ class State:
 class Model(state.Model[State]):
     def __init__(self) -> None:
         super().__init__(State())
-        _init_gbm_generator(self.submodel(lambda x: x.chart.selected_ticker),
-                            self.submodel(lambda x: x.chart.bars))
+        self.__append_bar = _init_gbm_generator(
+            self.submodel(lambda x: x.chart.selected_ticker),
+            self.submodel(lambda x: x.chart.bars))
+
+    async def run_live(self, interval: float = 1.0) -> None:
+        """Append a bar every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            self.__append_bar()
 
 
 def _init_gbm_generator(ticker_model: state.protocols.Model[str],
-                        bars_model: state.protocols.Model[Bars]) -> None:
+                        bars_model: state.protocols.Model[Bars]) -> typing.Callable[[], None]:
     from math import exp, sqrt
     from random import gauss
 
@@ -52,36 +61,46 @@ def _init_gbm_generator(ticker_model: state.protocols.Model[str],
                   sigma * sqrt(1. / 365.) * gauss(mu=0, sigma=1))
         return st
 
+    def generate_bar() -> typing.Tuple[float, float, float, float]:
+        o = h = low = c = np.nan
+        for minute in range(60):
+            value = generate_value()
+            if math.isnan(o):
+                o = value
+            c = value
+            if math.isnan(h):
+                h = value
+            if math.isnan(low):
+                low = value
+            h = max(h, value)
+            low = min(low, value)
+        return round(o, 2), round(h, 2), round(low, 2), round(c, 2)
+
+    def append(bars: Bars, date: np.datetime64) -> None:
+        o, h, low, c = generate_bar()
+        bars.date.append(date)
+        bars.open.append(o)
+        bars.high.append(h)
+        bars.low.append(low)
+        bars.close.append(c)
+
     def generate_data(__ticker: str) -> None:
         # ticker ignored
         nonlocal st
 
         st = float(np.random.randint(50, 150))
         bars = Bars()
-        date = dt.datetime(2020, 1, 1, 9, 30)
+        date = np.datetime64(dt.datetime(2020, 1, 1, 9, 30), 'm')
         for hour in range(24):
-            o = h = low = c = np.nan
-            for minute in range(60):
-                st = generate_value()
-                if math.isnan(o):
-                    o = st
-                c = st
-                if math.isnan(h):
-                    h = st
-                if math.isnan(low):
-                    low = st
-                h = max(h, st)
-                low = min(low, st)
-            o = round(o, 2)
-            h = round(h, 2)
-            low = round(low, 2)
-            c = round(c, 2)
-            bars.date.append(date)
-            bars.open.append(o)
-            bars.high.append(h)
-            bars.low.append(low)
-            bars.close.append(c)
-            date = date + dt.timedelta(hours=1)
+            append(bars, date)
+            date = date + np.timedelta64(1, 'h')
         bars_model.restore(bars)
 
+    def append_bar() -> None:
+        # Only the new bar is sent to observers of the columns
+        dates = bars_model.state.date
+        date = dates[-1] + np.timedelta64(1, 'h')
+        bars_model.update_state(lambda x: append(x, date))
+
     ticker_model.observe(lambda ticker: generate_data(ticker))
+    return append_bar
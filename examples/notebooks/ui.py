@@ -1,28 +1,39 @@
 import typing
 
 import plotly.graph_objects as go
-from examples.notebooks import model
+from examples.notebooks import bindings, model
 from ipywidgets.widgets import Dropdown, VBox
 from soso import state
+from soso.state import scheduling
 
 
 class Chart(go.FigureWidget):  # type: ignore
     def __init__(self, m: state.protocols.Model[model.Chart],
+                 max_points: int = 1000,
                  **kw: typing.Any) -> None:
         super().__init__(data=go.Ohlc(), **kw)
         self.update(layout_xaxis_rangeslider_visible=False)
-        self.__model = m
-        m.observe_property(lambda x: x.bars, self.__bars_updated)
-
-    def __bars_updated(self, bars: model.Bars) -> None:
-        with self.batch_update():
-            self.update(layout_title=self.__model.state.selected_ticker)
-            data = self.data[0]
-            data.x = bars.date
-            data.open = bars.open
-            data.high = bars.high
-            data.low = bars.low
-            data.close = bars.close
+        # The subscriptions reference the chart until close() disconnects them
+        self.__ticker = m.observe_property(lambda x: x.selected_ticker, self.__ticker_updated)
+        # New bars are pushed once per loop iteration instead of the whole
+        # series on every update
+        self.__binding = bindings.ColumnBinding(
+            m, {
+                'x': lambda x: x.bars.date,
+                'open': lambda x: x.bars.open,
+                'high': lambda x: x.bars.high,
+                'low': lambda x: x.bars.low,
+                'close': lambda x: x.bars.close,
+            }, bindings.PlotlyTrace(self, max_points=max_points),
+            scheduling.AsyncioScheduler())
+
+    def __ticker_updated(self, ticker: str) -> None:
+        self.update(layout_title=ticker)
+
+    def close(self) -> None:
+        self.__ticker.disconnect()
+        self.__binding.close()
+        super().close()
 
 
 def bind_dropdown(  # type: ignore
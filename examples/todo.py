@@ -5,6 +5,7 @@ import typing
 from dataclasses import dataclass, field
 
 from soso import state
+from soso.state import scheduling
 
 """ Simple example of a TODO app in Tk that implements persistence. See
 save/load methods on TodoAppModel """
@@ -33,7 +34,7 @@ class TodoAppModel(state.Model[TodoAppState]):
     def add_todo(self, text: str) -> None:
         assert text
         todo = Todo(description=text)
-        self.update_properties(todos=self.state.todos + [todo])
+        self.update_state(lambda x: x.todos.append(todo))
 
     def save(self, filename: str) -> None:
         with open(filename, 'wb') as f:
@@ -65,19 +66,30 @@ class UI(tk.Frame):
         self.button["command"] = self.__add_todo
         self.button.pack()
 
-        self.listbox_contents = tk.StringVar()
-        self.listbox = tk.Listbox(listvariable=self.listbox_contents)
+        self.listbox = tk.Listbox()
         self.listbox.pack()
 
         self.pack()
 
         x: TodoAppState
-        self.__model.observe_property(lambda x: x.todos, lambda todos: self.__update_listbox(todos))
-
-    def __update_listbox(self, todos: typing.List[Todo]) -> None:
-        t: Todo
-        choices = [t.description for t in todos]
-        self.listbox_contents.set(choices)  # type: ignore
+        # Only the rows that changed are updated, at most once per frame
+        self.__scheduler = scheduling.TkScheduler(self)
+        self.__pending: typing.List[state.ListChange] = []
+        self.__model.observe_list_changes(lambda x: x.todos, self.__on_changes)
+
+    def __on_changes(self, changes: typing.List[state.ListChange]) -> None:
+        # The scheduler only delivers the latest value, so the changes are
+        # collected until then
+        self.__pending.extend(changes)
+        self.__scheduler.call(self, self.__patch_listbox, None)
+
+    def __patch_listbox(self, _: None) -> None:
+        changes, self.__pending = self.__pending, []
+        for change in changes:
+            if change.removed:
+                self.listbox.delete(change.start, change.start + change.removed - 1)
+            if change.inserted:
+                self.listbox.insert(change.start, *[t.description for t in change.inserted])
 
     def __add_todo(self, *a: typing.Any, **kw: typing.Any) -> None:
         txt = self.entry_contents.get()
@@ -1,4 +1,6 @@
 # flake8: noqa
 
+from soso.state.derived import *
 from soso.state.event import *
 from soso.state.state import *
+from soso.state.views import *
@@ -1,4 +1,6 @@
 # Honestly, not sure why I need to do this but this is strictly for mypy
 
+from .derived import *
 from .event import *
 from .state import *
+from .views import *
@@ -0,0 +1,148 @@
+"""Array backed columns, requires numpy.
+
+A Column is a growable one dimensional numpy array for series that mostly
+grow at the end, e.g., prices or bars:
+
+    @dataclass
+    class Bars:
+        close: columns.Column = field(default_factory=columns.Column)
+
+    model.update_state(lambda x: x.close.append(101.5))
+
+Appends are amortized O(1): the buffer doubles in size when it is full.
+Appending, extending and assigning to a slice modify the column in place
+and are reported to Model.observe_list_changes as ListChanges. Copies and
+snapshots copy the buffer in bulk.
+"""
+
+import copy
+import typing
+
+import numpy as np
+import numpy.typing as npt
+
+from soso.state import util
+
+__all__ = ["Column"]
+
+_MIN_CAPACITY = 16
+
+
+class Column:
+    def __init__(self, values: typing.Iterable[typing.Any] = (), dtype: typing.Any = float) -> None:
+        array = _as_array(values, np.dtype(dtype))
+        self.__size = len(array)
+        self.__data: npt.NDArray[typing.Any] = np.empty(
+            max(self.__size, _MIN_CAPACITY), dtype=array.dtype
+        )
+        self.__data[:self.__size] = array
+
+    @property
+    def dtype(self) -> np.dtype[typing.Any]:
+        return self.__data.dtype
+
+    @property
+    def values(self) -> npt.NDArray[typing.Any]:
+        """A read-only view of the items, valid until they are assigned to"""
+        values = self.__data[:self.__size]
+        values.flags.writeable = False
+        return values
+
+    def append(self, value: typing.Any) -> None:
+        if self.__size == len(self.__data):
+            self.__reserve(self.__size + 1)
+        self.__data[self.__size] = value
+        self.__size += 1
+
+    def extend(self, values: typing.Iterable[typing.Any]) -> None:
+        array = _as_array(values, self.__data.dtype)
+        size = self.__size + len(array)
+        if size > len(self.__data):
+            self.__reserve(size)
+        self.__data[self.__size:size] = array
+        self.__size = size
+
+    def __reserve(self, size: int) -> None:
+        data = np.empty(max(size, 2 * len(self.__data)), dtype=self.__data.dtype)
+        data[:self.__size] = self.__data[:self.__size]
+        self.__data = data
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        value = self.__data[:self.__size][key]
+        # Slices are copies like they are for lists
+        return value.copy() if isinstance(key, slice) else value
+
+    def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
+        self.__data[:self.__size][key] = value
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self.values)
+
+    def __array__(
+        self, dtype: typing.Any = None, copy: typing.Optional[bool] = None
+    ) -> npt.NDArray[typing.Any]:
+        values = self.values
+        if dtype is not None and np.dtype(dtype) != values.dtype:
+            return values.astype(dtype)
+        return values.copy() if copy else values
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, Column):
+            other = other.values
+        elif not isinstance(other, (np.ndarray, typing.Sequence)):
+            return NotImplemented
+        try:
+            return len(other) == self.__size and bool(np.array_equal(self.values, other))
+        except (TypeError, ValueError):
+            return False
+
+    def __ne__(self, other: object) -> bool:
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __copy__(self) -> "Column":
+        # Keeps the capacity but only copies the items
+        column = Column.__new__(Column)
+        column.__size = self.__size
+        column.__data = np.empty(len(self.__data), dtype=self.__data.dtype)
+        column.__data[:self.__size] = self.__data[:self.__size]
+        return column
+
+    def __deepcopy__(self, memo: typing.Dict[int, typing.Any]) -> "Column":
+        column = self.__copy__()
+        if column.__data.dtype.hasobject:
+            for i in range(column.__size):
+                column.__data[i] = copy.deepcopy(column.__data[i], memo)
+        return column
+
+    def __reduce__(self) -> typing.Tuple[typing.Any, ...]:
+        return (Column, (self.values.copy(), self.__data.dtype))
+
+    def __repr__(self) -> str:
+        return f"Column({self.values.tolist()!r}, dtype={self.__data.dtype})"
+
+
+def _as_array(
+    values: typing.Iterable[typing.Any], dtype: np.dtype[typing.Any]
+) -> npt.NDArray[typing.Any]:
+    if isinstance(values, Column):
+        values = values.values
+    elif not isinstance(values, (np.ndarray, typing.Sequence)):
+        values = list(values)
+    if dtype.hasobject:
+        # Items may be sequences themselves
+        items = list(values)
+        array = np.empty(len(items), dtype=dtype)
+        for i, item in enumerate(items):
+            array[i] = item
+        return array
+    array = np.asarray(values, dtype=dtype)
+    if array.ndim != 1:
+        raise ValueError("Expected one dimensional values, got shape %s" % (array.shape,))
+    return array
+
+
+util._register_sequence(Column, ("append", "extend"))
@@ -0,0 +1,104 @@
+"""Change comparators.
+
+A comparator takes ``(old, new)`` and returns True if the value should be
+considered changed. Fields choose a comparator through dataclass field
+metadata:
+
+    bars: typing.List[float] = field(default_factory=list,
+                                     metadata=compare.metadata(compare.identity))
+
+Writes are always stored, the comparator only decides whether they are
+emitted. It compares against the current value, so use a change filter
+(``soso.state.filters``) to emit values that drift slowly.
+"""
+
+import math
+import typing
+
+__all__ = [
+    "Comparator",
+    "COMPARATOR",
+    "always",
+    "array_equal",
+    "default",
+    "epsilon",
+    "for_field",
+    "identity",
+    "metadata",
+    "needs_copy",
+]
+
+Comparator = typing.Callable[[typing.Any, typing.Any], bool]
+
+# Key used in dataclass field metadata
+COMPARATOR = "soso.state.comparator"
+
+
+def default(old: typing.Any, new: typing.Any) -> bool:
+    if old is new:
+        return False
+    changed = old != new
+    if changed and isinstance(old, float) and isinstance(new, float):
+        # At least one should not be NaN
+        changed = not math.isnan(old) or not math.isnan(new)
+    return bool(changed)
+
+
+def identity(old: typing.Any, new: typing.Any) -> bool:
+    return old is not new
+
+
+def always(old: typing.Any, new: typing.Any) -> bool:
+    return True
+
+
+def array_equal(old: typing.Any, new: typing.Any) -> bool:
+    import numpy as np
+
+    if old is new:
+        return False
+    return not bool(np.array_equal(old, new))
+
+
+def epsilon(eps: float) -> Comparator:
+    def changed(old: typing.Any, new: typing.Any) -> bool:
+        if old is new:
+            return False
+        try:
+            if math.isnan(old) or math.isnan(new):
+                return default(old, new)
+            return bool(abs(old - new) > eps)
+        except TypeError:
+            return default(old, new)
+
+    return changed
+
+
+def metadata(comparator: Comparator) -> typing.Dict[str, typing.Any]:
+    return {COMPARATOR: comparator}
+
+
+_cache: typing.Dict[typing.Tuple[type, str], Comparator] = {}
+
+
+def for_field(owner: typing.Any, name: typing.Any) -> Comparator:
+    """The comparator declared for ``owner.name``, or ``default``"""
+    klass = type(owner)
+    try:
+        return _cache[(klass, name)]
+    except KeyError:
+        pass
+    except TypeError:
+        # unhashable key
+        return default
+    comparator = default
+    dc_fields = getattr(klass, "__dataclass_fields__", None)
+    if dc_fields is not None and name in dc_fields:
+        comparator = dc_fields[name].metadata.get(COMPARATOR, default)
+    _cache[(klass, name)] = comparator
+    return comparator
+
+
+def needs_copy(comparator: Comparator) -> bool:
+    """Whether a previous value must be copied to compare it against later"""
+    return comparator is not identity and comparator is not always
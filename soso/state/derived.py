@@ -0,0 +1,361 @@
+import contextlib
+import heapq
+import itertools
+import threading
+import typing
+import weakref
+from collections.abc import Mapping, Sequence
+from dataclasses import is_dataclass
+
+from soso.state import compare
+from soso.state.event import (
+    Event,
+    EventCallback,
+    EventToken,
+    _DummyLogger,
+    _LoggerInterface,
+    _collect,
+)
+from soso.state.util import GetAttr, GetItem, PropertyOp
+
+__all__ = ["Derived"]
+
+StateT = typing.TypeVar("StateT")
+StateT_co = typing.TypeVar("StateT_co", covariant=True)
+T = typing.TypeVar("T")
+
+# (op type, key) for each op in a path
+_PathKey = typing.Tuple[typing.Tuple[type, typing.Any], ...]
+_Dependencies = typing.Dict[_PathKey, typing.List[PropertyOp]]
+
+
+class _Propagator(typing.Protocol):
+    # Higher ranks are propagated after lower ranks
+    _rank: int
+    _queued: bool
+
+    def _propagate(self) -> None: ...
+
+
+class _Propagation(threading.local):
+    """Pending derived values, propagated once the outermost update completes"""
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.flushing = False
+        self.pending: typing.List[typing.Tuple[int, int, _Propagator]] = []
+        self.counter = itertools.count()
+        # The derived value currently being computed
+        self.computing: typing.Optional["Derived[typing.Any]"] = None
+
+
+_propagation = _Propagation()
+
+
+@contextlib.contextmanager
+def _batch() -> typing.Iterator[None]:
+    """Defer propagation of derived values until the outermost batch exits"""
+    _propagation.depth += 1
+    try:
+        yield
+    finally:
+        _propagation.depth -= 1
+    if _propagation.depth == 0:
+        _flush()
+
+
+def _schedule(node: _Propagator) -> None:
+    if not node._queued:
+        node._queued = True
+        heapq.heappush(_propagation.pending, (node._rank, next(_propagation.counter), node))
+    if _propagation.depth == 0:
+        _flush()
+
+
+def _flush() -> None:
+    if _propagation.flushing:
+        # The outer flush will get to it
+        return
+    _propagation.flushing = True
+    try:
+        pending = _propagation.pending
+        while pending:
+            _, _, node = heapq.heappop(pending)
+            node._queued = False
+            node._propagate()
+    finally:
+        _propagation.flushing = False
+
+
+class _Source(typing.Protocol[StateT_co]):
+    # The parts of protocols.Model needed to derive values
+    @property
+    def state(self) -> StateT_co: ...
+
+    def wait_for_property(self, property: typing.Callable[[StateT_co], T]) -> Event[T]: ...
+
+
+def _path_key(path: typing.List[PropertyOp]) -> _PathKey:
+    return tuple((type(op), op.key) for op in path)
+
+
+def _replay(path: typing.List[PropertyOp]) -> typing.Callable[[typing.Any], typing.Any]:
+    def replay(proxy: typing.Any) -> typing.Any:
+        for op in path:
+            proxy = op.execute_raw(proxy)
+        return proxy
+
+    return replay
+
+
+class _ReadTracker:
+    """Wraps a part of the state and records the paths that are read.
+
+    Containers are wrapped so that reading a single element only depends on
+    that element. Using a container as a whole (iterating, len, comparing)
+    depends on the container.
+    """
+
+    __slots__ = ("_tracker_value", "_tracker_path", "_tracker_deps")
+
+    def __init__(
+        self, value: typing.Any, path: typing.List[PropertyOp], deps: _Dependencies
+    ) -> None:
+        object.__setattr__(self, "_tracker_value", value)
+        object.__setattr__(self, "_tracker_path", path)
+        object.__setattr__(self, "_tracker_deps", deps)
+
+    def __getattr__(self, name: str) -> typing.Any:
+        value = getattr(self._tracker_value, name)
+        if callable(value):
+            # A method, e.g., lst.count(), depends on the receiver
+            _record(self)
+            return value
+        return _wrap(value, self._tracker_path + [GetAttr(name)], self._tracker_deps)
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        value = self._tracker_value[key]
+        return _wrap(value, self._tracker_path + [GetItem(key)], self._tracker_deps)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError("Derived values cannot modify the state")
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(_unwrap(self))
+
+    def __len__(self) -> int:
+        return len(_unwrap(self))
+
+    def __contains__(self, item: typing.Any) -> bool:
+        return item in _unwrap(self)
+
+    def __bool__(self) -> bool:
+        return bool(_unwrap(self))
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return bool(_unwrap(self) == _unwrap(other))
+
+    def __ne__(self, other: typing.Any) -> bool:
+        return bool(_unwrap(self) != _unwrap(other))
+
+    def __repr__(self) -> str:
+        return repr(self._tracker_value)
+
+    __hash__ = None  # type: ignore
+
+
+def _record(tracker: _ReadTracker) -> None:
+    path = tracker._tracker_path
+    tracker._tracker_deps[_path_key(path)] = path
+
+
+def _wrap(value: typing.Any, path: typing.List[PropertyOp], deps: _Dependencies) -> typing.Any:
+    if is_dataclass(value) or (
+        isinstance(value, (Mapping, Sequence)) and not isinstance(value, (str, bytes))
+    ):
+        return _ReadTracker(value, path, deps)
+    deps[_path_key(path)] = path
+    return value
+
+
+def _unwrap(value: typing.Any) -> typing.Any:
+    if isinstance(value, _ReadTracker):
+        _record(value)
+        return value._tracker_value
+    return value
+
+
+def _unwrap_result(value: typing.Any) -> typing.Any:
+    if isinstance(value, (tuple, list)):
+        return type(value)(_unwrap(v) for v in value)
+    return _unwrap(value)
+
+
+def _changed(old: typing.Any, new: typing.Any) -> bool:
+    # The same mutable object may have been modified in place
+    if old is new:
+        return is_dataclass(new) or isinstance(new, (list, dict, set))
+    return compare.default(old, new)
+
+
+class Derived(typing.Generic[T]):
+    """A value computed from the state of a model.
+
+    The paths (and other derived values) read by the function are recorded
+    while it runs and it is only recomputed when one of them is emitted.
+    Recomputation is deferred until the update that caused it has finished
+    and is done in dependency order, so each derived value is computed at
+    most once per update and never sees a partially applied update. Use
+    Model.derive to create.
+
+    The model only keeps a derived value alive while it is observed, so an
+    unreferenced one stops being recomputed. close() stops it right away.
+    """
+
+    _logger: typing.ClassVar[_LoggerInterface] = _DummyLogger()
+
+    def __init__(self, model: _Source[StateT], func: typing.Callable[[StateT], T]) -> None:
+        self.__model: _Source[typing.Any] = model
+        self.__func: typing.Callable[[typing.Any], T] = func
+        self.__event: Event[T] = Event("Derived")
+        self.__tokens: typing.Dict[_PathKey, EventToken] = {}
+        self.__upstream: typing.Dict[int, typing.Tuple["Derived[typing.Any]", EventToken]] = {}
+        # Connected to the dependencies instead of a bound method
+        self.__forward = _Forward(self)
+        self.__event._activation = self.__forward.keep_alive
+        weakref.finalize(self, _disconnect, self.__tokens, self.__upstream)
+        self.__reading: typing.Dict[int, "Derived[typing.Any]"] = {}
+        self.__stale = False
+        self.__changed = False
+        self._rank = 1
+        self._queued = False
+        self.__value: T = self.__compute()
+
+    @property
+    def state(self) -> T:
+        computing = _propagation.computing
+        if computing is not None and computing is not self:
+            computing.__read(self)
+        self.__refresh()
+        return self.__value
+
+    def observe(self, callback: EventCallback[T]) -> EventToken:
+        token = self.__event.connect(callback)
+        callback(self.__value)
+        return _collect(token)
+
+    def observe_changes(
+        self, callback: typing.Callable[[typing.Optional[T], T], None]
+    ) -> EventToken:
+        last: typing.Optional[T] = None
+
+        def on_value(value: T) -> None:
+            nonlocal last
+            prev, last = last, value
+            callback(prev, value)
+
+        token = self.__event.connect(on_value)
+        on_value(self.__value)
+        return _collect(token)
+
+    def wait_for(self) -> Event[T]:
+        return self.__event
+
+    def close(self) -> None:
+        """Stop tracking the state, the value is no longer updated"""
+        _disconnect(self.__tokens, self.__upstream)
+        self.__stale = False
+
+    def __compute(self) -> T:
+        deps: _Dependencies = {}
+        self.__reading = {}
+        outer, _propagation.computing = _propagation.computing, self
+        try:
+            value = _unwrap_result(self.__func(_wrap(self.__model.state, [], deps)))
+        finally:
+            _propagation.computing = outer
+        self.__track(deps, self.__reading)
+        return typing.cast(T, value)
+
+    def __read(self, other: "Derived[typing.Any]") -> None:
+        self.__reading[id(other)] = other
+
+    def __track(
+        self, deps: _Dependencies, upstream: typing.Dict[int, "Derived[typing.Any]"]
+    ) -> None:
+        for key in list(self.__tokens):
+            if key not in deps:
+                self.__tokens.pop(key).disconnect()
+        for key, path in deps.items():
+            if key not in self.__tokens:
+                event = self.__model.wait_for_property(_replay(path))
+                self.__tokens[key] = event.connect(self.__forward)
+
+        for ident in list(self.__upstream):
+            if ident not in upstream:
+                self.__upstream.pop(ident)[1].disconnect()
+        for ident, other in upstream.items():
+            if ident not in self.__upstream:
+                self.__upstream[ident] = (other, other.__event.connect(self.__forward))
+        self._rank = 1 + max((other._rank for other in upstream.values()), default=0)
+
+    def _on_dependency(self) -> None:
+        self.__stale = True
+        _schedule(self)
+
+    def __refresh(self) -> None:
+        if not self.__stale:
+            return
+        self.__stale = False
+        try:
+            value = self.__compute()
+        except Exception:
+            self._logger.debug("Exception computing derived value", exc_info=True)
+            return
+        old, self.__value = self.__value, value
+        self.__changed = self.__changed or _changed(old, value)
+
+    def _propagate(self) -> None:
+        self.__refresh()
+        if self.__changed:
+            self.__changed = False
+            self.__event.emit(self.__value)
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return f"#<Derived state={self.__value}>"
+
+
+class _Forward:
+    """Notifies a derived value of its dependencies.
+
+    Only holds it weakly, unless it is observed.
+    """
+
+    __slots__ = ("__ref", "__observed")
+
+    def __init__(self, derived: Derived[typing.Any]) -> None:
+        self.__ref = weakref.ref(derived)
+        self.__observed: typing.Optional[Derived[typing.Any]] = None
+
+    def keep_alive(self, observed: bool) -> None:
+        self.__observed = self.__ref() if observed else None
+
+    def __call__(self, __value: typing.Any) -> None:
+        derived = self.__ref()
+        if derived is not None:
+            derived._on_dependency()
+
+
+def _disconnect(
+    tokens: typing.Dict[_PathKey, EventToken],
+    upstream: typing.Dict[int, typing.Tuple[Derived[typing.Any], EventToken]],
+) -> None:
+    for token in tokens.values():
+        token.disconnect()
+    tokens.clear()
+    for _, token in upstream.values():
+        token.disconnect()
+    upstream.clear()
@@ -1,13 +1,25 @@
 import asyncio
+import contextlib
+import contextvars
 import datetime as dt
+import enum
+import functools
+import inspect
 import logging
+import math
+import threading
 import typing
 import weakref
+from collections import deque
 
 T = typing.TypeVar("T")
 T_contra = typing.TypeVar("T_contra", contravariant=True)
 
-__all__ = ["Event", "EventToken"]
+__all__ = ["Event", "EventStream", "EventToken", "Overflow", "SubscriptionGroup"]
+
+# Serializes changes to handler lists across threads. Reentrant because
+# EventToken.__del__ can run while it is held.
+_handlers_lock = threading.RLock()
 
 
 class EventCallback(typing.Generic[T_contra], typing.Protocol):
@@ -38,10 +50,31 @@ class _DummyLogger:
         pass
 
 
+class Overflow(enum.Enum):
+    # Wait for the consumer. Only possible when emitting from another thread
+    # than the one consuming the stream, otherwise the value is dropped.
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    # Only keep the latest value, regardless of maxsize
+    CONFLATE = "conflate"
+
+
 class Event(typing.Generic[T]):
     def __init__(self, name: str, *arg_types: type, **kwarg_types: type):
         self._name = name
-        self._handlers: typing.List[typing.Tuple["EventToken", EventCallback[T]]] = []
+        # Disconnected handlers are replaced with None and removed once
+        # enough of them accumulate, outside of emission
+        self._handlers: typing.List[
+            typing.Optional[typing.Tuple["EventToken", EventCallback[T]]]
+        ] = []
+        self._index: typing.Dict["EventToken", int] = {}
+        self._emitting = 0
+        # Future shared by everything awaiting the next emission
+        self._broadcast: typing.Optional[asyncio.Future[T]] = None
+        # Called with True when the first handler is connected and with
+        # False when the last one is disconnected
+        self._activation: typing.Optional[typing.Callable[[bool], None]] = None
 
     _logger: typing.ClassVar[_LoggerInterface] = _DummyLogger()
 
@@ -52,58 +85,126 @@ class Event(typing.Generic[T]):
 
     def __call__(self, __value: T) -> None:
         self._logger.debug("EMITTING: %s", self._name)
-        for _, f in self._handlers:
-            try:
-                f(__value)
-            except Exception as e:
-                self._logger.error("Exception occurred when emitting event")
-                self._logger.exception(e)
+        self._emitting += 1
+        try:
+            # Handlers connected during emission are called as well
+            for handler in self._handlers:
+                if handler is None:
+                    continue
+                try:
+                    handler[1](__value)
+                except Exception as e:
+                    self._logger.error("Exception occurred when emitting event")
+                    self._logger.exception(e)
+        finally:
+            self._emitting -= 1
+        if self._emitting == 0:
+            self._compact_if_sparse()
 
     def emit(self, __value: T) -> None:
         self(__value)
 
-    def connect(self, f: EventCallback[T]) -> "EventToken":
+    def connect(self, f: EventCallback[T], weak: bool = False) -> "EventToken":
+        """
+        If weak is True, only a weak reference to f (or to the object of a
+        bound method) is kept and it is disconnected once f is garbage
+        collected.
+        """
+        weak_f = _WeakCallback(f) if weak else None
         token = self._new_token()
-        self._handlers.append((token, f))
+        with _handlers_lock:
+            self._index[token] = len(self._handlers)
+            self._handlers.append((token, weak_f or f))
+            if len(self._index) == 1 and self._activation is not None:
+                self._activation(True)
+        if weak_f is not None:
+            weak_f.token = token
         return token
 
     def disconnect_token(self, token: "EventToken") -> None:
-        for i in range(len(self._handlers)):
-            if id(self._handlers[i][0]) == id(token):
-                # Create a copy of the handlers array just in case this is
-                # happening in an event callback
-                self._handlers = [h for h in self._handlers if id(h[0]) != id(token)]
-                break
+        with _handlers_lock:
+            i = self._index.pop(token, None)
+            if i is None:
+                return
+            self._handlers[i] = None
+            if not self._emitting:
+                self._compact_if_sparse()
+            self._deactivate_if_unused()
+
+    def _disconnect_tokens(self, tokens: typing.Iterable["EventToken"]) -> None:
+        with _handlers_lock:
+            removed = False
+            for token in tokens:
+                i = self._index.pop(token, None)
+                if i is not None:
+                    self._handlers[i] = None
+                    removed = True
+            if not removed:
+                return
+            if not self._emitting:
+                self._compact_if_sparse()
+            self._deactivate_if_unused()
+
+    def _deactivate_if_unused(self) -> None:
+        if not self._index and self._activation is not None:
+            self._activation(False)
+
+    def _compact_if_sparse(self) -> None:
+        # Amortized O(1) per disconnect
+        if len(self._handlers) <= 2 * len(self._index) + 8:
+            return
+        with _handlers_lock:
+            handlers: typing.List[
+                typing.Optional[typing.Tuple["EventToken", EventCallback[T]]]
+            ] = [h for h in self._handlers if h is not None]
+            self._index = {h[0]: i for i, h in enumerate(handlers) if h is not None}
+            self._handlers = handlers
+
+    def _handler_count(self) -> int:
+        return len(self._index)
 
     def _new_token(self) -> "EventToken":
         return EventToken(self)
 
     def __await__(self) -> typing.Generator[None, None, T]:
-        def callback(arg: T) -> None:
-            assert not fut.done()
-            token.disconnect()
-            fut.set_result(arg)
-
-        fut: asyncio.Future[T] = asyncio.Future()
-        token = self.connect(callback)
-        return fut.__await__()
-
-    async def __aiter__(self) -> typing.AsyncGenerator[T, T]:
-        q: asyncio.Queue[T] = asyncio.Queue()
-
-        def callback(arg: T) -> None:
-            q.put_nowait(arg)
-
-        token = self.connect(callback)
-
-        try:
-            while True:
-                value: T = await q.get()
-                yield value
-        finally:
-            token.disconnect()
+        loop = asyncio.get_event_loop()
+        fut = self._broadcast
+        if fut is None or fut.get_loop() is not loop:
+            fut = loop.create_future()
+            token = self.connect(functools.partial(self.__resolve, fut))
+            # Keep the token alive until the future is resolved
+            fut.add_done_callback(lambda _: token.disconnect())
+            if self._broadcast is None:
+                self._broadcast = fut
+        # Shielded so that one cancelled awaiter does not cancel the others
+        return asyncio.shield(fut).__await__()
+
+    def __resolve(self, fut: "asyncio.Future[T]", value: T) -> None:
+        if self._broadcast is fut:
+            self._broadcast = None
+        if not fut.done():
+            fut.set_result(value)
+
+    def __aiter__(self) -> "EventStream[T]":
+        return self.stream()
+
+    def stream(
+        self, maxsize: int = 0, overflow: Overflow = Overflow.DROP_OLDEST
+    ) -> "EventStream[T]":
+        """
+        Iterate over emitted values asynchronously, buffering at most maxsize
+        values (0 is unbounded). overflow decides what happens when the
+        buffer is full, see Overflow.
+        """
+        return EventStream(self, maxsize, overflow)
 
     def sample(self, timer_in: typing.Union["Event[None]", dt.timedelta]) -> "Event[T]":
+        """
+        Emit the latest value, if any, whenever timer_in emits. A timedelta
+        uses a TimerEvent. Like the other operators, the sampled event is
+        only connected (and the timer only runs) while it has handlers.
+        """
+
         class Sentinel:
             pass
 
@@ -128,21 +229,363 @@ class Event(typing.Generic[T]):
                 if to_emit is not None:
                     event.emit(to_emit)
 
-        self.connect(event_callback)
-        timer.connect(timer_callback)
+        def stop() -> None:
+            nonlocal last_value
+            last_value = Sentinel()
+
+        _connect_while_observed(
+            event, lambda: [self.connect(event_callback), timer.connect(timer_callback)], stop
+        )
+        return event
+
+    def throttle(self, interval: dt.timedelta) -> "Event[T]":
+        """
+        Emit at most once per interval. A value arriving within interval of
+        the last emission is delayed until the interval has passed, only
+        the latest delayed value is emitted.
+        """
+        loop = asyncio.get_event_loop()
+        seconds = interval.total_seconds()
+        event: Event[T] = Event(self._name + "::throttle")
+        last_emit = -math.inf
+        pending: typing.Any = _NOTHING
+        handle: typing.Optional[asyncio.TimerHandle] = None
+
+        def on_value(value: T) -> None:
+            nonlocal last_emit, pending, handle
+            now = loop.time()
+            if handle is None and now - last_emit >= seconds:
+                last_emit = now
+                event.emit(value)
+                return
+            pending = value
+            if handle is None:
+                handle = loop.call_at(last_emit + seconds, flush)
+
+        def flush() -> None:
+            nonlocal last_emit, pending, handle
+            handle = None
+            value, pending = pending, _NOTHING
+            if value is not _NOTHING:
+                last_emit = loop.time()
+                event.emit(value)
+
+        def stop() -> None:
+            nonlocal pending, handle
+            if handle is not None:
+                handle.cancel()
+            handle, pending = None, _NOTHING
+
+        _connect_while_observed(event, lambda: [self.connect(on_value)], stop)
+        return event
+
+    def debounce(self, interval: dt.timedelta) -> "Event[T]":
+        """Emit the latest value once no value has arrived for interval"""
+        loop = asyncio.get_event_loop()
+        seconds = interval.total_seconds()
+        event: Event[T] = Event(self._name + "::debounce")
+        last_value_time = 0.0
+        pending: typing.Any = _NOTHING
+        handle: typing.Optional[asyncio.TimerHandle] = None
+
+        def on_value(value: T) -> None:
+            nonlocal last_value_time, pending, handle
+            last_value_time = loop.time()
+            pending = value
+            # Rather than rescheduling on every value, the timer checks
+            # whether it is due when it fires
+            if handle is None:
+                handle = loop.call_at(last_value_time + seconds, fire)
+
+        def fire() -> None:
+            nonlocal pending, handle
+            due = last_value_time + seconds
+            if loop.time() < due:
+                handle = loop.call_at(due, fire)
+                return
+            handle = None
+            value, pending = pending, _NOTHING
+            event.emit(value)
+
+        def stop() -> None:
+            nonlocal pending, handle
+            if handle is not None:
+                handle.cancel()
+            handle, pending = None, _NOTHING
+
+        _connect_while_observed(event, lambda: [self.connect(on_value)], stop)
+        return event
 
+    def conflate(self) -> "Event[T]":
+        """Emit the latest value at most once per iteration of the event loop"""
+        loop = asyncio.get_event_loop()
+        event: Event[T] = Event(self._name + "::conflate")
+        pending: typing.Any = _NOTHING
+        handle: typing.Optional[asyncio.Handle] = None
+
+        def on_value(value: T) -> None:
+            nonlocal pending, handle
+            if pending is _NOTHING:
+                handle = loop.call_soon(flush)
+            pending = value
+
+        def flush() -> None:
+            nonlocal pending, handle
+            value, pending, handle = pending, _NOTHING, None
+            event.emit(value)
+
+        def stop() -> None:
+            nonlocal pending, handle
+            if handle is not None:
+                handle.cancel()
+            handle, pending = None, _NOTHING
+
+        _connect_while_observed(event, lambda: [self.connect(on_value)], stop)
         return event
 
 
+class _Nothing:
+    pass
+
+
+_NOTHING = _Nothing()
+
+
+def _connect_while_observed(
+    event: Event[typing.Any],
+    connect: typing.Callable[[], typing.List["EventToken"]],
+    stop: typing.Callable[[], None],
+) -> None:
+    # Connect the sources of event while it has handlers. The sources keep
+    # event alive meanwhile, so it can be used without keeping a reference.
+    tokens: typing.List[EventToken] = []
+
+    def activation(active: bool) -> None:
+        nonlocal tokens
+        if active:
+            tokens = connect()
+            return
+        disconnected, tokens = tokens, []
+        for token in disconnected:
+            token.disconnect()
+        stop()
+
+    event._activation = activation
+
+
+class _TimerBucket:
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        # Ordered set
+        self.timers: typing.Dict[TimerEvent, None] = {}
+
+
+class _TimerWheel:
+    """Emits every TimerEvent of a loop from a single loop timer.
+
+    Timers with the same interval share a bucket with an absolute deadline,
+    so they do not drift. Timers are in a bucket while they have handlers,
+    and the loop timer is cancelled when there are none.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        # The loop and the loop timer, which references it, are weak since
+        # the wheel is kept in _wheels by loop
+        self.__loop = weakref.ref(loop)
+        self.__buckets: typing.Dict[float, _TimerBucket] = {}
+        self.__handle: typing.Optional["weakref.ref[asyncio.TimerHandle]"] = None
+        self.__next = math.inf
+
+    def add(self, interval: float, timer: "TimerEvent") -> None:
+        loop = self.__loop()
+        if loop is None:
+            return
+        bucket = self.__buckets.get(interval)
+        if bucket is None:
+            bucket = self.__buckets[interval] = _TimerBucket(loop.time() + interval)
+        bucket.timers[timer] = None
+        self.__arm()
+
+    def remove(self, interval: float, timer: "TimerEvent") -> None:
+        bucket = self.__buckets.get(interval)
+        if bucket is None:
+            return
+        bucket.timers.pop(timer, None)
+        if not bucket.timers:
+            del self.__buckets[interval]
+            self.__arm()
+
+    def __arm(self) -> None:
+        deadline = min((b.deadline for b in self.__buckets.values()), default=math.inf)
+        if deadline == self.__next:
+            return
+        handle = self.__handle() if self.__handle is not None else None
+        if handle is not None:
+            handle.cancel()
+        self.__handle = None
+        self.__next = deadline
+        loop = self.__loop()
+        if deadline != math.inf and loop is not None:
+            self.__handle = weakref.ref(loop.call_at(deadline, self.__tick))
+
+    def __tick(self) -> None:
+        self.__handle = None
+        self.__next = math.inf
+        loop = self.__loop()
+        assert loop is not None
+        now = loop.time()
+        for interval, bucket in list(self.__buckets.items()):
+            if bucket.deadline > now:
+                continue
+            # Skip ticks that were missed instead of emitting them in a burst
+            bucket.deadline += interval * (1 + (now - bucket.deadline) // interval)
+            for timer in list(bucket.timers):
+                timer.emit(None)
+        self.__arm()
+
+
+_wheels: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _TimerWheel]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _timer_wheel(loop: asyncio.AbstractEventLoop) -> _TimerWheel:
+    wheel = _wheels.get(loop)
+    if wheel is None:
+        wheel = _wheels[loop] = _TimerWheel(loop)
+    return wheel
+
+
 class TimerEvent(Event[None]):
+    """Emits every interval while it has handlers"""
+
     def __init__(self, name: str, interval: dt.timedelta) -> None:
         super().__init__(name, type(None))
+        self.__wheel = _timer_wheel(asyncio.get_event_loop())
+        self.__interval = interval.total_seconds()
+        self._activation = self.__activate
+
+    def __activate(self, active: bool) -> None:
+        if active:
+            self.__wheel.add(self.__interval, self)
+        else:
+            self.__wheel.remove(self.__interval, self)
+
+
+class EventStream(typing.Generic[T]):
+    """Asynchronous iterator over the values emitted by an event.
+
+    Values are buffered until they are consumed. The number of values that
+    did not fit in the buffer is available as ``dropped``. Disconnects from
+    the event when closed or garbage collected.
+    """
+
+    def __init__(self, event: Event[T], maxsize: int, overflow: Overflow) -> None:
+        self.dropped = 0
+        self.__maxsize = 1 if overflow is Overflow.CONFLATE else maxsize
+        self.__overflow = overflow
+        self.__buffer: typing.Deque[T] = deque()
+        self.__lock = threading.Condition(threading.Lock())
+        # The thread consuming the stream
+        self.__thread = threading.get_ident()
+        self.__loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self.__waiter: typing.Optional[asyncio.Future[None]] = None
+        self.__closed = False
+
+        # The event must not keep the stream alive
+        ref = weakref.ref(self)
+
+        def callback(value: T) -> None:
+            stream = ref()
+            if stream is not None:
+                stream.__put(value)
+
+        self.__token = event.connect(callback)
+        weakref.finalize(self, self.__token.disconnect)
+
+    def __put(self, value: T) -> None:
+        with self.__lock:
+            if self.__closed:
+                return
+            buffer = self.__buffer
+            if self.__maxsize and len(buffer) >= self.__maxsize:
+                overflow = self.__overflow
+                if overflow is Overflow.BLOCK and threading.get_ident() != self.__thread:
+                    while len(buffer) >= self.__maxsize and not self.__closed:
+                        self.__lock.wait()
+                elif overflow is Overflow.DROP_NEWEST or overflow is Overflow.BLOCK:
+                    self.dropped += 1
+                    return
+                else:
+                    buffer.popleft()
+                    self.dropped += 1
+            buffer.append(value)
+            waiter, loop = self.__waiter, self.__loop
+            self.__waiter = None
+        if waiter is not None:
+            assert loop is not None
+            if threading.get_ident() == self.__thread:
+                _wake(waiter)
+            else:
+                loop.call_soon_threadsafe(_wake, waiter)
+
+    def __aiter__(self) -> "EventStream[T]":
+        return self
+
+    async def __anext__(self) -> T:
+        while True:
+            with self.__lock:
+                if self.__closed:
+                    raise StopAsyncIteration()
+                if self.__buffer:
+                    value = self.__buffer.popleft()
+                    self.__lock.notify()
+                    return value
+                self.__loop = loop = asyncio.get_running_loop()
+                self.__thread = threading.get_ident()
+                self.__waiter = waiter = loop.create_future()
+            await waiter
+
+    def __len__(self) -> int:
+        return len(self.__buffer)
+
+    def close(self) -> None:
+        with self.__lock:
+            self.__closed = True
+            self.__buffer.clear()
+            self.__lock.notify_all()
+            waiter, self.__waiter = self.__waiter, None
+        if waiter is not None:
+            _wake(waiter)
+        self.__token.disconnect()
+
+    async def aclose(self) -> None:
+        self.close()
+
+
+def _wake(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _WeakCallback(typing.Generic[T]):
+    def __init__(self, f: EventCallback[T]) -> None:
+        # Disconnected when f dies
+        self.token: typing.Optional["EventToken"] = None
+        self.__ref: typing.Callable[[], typing.Optional[EventCallback[T]]]
+        if inspect.ismethod(f):
+            self.__ref = weakref.WeakMethod(f, self.__on_dead)
+        else:
+            self.__ref = weakref.ref(f, self.__on_dead)
 
-        def callback() -> None:
-            asyncio.get_event_loop().call_later(interval.total_seconds(), callback)
-            self.emit(None)
+    def __call__(self, __value: T) -> None:
+        f = self.__ref()
+        if f is not None:
+            f(__value)
 
-        asyncio.get_event_loop().call_later(interval.total_seconds(), callback)
+    def __on_dead(self, _: typing.Any) -> None:
+        if self.token is not None:
+            self.token.disconnect()
 
 
 class EventToken:
@@ -160,3 +603,85 @@ class EventToken:
 
     def __del__(self) -> None:
         self.disconnect()
+
+
+class _Closeable(typing.Protocol):
+    def close(self) -> None: ...
+
+
+_Subscription = typing.TypeVar("_Subscription", bound=typing.Union[EventToken, _Closeable])
+
+
+class SubscriptionGroup:
+    """Disconnects many subscriptions at once.
+
+    Tokens returned by the observe_* methods of models, submodels and
+    derived values, and the derived values created by Model.derive, are
+    added to the group while it is collecting:
+
+        group = SubscriptionGroup()
+        with group.collect():
+            model.observe_property(lambda x: x.a, ...)
+            model.submodel(lambda x: x.b).observe(...)
+        ...
+        group.close()
+
+    Other tokens, or anything with a close() method, can be added with add().
+    """
+
+    def __init__(self) -> None:
+        self.__tokens: typing.List[EventToken] = []
+        self.__closeables: typing.List[_Closeable] = []
+
+    @contextlib.contextmanager
+    def collect(self) -> typing.Iterator["SubscriptionGroup"]:
+        reset = _current_group.set(self)
+        try:
+            yield self
+        finally:
+            _current_group.reset(reset)
+
+    def add(self, token: _Subscription) -> _Subscription:
+        if isinstance(token, EventToken):
+            self.__tokens.append(token)
+        else:
+            self.__closeables.append(token)
+        return token
+
+    def close(self) -> None:
+        """Disconnect all tokens, removing them from each event in one pass"""
+        closeables, self.__closeables = self.__closeables, []
+        for closeable in closeables:
+            closeable.close()
+        tokens, self.__tokens = self.__tokens, []
+        by_event: typing.Dict[int, typing.Tuple[Event[typing.Any], typing.List[EventToken]]] = {}
+        for token in tokens:
+            ref, token.event = token.event, None
+            event = ref() if ref is not None else None
+            if event is None:
+                continue
+            by_event.setdefault(id(event), (event, []))[1].append(token)
+        for event, event_tokens in by_event.values():
+            event._disconnect_tokens(event_tokens)
+
+    def __len__(self) -> int:
+        return len(self.__tokens) + len(self.__closeables)
+
+    def __enter__(self) -> "SubscriptionGroup":
+        return self
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.close()
+
+
+_current_group: contextvars.ContextVar[typing.Optional[SubscriptionGroup]] = (
+    contextvars.ContextVar("soso.state.subscription_group", default=None)
+)
+
+
+def _collect(token: _Subscription) -> _Subscription:
+    # Add a token returned to the user to the collecting group, if any
+    group = _current_group.get()
+    if group is not None:
+        group.add(token)
+    return token
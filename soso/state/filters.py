@@ -0,0 +1,142 @@
+"""Change filters.
+
+A change filter decides whether a write to a path should be emitted. The
+state is always updated, only the events are suppressed. Filters are
+registered with ``Model.set_property_filter``:
+
+    model.set_property_filter(lambda x: x.sensor_value, filters.absolute_deadband(0.01))
+
+Filters compare against the last *emitted* value so that slow drift is
+eventually emitted.
+"""
+
+import datetime as dt
+import math
+import time
+import typing
+
+__all__ = [
+    "ChangeFilter",
+    "absolute_deadband",
+    "min_interval",
+    "predicate",
+    "relative_deadband",
+]
+
+
+class ChangeFilter(typing.Protocol):
+    def reset(self, value: typing.Any) -> None:
+        """Set the last emitted value without filtering"""
+        ...
+
+    def __call__(self, value: typing.Any) -> bool:
+        """Return True if value should be emitted"""
+        ...
+
+
+class _NotSet:
+    pass
+
+
+_NOT_SET = _NotSet()
+
+
+class _Filter:
+    def __init__(self) -> None:
+        self._last: typing.Any = _NOT_SET
+
+    def reset(self, value: typing.Any) -> None:
+        self._last = value
+
+    def __call__(self, value: typing.Any) -> bool:
+        if self._last is _NOT_SET or self._accept(self._last, value):
+            self._last = value
+            return True
+        return False
+
+    def _accept(self, last: typing.Any, value: typing.Any) -> bool:
+        raise NotImplementedError()
+
+
+def _nan_changed(last: float, value: float) -> typing.Optional[bool]:
+    # None if neither is NaN
+    last_nan = math.isnan(last)
+    value_nan = math.isnan(value)
+    if not last_nan and not value_nan:
+        return None
+    return last_nan != value_nan
+
+
+class _AbsoluteDeadband(_Filter):
+    def __init__(self, threshold: float) -> None:
+        super().__init__()
+        self._threshold = threshold
+
+    def _accept(self, last: typing.Any, value: typing.Any) -> bool:
+        nan = _nan_changed(last, value)
+        if nan is not None:
+            return nan
+        return bool(abs(value - last) > self._threshold)
+
+
+class _RelativeDeadband(_Filter):
+    def __init__(self, fraction: float) -> None:
+        super().__init__()
+        self._fraction = fraction
+
+    def _accept(self, last: typing.Any, value: typing.Any) -> bool:
+        nan = _nan_changed(last, value)
+        if nan is not None:
+            return nan
+        return bool(abs(value - last) > abs(last) * self._fraction)
+
+
+class _MinInterval(_Filter):
+    def __init__(self, interval: dt.timedelta, clock: typing.Callable[[], float]) -> None:
+        super().__init__()
+        self._interval = interval.total_seconds()
+        self._clock = clock
+        self._last_time = -math.inf
+
+    def reset(self, value: typing.Any) -> None:
+        super().reset(value)
+        self._last_time = self._clock()
+
+    def __call__(self, value: typing.Any) -> bool:
+        now = self._clock()
+        if now - self._last_time < self._interval:
+            return False
+        self._last_time = now
+        self._last = value
+        return True
+
+
+class _Predicate(_Filter):
+    def __init__(self, func: typing.Callable[[typing.Any, typing.Any], bool]) -> None:
+        super().__init__()
+        self._func = func
+
+    def _accept(self, last: typing.Any, value: typing.Any) -> bool:
+        return self._func(last, value)
+
+
+def absolute_deadband(threshold: float) -> ChangeFilter:
+    """Emit when the value moved by more than threshold"""
+    return _AbsoluteDeadband(threshold)
+
+
+def relative_deadband(fraction: float) -> ChangeFilter:
+    """Emit when the value moved by more than fraction of the last emitted value"""
+    return _RelativeDeadband(fraction)
+
+
+def min_interval(
+    interval: dt.timedelta, clock: typing.Callable[[], float] = time.monotonic
+) -> ChangeFilter:
+    """Emit at most once per interval. Suppressed values are not emitted later."""
+    return _MinInterval(interval, clock)
+
+
+def predicate(func: typing.Callable[[typing.Any, typing.Any], bool]) -> ChangeFilter:
+    """Emit when func(last_emitted, value) is True"""
+    return _Predicate(func)
@@ -1,11 +1,16 @@
 import typing
 
+from soso.state.derived import Derived
 from soso.state.event import Event, EventCallback, EventToken
+from soso.state.filters import ChangeFilter
+from soso.state.util import ListChange
+from soso.state.views import ReadView
 
 StateT_contra = typing.TypeVar("StateT_contra", contravariant=True)
 StateT = typing.TypeVar("StateT")
 RootStateT = typing.TypeVar("RootStateT")
 T = typing.TypeVar("T")
+K = typing.TypeVar("K")
 T_contra = typing.TypeVar("T_contra", contravariant=True)
 T_co = typing.TypeVar("T_co", covariant=True)
 
@@ -13,17 +18,27 @@ __all__: list[str] = []
 
 PropertyCallback = typing.Callable[[StateT_contra], T_co]
 StateUpdateCallback = typing.Callable[[StateT_contra], None]
+PatternCallback = typing.Callable[[typing.Any, T_contra], None]
 
 
 class Model(typing.Protocol[StateT]):
-    def observe(self, callback: EventCallback[StateT]) -> EventToken: ...
+    def observe(self, callback: EventCallback[StateT], weak: bool = False) -> EventToken: ...
 
     def observe_changes(
         self, callback: typing.Callable[[typing.Optional[StateT], StateT], None]
     ) -> EventToken: ...
 
+    def observe_properties(
+        self,
+        properties: typing.Sequence[typing.Callable[[StateT], typing.Any]],
+        callback: EventCallback[typing.Tuple[typing.Any, ...]],
+        weak: bool = False,
+    ) -> EventToken: ...
+
+    def derive(self, func: typing.Callable[[StateT], T]) -> Derived[T]: ...
+
     def observe_property(
-        self, property: typing.Callable[[StateT], T], callback: EventCallback[T]
+        self, property: typing.Callable[[StateT], T], callback: EventCallback[T], weak: bool = False
     ) -> EventToken: ...
 
     def observe_property_changes(
@@ -32,6 +47,41 @@ class Model(typing.Protocol[StateT]):
         callback: typing.Callable[[typing.Optional[T], T], None],
     ) -> EventToken: ...
 
+    def observe_list_changes(
+        self,
+        property: typing.Callable[[StateT], T],
+        callback: EventCallback[typing.List[ListChange]],
+    ) -> EventToken: ...
+
+    def observe_property_removed(
+        self, property: typing.Callable[[StateT], T], callback: EventCallback[T]
+    ) -> EventToken: ...
+
+    def set_property_filter(
+        self,
+        property: typing.Callable[[StateT], T],
+        change_filter: typing.Optional[ChangeFilter],
+    ) -> None: ...
+
+    def set_property_keyed(
+        self, property: typing.Callable[[StateT], T], keyed: bool = True
+    ) -> None: ...
+
+    def observe_pattern(
+        self,
+        pattern: typing.Callable[[StateT], T],
+        callback: PatternCallback[T],
+        removed: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+    ) -> EventToken: ...
+
+    def index(
+        self,
+        collection: typing.Callable[
+            [StateT], typing.Union[typing.Mapping[typing.Any, T], typing.Sequence[T]]
+        ],
+        key: typing.Callable[[T], K],
+    ) -> "Model[typing.Dict[K, typing.Dict[typing.Any, T]]]": ...
+
     def update_state(self, func: StateUpdateCallback[StateT]) -> None: ...
 
     # used by submodels
@@ -58,6 +108,8 @@ class Model(typing.Protocol[StateT]):
 
     def snapshot(self) -> StateT: ...
 
+    def read_view(self) -> ReadView[StateT]: ...
+
     def snapshot_property(self, property: typing.Callable[[StateT], T]) -> T: ...
 
     def restore(self, snapshot: StateT) -> None: ...
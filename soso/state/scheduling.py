@@ -0,0 +1,140 @@
+"""Emission schedulers.
+
+A scheduler decides when observers are called. By default observers are
+called synchronously, on the thread that updated the model. The other
+schedulers defer delivery (to the asyncio loop, the Tk event loop or an
+executor) and conflate: if a subscription is notified several times before
+delivery, it is only called once, with the latest value.
+
+Use with a whole model:
+
+    model = state.build_model(State(), scheduler=scheduling.TkScheduler(root))
+
+or with a single subscription:
+
+    model.observe_property(lambda x: x.bars, scheduler.wrap(chart.update))
+
+The initial call made by ``observe_*`` is always synchronous when the
+scheduler is set on the model.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import typing
+
+from soso.state.event import EventCallback, _DummyLogger, _LoggerInterface
+
+__all__ = [
+    "AsyncioScheduler",
+    "ExecutorScheduler",
+    "Scheduler",
+    "Synchronous",
+    "TkScheduler",
+]
+
+T = typing.TypeVar("T")
+
+
+class Scheduler(typing.Protocol):
+    def call(self, key: typing.Hashable, callback: EventCallback[T], value: T) -> None:
+        """Call callback(value), replacing any pending call with the same key"""
+        ...
+
+    def wrap(self, callback: EventCallback[T]) -> EventCallback[T]:
+        """A callback that is delivered through this scheduler"""
+        ...
+
+
+class Synchronous:
+    """Call observers immediately (the default)"""
+
+    def call(self, key: typing.Hashable, callback: EventCallback[T], value: T) -> None:
+        callback(value)
+
+    def wrap(self, callback: EventCallback[T]) -> EventCallback[T]:
+        return callback
+
+
+class _Coalescing:
+    _logger: typing.ClassVar[_LoggerInterface] = _DummyLogger()
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        # Insertion ordered, so calls are delivered in the order they were
+        # first requested
+        self.__pending: typing.Dict[
+            typing.Hashable, typing.Tuple[EventCallback[typing.Any], typing.Any]
+        ] = {}
+        self.__requested = False
+
+    def call(self, key: typing.Hashable, callback: EventCallback[T], value: T) -> None:
+        with self.__lock:
+            self.__pending[key] = (callback, value)
+            if self.__requested:
+                return
+            self.__requested = True
+        self._request_flush()
+
+    def wrap(self, callback: EventCallback[T]) -> EventCallback[T]:
+        def deliver(value: T) -> None:
+            self.call(deliver, callback, value)
+
+        return deliver
+
+    def flush(self) -> None:
+        """Deliver all pending calls"""
+        with self.__lock:
+            pending, self.__pending = self.__pending, {}
+            self.__requested = False
+        for callback, value in pending.values():
+            try:
+                callback(value)
+            except Exception:
+                self._logger.error("Exception occurred when delivering event", exc_info=True)
+
+    def _request_flush(self) -> None:
+        raise NotImplementedError()
+
+
+class AsyncioScheduler(_Coalescing):
+    """Deliver once per iteration of an asyncio loop.
+
+    Calls may come from any thread, they are delivered on the loop's thread.
+    """
+
+    def __init__(self, loop: typing.Optional[asyncio.AbstractEventLoop] = None) -> None:
+        super().__init__()
+        self.__loop = loop
+
+    def _request_flush(self) -> None:
+        loop = self.__loop
+        if loop is None:
+            loop = self.__loop = asyncio.get_event_loop()
+        loop.call_soon_threadsafe(self.flush)
+
+
+class _TkWidget(typing.Protocol):
+    def after_idle(self, func: typing.Callable[[], None]) -> typing.Any: ...
+
+
+class TkScheduler(_Coalescing):
+    """Deliver when the Tk event loop is idle, i.e., once per frame"""
+
+    def __init__(self, widget: _TkWidget) -> None:
+        super().__init__()
+        self.__widget = widget
+
+    def _request_flush(self) -> None:
+        self.__widget.after_idle(self.flush)
+
+
+class ExecutorScheduler(_Coalescing):
+    """Deliver on an executor, e.g., a single thread to make delivery thread-affine"""
+
+    def __init__(self, executor: concurrent.futures.Executor) -> None:
+        super().__init__()
+        self.__executor = executor
+
+    def _request_flush(self) -> None:
+        self.__executor.submit(self.flush)
@@ -1,22 +1,40 @@
+import asyncio
+import contextlib
 import copy
+import functools
+import itertools
 import logging
+import threading
 import traceback
 import typing
-from collections import defaultdict
+import weakref
+from collections import deque
+from collections.abc import Mapping
 from dataclasses import dataclass, field, is_dataclass
 from typing import ClassVar
 
-from soso.state import protocols
+from soso.state import compare, protocols, scheduling
+from soso.state.derived import Derived, _batch, _schedule
 from soso.state.event import (
     Event,
     EventCallback,
     EventToken,
     _DummyLogger,
     _LoggerInterface,
+    _WeakCallback,
+    _collect,
 )
+from soso.state.filters import ChangeFilter
+from soso.state.views import ReadView, _unwrap
 from soso.state.util import (
+    ANY,
+    MISSING,
+    Call,
+    DelAttr,
+    DelItem,
     GetAttr,
     GetItem,
+    ListChange,
     PropertyOp,
     Proxy,
     SetAttr,
@@ -25,6 +43,8 @@ from soso.state.util import (
 )
 
 __all__ = [
+    "ANY",
+    "ListChange",
     "Model",
     "StateT",
     "T",
@@ -37,11 +57,13 @@ StateT_contra = typing.TypeVar("StateT_contra", contravariant=True)
 StateT = typing.TypeVar("StateT")
 RootStateT = typing.TypeVar("RootStateT")
 T = typing.TypeVar("T")
+K = typing.TypeVar("K")
 T_contra = typing.TypeVar("T_contra", contravariant=True)
 T_co = typing.TypeVar("T_co", covariant=True)
 
 PropertyCallback = typing.Callable[[StateT_contra], T_co]
 StateUpdateCallback = typing.Callable[[StateT_contra], None]
+PatternCallback = typing.Callable[[typing.Any, T_contra], None]
 
 
 class _Sentinel:
@@ -56,23 +78,195 @@ _NOT_SET = _Sentinel()
 
 def initialize_logging() -> None:
     Model._logger = logging.getLogger(__name__)
+    scheduling._Coalescing._logger = logging.getLogger(scheduling.__name__)
     Event._initialize_logging()
 
 
-@dataclass
+@dataclass(eq=False)
 class Node:
-    children: typing.DefaultDict[str, "Node"] = field(
-        default_factory=lambda: defaultdict(Node)
-    )
-    event: Event[typing.Any] = field(default_factory=lambda: Event("NodeUpdateEvent"))
+    # Keeps the path to a pruned node, see _Children
+    parent: typing.Optional["Node"] = field(default=None, repr=False)
+    children: "_Children" = field(init=False)
+    event: "_NodeEvent" = field(init=False)
     # The type of access to this node
     op: typing.Optional[PropertyOp] = None
+    # Decides whether writes to this node are emitted
+    filter: typing.Optional[ChangeFilter] = None
+    # When a keyed mapping is replaced, only emit keys that changed
+    keyed: bool = False
+    # Changes to the sequence at this node, see Model.observe_list_changes,
+    # and its length as of the last one
+    list_changes: typing.Optional[Event[typing.List[ListChange]]] = None
+    length: int = 0
+    # Emits the last value when the value is deleted
+    removed: typing.Optional[Event[typing.Any]] = None
+
+    def __post_init__(self) -> None:
+        self.children = _Children(self)
+        self.event = _NodeEvent("NodeUpdateEvent", self)
+
+
+class _NodeEvent(Event[typing.Any]):
+    # Keeps its node alive while the event is referenced
+    def __init__(self, name: str, node: Node) -> None:
+        super().__init__(name)
+        self.node = node
+
+
+class _Children(typing.Dict[typing.Any, Node]):
+    """Child nodes by key, created on first access.
+
+    Pruned nodes are only held weakly, while something still references
+    their event, e.g., wait_for_property or a throttled event, so that the
+    same node and event are used again when the key is added back.
+    """
+
+    def __init__(self, parent: Node) -> None:
+        super().__init__()
+        self.__parent = parent
+        self.detached: "weakref.WeakValueDictionary[typing.Any, Node]" = (
+            weakref.WeakValueDictionary()
+        )
+
+    def __missing__(self, key: typing.Any) -> Node:
+        node = self.detached.pop(key, None)
+        if node is None:
+            node = Node(self.__parent)
+        else:
+            node.children.attach()
+        self[key] = node
+        return node
+
+    def prune(self, key: typing.Any) -> None:
+        self.detached[key] = self.pop(key)
+
+    def attach(self) -> None:
+        # Add the pruned nodes that are still referenced back
+        for key, node in list(self.detached.items()):
+            del self.detached[key]
+            self[key] = node
+            node.children.attach()
+
+
+@dataclass
+class _PatternMatches:
+    # wildcard keys -> value, MISSING if the value no longer exists
+    values: typing.Dict[typing.Tuple[typing.Any, ...], typing.Any] = field(default_factory=dict)
+    # Whether values holds every current match of the pattern
+    complete: bool = False
+
+
+@dataclass
+class _PatternNode:
+    """Trie of wildcard patterns, ANY is the key for wildcards"""
+
+    children: typing.Dict[typing.Any, "_PatternNode"] = field(default_factory=dict)
+    op: typing.Optional[PropertyOp] = None
+    # Matches of the pattern ending at this node
+    event: typing.Optional[Event[_PatternMatches]] = None
+
+
+def _touched_path(stmt: typing.List[PropertyOp]) -> typing.List[PropertyOp]:
+    # x.lst.append(1), x.lst[1:3] = ... and del x.d[key] modify x.lst and x.d
+    if len(stmt) >= 2 and isinstance(stmt[-1], Call):
+        return stmt[:-2]
+    if isinstance(stmt[-1], SetItem) and isinstance(stmt[-1].key, slice):
+        return stmt[:-1]
+    if isinstance(stmt[-1], (DelAttr, DelItem)):
+        return stmt[:-1]
+    return stmt
+
+
+def _is_removal(stmt: typing.List[PropertyOp]) -> bool:
+    # Deleting from a sequence changes the items after it instead
+    return isinstance(stmt[-1], DelAttr) or (
+        isinstance(stmt[-1], DelItem) and stmt[-1].change is None
+    )
+
+
+def _is_item_op(op: PropertyOp) -> bool:
+    return isinstance(op, (GetItem, SetItem, DelItem))
+
+
+def _wildcard_keys(value: typing.Any) -> typing.Iterable[typing.Any]:
+    if isinstance(value, Mapping):
+        return list(value.keys())
+    if isinstance(value, (str, bytes)) or not hasattr(value, "__len__"):
+        return ()
+    return range(len(value))
+
+
+def _changed_indices(changes: typing.List[ListChange], length: int) -> typing.List[int]:
+    # Indices of a sequence of length whose items may differ after changes,
+    # including those past its end that were removed
+    indices: typing.Set[int] = set()
+    shifted: typing.Optional[int] = None
+    longest = length
+    for change in reversed(changes):
+        inserted = len(change.inserted)
+        if inserted == change.removed:
+            indices.update(range(change.start, change.start + inserted))
+        else:
+            # Every item from start on moves
+            shifted = change.start if shifted is None else min(shifted, change.start)
+        length += change.removed - inserted
+        longest = max(longest, length)
+    if shifted is not None:
+        indices.update(range(shifted, longest))
+    return sorted(indices)
+
+
+def _pattern_key(keys: typing.Tuple[typing.Any, ...]) -> typing.Any:
+    return keys[0] if len(keys) == 1 else keys
+
+
+def _accumulate(
+    scheduler: scheduling.Scheduler, callback: EventCallback[typing.List[ListChange]]
+) -> EventCallback[typing.List[ListChange]]:
+    # Deliver changes through scheduler without dropping any
+    pending: typing.List[ListChange] = []
+
+    def flush(_: None) -> None:
+        changes = pending[:]
+        del pending[:len(changes)]
+        if changes:
+            callback(changes)
+
+    def deliver(changes: typing.List[ListChange]) -> None:
+        pending.extend(changes)
+        scheduler.call(flush, flush, None)
+
+    return deliver
 
 
 class Model(typing.Generic[StateT], protocols.Model[StateT]):
     _logger: ClassVar[_LoggerInterface] = _DummyLogger()
 
-    def __init__(self, initial_state: StateT) -> None:
+    def __init__(
+        self,
+        initial_state: StateT,
+        *,
+        queue_updates: bool = False,
+        max_cascade: int = 100,
+        scheduler: typing.Optional[scheduling.Scheduler] = None,
+        thread_safe: bool = False,
+        owner_loop: typing.Optional[asyncio.AbstractEventLoop] = None,
+    ) -> None:
+        """
+        If queue_updates is True, updates made while an update is being
+        emitted (e.g., from an observer) are queued and applied in order
+        after it completes instead of recursively. max_cascade limits the
+        number of such queued updates for a single outside update.
+
+        scheduler, if given, delivers to observers registered through the
+        observe_* methods, see soso.state.scheduling.
+
+        If thread_safe is True, updates and subscriptions from any thread
+        are serialized under a lock. If owner_loop is given, updates made
+        outside of it are instead queued and applied in batches on the
+        loop, so observers are only ever called on its thread. Reading
+        state is never locked.
+        """
         self.__state_klass = state_klass = initial_state.__class__
         if not is_dataclass(state_klass):
             raise ValueError("Expected a dataclass, got %s" % state_klass)
@@ -80,16 +274,39 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         self.__current_state = copy.deepcopy(initial_state)
         self.__root_node = Node()
         self.__root_node.event._name = "root"
+        self.__filter_count = 0
+        self.__keyed_count = 0
+        self.__patterns = _PatternNode()
+        self.__pattern_count = 0
+        self.__queue_updates = queue_updates
+        self.__max_cascade = max_cascade
+        self.__emitting = False
+        self.__queued: typing.Deque[typing.Callable[[], None]] = deque()
+        self.__scheduler = scheduler
+        self.__lock: typing.ContextManager[typing.Any] = (
+            threading.RLock() if thread_safe or owner_loop is not None else contextlib.nullcontext()
+        )
+        self.__owner_loop = owner_loop
+        self.__inbox: typing.Deque[typing.Callable[[], None]] = deque()
+        self.__inbox_lock = threading.Lock()
+        self.__inbox_scheduled = False
+        # Number of live read views and the objects copied since the last
+        # one was taken, which are not shared with any view
+        self.__views = 0
+        self.__owned: typing.Dict[int, typing.Any] = {}
+        # Sequence changes of the current update, emitted once it is applied
+        self.__list_changes: typing.Dict[int, typing.Tuple[Node, typing.List[ListChange]]] = {}
 
     def __get_node_for_ops(self, ops: typing.List[PropertyOp]) -> Node:
-        root: Node = self.__root_node
-        s = root.event._name
-        for op in ops:
-            root = root.children[op.key]
-            root.op = op
-            s += "." + str(op.key)
-            root.event._name = s
-        return root
+        with self.__lock:
+            root: Node = self.__root_node
+            s = root.event._name
+            for op in ops:
+                root = root.children[op.key]
+                root.op = op
+                s += "." + str(op.key)
+                root.event._name = s
+            return root
 
     def __get_value_for_ops(self, ops: typing.List[PropertyOp]) -> typing.Any:
         root: typing.Any = self.__current_state
@@ -97,17 +314,49 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
             root = op.get_value(root)
         return root
 
+    def __comparator_for_ops(self, ops: typing.List[PropertyOp]) -> compare.Comparator:
+        if not ops or not isinstance(ops[-1], GetAttr):
+            return compare.default
+        try:
+            parent = self.__get_value_for_ops(ops[:-1])
+        except Exception:
+            return compare.default
+        return compare.for_field(parent, ops[-1].key)
+
+    def __deliver(self, callback: EventCallback[T]) -> EventCallback[T]:
+        if self.__scheduler is None:
+            return callback
+        return self.__scheduler.wrap(callback)
+
+    def __connect(self, event: Event[T], callback: EventCallback[T], weak: bool) -> EventToken:
+        if not weak:
+            return event.connect(self.__deliver(callback))
+        if self.__scheduler is None:
+            return event.connect(callback, weak=True)
+        # The scheduler must not hold callback strongly
+        weak_callback = _WeakCallback(callback)
+        token = weak_callback.token = event.connect(self.__deliver(weak_callback))
+        return token
+
     def submodel(self, func: PropertyCallback[StateT, T]) -> protocols.Model[T]:
         return _SubModel(self, func)
 
-    def observe(self, callback: EventCallback[StateT]) -> EventToken:
-        return self.observe_property(lambda x: x, callback)
+    def observe(self, callback: EventCallback[StateT], weak: bool = False) -> EventToken:
+        return self.observe_property(lambda x: x, callback, weak)
+
+    def derive(self, func: PropertyCallback[StateT, T]) -> Derived[T]:
+        return _collect(Derived(self, func))
 
     def observe_property(
-        self, func: PropertyCallback[StateT, T], callback: EventCallback[T]
+        self, func: PropertyCallback[StateT, T], callback: EventCallback[T], weak: bool = False
     ) -> EventToken:
+        """
+        If weak is True, callback is only weakly referenced (e.g., a bound
+        method does not keep its object alive) and is disconnected when it
+        is garbage collected.
+        """
         event, ops = self.__event(func)
-        token = event.connect(callback)
+        token = self.__connect(event, callback, weak)
         try:
             value = self.__get_value_for_ops(ops)
             # call with the initial value
@@ -116,13 +365,38 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         # swallow but log exception
         except Exception:
             self._logger.debug("Exception during callback", exc_info=True)
-        return token
+        return _collect(token)
 
     def observe_changes(
         self, callback: typing.Callable[[typing.Optional[StateT], StateT], None]
     ) -> EventToken:
         return self.observe_property_changes(lambda x: x, callback)
 
+    def observe_properties(
+        self,
+        properties: typing.Sequence[PropertyCallback[StateT, typing.Any]],
+        callback: EventCallback[typing.Tuple[typing.Any, ...]],
+        weak: bool = False,
+    ) -> EventToken:
+        """
+        Observe several properties with one callback.
+
+        The callback receives the current values of all properties and is
+        called at most once per update, only if at least one of them changed.
+        """
+        paths = []
+        for property in properties:
+            event, ops = self.__event(property)
+            paths.append((event, ops, self.__comparator_for_ops(ops)))
+        observer = _PropertiesObserver(paths, self.__get_value_for_ops, self._logger)
+        token = self.__connect(observer.event, callback, weak)
+        if observer.values is not None:
+            try:
+                callback(observer.values)
+            except Exception:
+                self._logger.debug("Exception during callback", exc_info=True)
+        return _collect(token)
+
     def observe_property_changes(
         self,
         property: PropertyCallback[StateT, T],
@@ -135,6 +409,8 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         On the initial call, previous_value will be None.
         """
         event, ops = self.__event(property)
+        comparator = self.__comparator_for_ops(ops)
+        needs_copy = compare.needs_copy(comparator)
 
         last_value: typing.Union[_Sentinel, typing.Any] = _NOT_SET
 
@@ -143,7 +419,7 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
 
             if last_value is not _NOT_SET:
                 try:
-                    if last_value == new_value:
+                    if not comparator(last_value, new_value):
                         return
                 except Exception:
                     self._logger.debug(
@@ -153,19 +429,242 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
             prev_value: typing.Optional[T] = (
                 typing.cast(T, last_value) if last_value is not _NOT_SET else None
             )
-            last_value = copy.deepcopy(new_value)
+            last_value = copy.deepcopy(new_value) if needs_copy else new_value
             callback(prev_value, new_value)
 
-        token = event.connect(wrapped_callback)
+        token = event.connect(self.__deliver(wrapped_callback))
 
         try:
             value = self.__get_value_for_ops(ops)
             callback(None, value)
-            last_value = copy.deepcopy(value)
+            last_value = copy.deepcopy(value) if needs_copy else value
         except Exception:
             self._logger.debug("Exception during callback", exc_info=True)
 
-        return token
+        return _collect(token)
+
+    def observe_list_changes(
+        self,
+        property: PropertyCallback[StateT, T],
+        callback: EventCallback[typing.List[ListChange]],
+    ) -> EventToken:
+        """
+        Observe the changes made to a sequence rather than its values.
+
+        The callback receives the ListChanges of each update in order, which
+        can be applied to a copy of the sequence (e.g., the rows of a list
+        widget) to keep it in sync without rebuilding it. Changes are
+        recorded for the mutating methods of lists (append, insert, pop,
+        ...), appends to Columns and item and slice assignment. Replacing
+        the sequence, or an untracked modification of it, is reported as
+        replacing all of its items. The initial call receives
+        all current items as inserted.
+
+        With a scheduler, the changes are accumulated until they are
+        delivered rather than conflated.
+        """
+        proxy = self.__make_proxy()
+        property(proxy)
+        ops = self.__get_ops(proxy)
+        with self.__lock:
+            node = self.__get_node_for_ops(ops)
+            if node.list_changes is None:
+                node.list_changes = Event(node.event._name + "::list_changes")
+                try:
+                    node.length = len(self.__get_value_for_ops(ops))
+                except Exception:
+                    node.length = 0
+            event = node.list_changes
+
+        if self.__scheduler is None:
+            token = event.connect(callback)
+        else:
+            token = event.connect(_accumulate(self.__scheduler, callback))
+        try:
+            value = self.__get_value_for_ops(ops)
+            callback([ListChange(0, 0, value[:])])
+        except Exception:
+            self._logger.debug("Exception during callback", exc_info=True)
+        return _collect(token)
+
+    def observe_property_removed(
+        self, property: PropertyCallback[StateT, T], callback: EventCallback[T]
+    ) -> EventToken:
+        """
+        Observe the deletion of a value, e.g., del x.orders[key].
+
+        The callback receives the deleted value. It is also called when an
+        object containing the value is deleted, or when its key is missing
+        from a keyed mapping (set_property_keyed) that is replaced or
+        restored. It is not called when the value itself is replaced.
+        """
+        proxy = self.__make_proxy()
+        property(proxy)
+        ops = self.__get_ops(proxy)
+        with self.__lock:
+            node = self.__get_node_for_ops(ops)
+            if node.removed is None:
+                node.removed = Event(node.event._name + "::removed")
+            event = node.removed
+        return _collect(event.connect(self.__deliver(callback)))
+
+    def observe_pattern(
+        self,
+        pattern: PropertyCallback[StateT, T],
+        callback: PatternCallback[T],
+        removed: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+    ) -> EventToken:
+        """
+        Observe every value matching a pattern containing ANY wildcards.
+
+        The callback receives (key, value) for matches that changed, where
+        key is a tuple if the pattern contains more than one wildcard.
+        removed, if given, receives the key of matches that no longer
+        exist, e.g., after del x.orders[key] or x.fills.pop().
+        """
+        event, ops = self._pattern_event(pattern)
+        scheduler = self.__scheduler
+        # Keys of the current matches, to find removed ones when every
+        # match is emitted at once
+        known: typing.Set[typing.Tuple[typing.Any, ...]] = set()
+
+        def deliver(keys: typing.Tuple[typing.Any, ...], value: typing.Any) -> None:
+            func: EventCallback[typing.Any]
+            if value is not MISSING:
+                func = functools.partial(callback, _pattern_key(keys))
+            elif removed is not None:
+                func, value = removed, _pattern_key(keys)
+            else:
+                return
+            if scheduler is None:
+                func(value)
+            else:
+                # Conflate per match
+                scheduler.call((on_matches, keys), func, value)
+
+        def on_matches(matches: _PatternMatches) -> None:
+            values = matches.values
+            if removed is not None:
+                if matches.complete:
+                    for keys in known - values.keys():
+                        deliver(keys, MISSING)
+                    known.clear()
+                known.update(keys for keys, value in values.items() if value is not MISSING)
+                known.difference_update(keys for keys, value in values.items() if value is MISSING)
+            for keys, value in values.items():
+                deliver(keys, value)
+
+        token = event.connect(on_matches)
+        try:
+            for keys, value in self.__expand_ops(ops, 0, self.__current_state, ()):
+                if removed is not None:
+                    known.add(keys)
+                callback(_pattern_key(keys), value)
+        except Exception:
+            self._logger.debug("Exception during callback", exc_info=True)
+        return _collect(token)
+
+    def _pattern_event(
+        self, pattern: PropertyCallback[StateT, T]
+    ) -> typing.Tuple[Event[_PatternMatches], typing.List[PropertyOp]]:
+        proxy = self.__make_proxy()
+        pattern(proxy)
+        ops = self.__get_ops(proxy)
+        if not any(op.key is ANY for op in ops):
+            raise ValueError("Expected a pattern containing ANY")
+        if any(op.key is ANY and not _is_item_op(op) for op in ops):
+            raise ValueError("ANY can only be used as a key")
+        with self.__lock:
+            node = self.__patterns
+            for op in ops:
+                node = node.children.setdefault(op.key, _PatternNode(op=op))
+            if node.event is None:
+                node.event = Event("PatternEvent")
+                self.__pattern_count += 1
+            return node.event, ops
+
+    def __expand_ops(
+        self,
+        ops: typing.List[PropertyOp],
+        depth: int,
+        value: typing.Any,
+        keys: typing.Tuple[typing.Any, ...],
+    ) -> typing.Iterator[typing.Tuple[typing.Tuple[typing.Any, ...], typing.Any]]:
+        if depth == len(ops):
+            yield keys, value
+            return
+        op = ops[depth]
+        if op.key is ANY:
+            for key in _wildcard_keys(value):
+                yield from self.__expand_ops(ops, depth + 1, value[key], keys + (key,))
+        else:
+            yield from self.__expand_ops(ops, depth + 1, op.get_value(value), keys)
+
+    def index(
+        self,
+        collection: PropertyCallback[
+            StateT, typing.Union[typing.Mapping[typing.Any, T], typing.Sequence[T]]
+        ],
+        key: typing.Callable[[T], K],
+    ) -> protocols.Model[typing.Dict[K, typing.Dict[typing.Any, T]]]:
+        """
+        Group the elements of a collection by key(element).
+
+        The result maps each key to {element key: element} and is kept up to
+        date from the elements touched by each update.
+        """
+
+        def pattern(state: StateT) -> T:
+            return collection(state)[ANY]
+
+        event, ops = self._pattern_event(pattern)
+        index: _Index[K, T] = _Index(key)
+        matches = _PatternMatches(complete=True)
+        try:
+            for keys, value in self.__expand_ops(ops, 0, self.__current_state, ()):
+                matches.values[keys] = value
+        except Exception:
+            self._logger.debug("Could not build initial index", exc_info=True)
+        index.on_matches(matches)
+        event.connect(index.on_matches)
+        return index.groups
+
+    def set_property_filter(
+        self, property: PropertyCallback[StateT, T], change_filter: typing.Optional[ChangeFilter]
+    ) -> None:
+        """
+        Suppress emission of writes to property that change_filter rejects.
+
+        The state is still updated. Pass None to remove the filter.
+        """
+        _, ops = self.__event(property)
+        with self.__lock:
+            node = self.__get_node_for_ops(ops)
+            if node.filter is not None:
+                self.__filter_count -= 1
+            node.filter = change_filter
+            if change_filter is None:
+                return
+            self.__filter_count += 1
+            try:
+                change_filter.reset(self.__get_value_for_ops(ops))
+            except Exception:
+                self._logger.debug("Could not get initial value for filter", exc_info=True)
+
+    def set_property_keyed(self, property: PropertyCallback[StateT, T], keyed: bool = True) -> None:
+        """
+        Treat the mapping at property as a keyed collection.
+
+        When the mapping is replaced or restored, only observers of keys
+        that were added or changed are notified instead of every key, and
+        observe_property_removed is notified of keys that were removed.
+        """
+        _, ops = self.__event(property)
+        with self.__lock:
+            node = self.__get_node_for_ops(ops)
+            if node.keyed != keyed:
+                self.__keyed_count += 1 if keyed else -1
+            node.keyed = keyed
 
     def _get_submodel_root(self) -> typing.Callable[[StateT], typing.Any]:
         return lambda x: x
@@ -194,6 +693,15 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         return self.wait_for_property(lambda x: x)
 
     def wait_for_property(self, property: PropertyCallback[StateT, T]) -> Event[T]:
+        """
+        The event emitted when property changes. It can be awaited or
+        iterated with async for.
+
+        The event is shared by everyone waiting for property, so it takes
+        no buffer options: each consumer bounds its own buffer with
+        .stream(maxsize, overflow), e.g.,
+        model.wait_for_property(p).stream(100, Overflow.DROP_OLDEST).
+        """
         return self.event(property)
 
     def wait_for_change(self) -> Event[typing.Tuple[typing.Optional[StateT], StateT]]:
@@ -224,9 +732,61 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         subtree = property(self.state)
         return copy.deepcopy(subtree)
 
+    def read_view(self) -> ReadView[StateT]:
+        """
+        A consistent version of the current state that later updates do not
+        modify. Taking a view is O(1); while views are alive, updates copy
+        the objects they write to instead of modifying them in place.
+        """
+        with self.__lock:
+            self.__views += 1
+            self.__owned = {}
+            return ReadView(self.__current_state, self.__release_view)
+
+    def __release_view(self) -> None:
+        with self.__lock:
+            self.__views -= 1
+            if not self.__views:
+                self.__owned = {}
+
+    def __own(self, value: typing.Any) -> typing.Any:
+        # A copy of value that is not shared with any read view
+        if id(value) in self.__owned:
+            return value
+        value = copy.copy(value)
+        self.__owned[id(value)] = value
+        return value
+
+    def __own_path(self, rootops: typing.List[PropertyOp]) -> typing.Any:
+        value = self.__current_state = self.__own(self.__current_state)
+        for op in rootops:
+            value = self.__own_child(value, op)
+        return value
+
+    def __own_child(self, parent: typing.Any, op: PropertyOp) -> typing.Any:
+        value = op.get_value(parent)
+        owned = self.__own(value)
+        if owned is not value:
+            if isinstance(op, GetAttr):
+                setattr(parent, op.key, owned)
+            else:
+                parent[op.key] = owned
+        return owned
+
     def restore(self, snapshot: StateT) -> None:
-        self.__current_state = copy.deepcopy(snapshot)
-        self.__fire_all_child_events(self.__root_node, self.__current_state)
+        snapshot = copy.deepcopy(snapshot)
+        self.__run(lambda: self.__restore(snapshot))
+
+    def __restore(self, snapshot: StateT) -> None:
+        previous = self.__current_state if self.__keyed_count else MISSING
+        self.__current_state = snapshot
+        with _batch():
+            self.__fire_all_child_events(self.__root_node, self.__current_state, previous)
+            if self.__pattern_count:
+                collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]] = {}
+                self.__expand_all_patterns(self.__patterns, self.__current_state, collected)
+                self.__emit_patterns(collected)
+            self.__emit_list_changes()
 
     def restore_property(
         self, snapshot: T, property: PropertyCallback[StateT, T]
@@ -251,23 +811,95 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
     def _update_state(
         self, root: typing.Callable[[StateT], T], func: StateUpdateCallback[T]
     ) -> None:
+        self.__run(lambda: self.__update_state(root, func))
 
+    def __run(self, update: typing.Callable[[], None]) -> None:
+        if self.__owner_loop is not None and not self.__on_owner_loop():
+            self.__post(update)
+            return
+        with self.__lock:
+            self.__run_locked(update)
+
+    def __on_owner_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self.__owner_loop
+        except RuntimeError:
+            return False
+
+    def __post(self, update: typing.Callable[[], None]) -> None:
+        assert self.__owner_loop is not None
+        with self.__inbox_lock:
+            self.__inbox.append(update)
+            if self.__inbox_scheduled:
+                return
+            self.__inbox_scheduled = True
+        self.__owner_loop.call_soon_threadsafe(self.__drain_inbox)
+
+    def __drain_inbox(self) -> None:
+        with self.__inbox_lock:
+            inbox, self.__inbox = self.__inbox, deque()
+            self.__inbox_scheduled = False
+        # Derived values are only propagated once for the whole batch
+        with self.__lock, _batch():
+            for update in inbox:
+                try:
+                    self.__run_locked(update)
+                except Exception:
+                    self._logger.error("Exception applying queued update", exc_info=True)
+
+    def __run_locked(self, update: typing.Callable[[], None]) -> None:
+        if not self.__queue_updates:
+            update()
+            return
+        self.__queued.append(update)
+        if self.__emitting:
+            # Applied once the current update completes
+            return
+        self.__emitting = True
+        try:
+            cascade = -1
+            while self.__queued:
+                cascade += 1
+                if cascade > self.__max_cascade:
+                    raise RuntimeError(
+                        "Exceeded %d cascading updates, possible update loop" % self.__max_cascade
+                    )
+                self.__queued.popleft()()
+        finally:
+            self.__queued.clear()
+            self.__emitting = False
+
+    def __update_state(
+        self, root: typing.Callable[[StateT], T], func: StateUpdateCallback[T]
+    ) -> None:
         # Get all changes
         tproxy = self.__make_proxy()
         func(tproxy)
         ops = self.__get_ops(tproxy)
-        obj: typing.Optional[typing.Any] = root(self.__current_state)
+
+        rootproxy = self.__make_proxy()
+        root(rootproxy)
+        rootops = self.__get_ops(rootproxy)
+
+        # Objects shared with read views are copied before being written to
+        copying = self.__views > 0
+        obj: typing.Optional[typing.Any] = (
+            self.__own_path(rootops) if copying else root(self.__current_state)
+        )
 
         # Apply changes to state
         stmts: typing.List[typing.List[PropertyOp]] = []
         curr_stmt: typing.List[PropertyOp] = []
         self._logger.debug("Update ops: %s", ops)
-        for op in ops:
+        for i, op in enumerate(ops):
             curr_stmt.append(op)
-            obj, changed = op.execute(obj)
+            if copying and isinstance(op, (GetAttr, GetItem)) and not self.__is_method(ops, i):
+                obj, changed = self.__own_child(obj, op), False
+            else:
+                obj, changed = op.execute(obj)
             # end of statement
             if obj is None:
-                obj = root(self.__current_state)
+                obj = self.__own_path(rootops) if copying else root(self.__current_state)
                 if changed:
                     stmts.append(curr_stmt)
                     curr_stmt = []
@@ -282,13 +914,25 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         if len(stmts) == 0:
             return
 
+        if self.__filter_count:
+            stmts = [stmt for stmt in stmts if self.__accept_stmt(rootops, stmt)]
+            if len(stmts) == 0:
+                return
+
+        # Derived values are propagated once everything has been emitted
+        with _batch():
+            self.__emit_update(rootops, stmts)
+
+    @staticmethod
+    def __is_method(ops: typing.List[PropertyOp], i: int) -> bool:
+        return i + 1 < len(ops) and isinstance(ops[i + 1], Call)
+
+    def __emit_update(
+        self, rootops: typing.List[PropertyOp], stmts: typing.List[typing.List[PropertyOp]]
+    ) -> None:
         # Always emit root
         self.__root_node.event.emit(self.__current_state)
 
-        rootproxy = self.__make_proxy()
-        root(rootproxy)
-        rootops = self.__get_ops(rootproxy)
-
         # Emit everything from actual root to root(__current_state)
         curr_node = self.__root_node
         curr_value: typing.Any = self.__current_state
@@ -305,16 +949,293 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
             assert stmt
             # if foo.bar.baz[0] is modified then we need to signal foo,
             # foo.bar, foo.bar, foo.bar.baz[0], and then everything
-            # below foo.bar.baz[0]
-            curr_node = root_node
+            # below foo.bar.baz[0]. foo.lst.append(1) modifies foo.lst.
+            path = _touched_path(stmt)
+            curr_node = parent_node = root_node
             curr_value = root_value
-            for op in stmt:
+            resolved = 0
+            for op in path:
+                parent_node = curr_node
                 curr_node = curr_node.children[op.key]
                 curr_node.op = op
-                curr_value = op.get_value(curr_value)
+                try:
+                    curr_value = op.get_value(curr_value)
+                except (AttributeError, LookupError):
+                    # A later statement deleted it, e.g., x.d[k].a = 1 and
+                    # then del x.d[k], and that one emits the removal
+                    break
+                resolved += 1
                 curr_node.event.emit(curr_value)
+            change: typing.Optional[ListChange] = getattr(stmt[-1], "change", None)
+            if resolved < len(path):
+                if change is not None and resolved == len(path) - 1 == len(stmt) - 1:
+                    # x.lst[i] = value and then x.lst.pop()
+                    self.__add_list_change(parent_node, change)
+                continue
+            if change is not None:
+                # A call or slice assignment changes the node itself,
+                # x.lst[i] = value changes its parent
+                self.__add_list_change(
+                    curr_node if len(path) < len(stmt) else parent_node, change
+                )
+            elif curr_node.list_changes is not None:
+                self.__reset_list(curr_node, curr_value)
+            if _is_removal(stmt):
+                # Only the deleted value's observers are notified
+                self.__remove_child(curr_node, stmt[-1])
+                continue
             # Now everything below node
-            self.__fire_all_child_events(curr_node, curr_value)
+            previous = (
+                getattr(stmt[-1], "previous", MISSING)
+                if self.__keyed_count and path is stmt
+                else MISSING
+            )
+            self.__fire_all_child_events(curr_node, curr_value, previous)
+
+        if self.__pattern_count:
+            collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]] = {}
+            for path in self.__pattern_paths(rootops, stmts):
+                self.__match_path(
+                    self.__patterns, rootops + path, 0, self.__current_state, (), collected
+                )
+            self.__emit_patterns(collected)
+
+        self.__emit_list_changes()
+
+    def __remove_child(self, node: Node, op: PropertyOp) -> None:
+        try:
+            child = node.children.get(op.key)
+        except TypeError:
+            # unhashable keys
+            return
+        if child is None:
+            return
+        self.__emit_removed(child, getattr(op, "previous", MISSING))
+        if self.__prune(child):
+            node.children.prune(op.key)
+
+    def __emit_removed(self, node: Node, value: typing.Any) -> None:
+        if value is MISSING:
+            return
+        if node.removed is not None:
+            node.removed.emit(value)
+        for child in node.children.values():
+            assert child.op is not None
+            try:
+                child_value = child.op.get_value(value)
+            except Exception:
+                continue
+            self.__emit_removed(child, child_value)
+
+    def __prune(self, node: Node) -> bool:
+        # Drop the nodes nobody observes, return whether node was dropped
+        for key, child in list(node.children.items()):
+            if self.__prune(child):
+                node.children.prune(key)
+        return not (
+            node.children
+            or node.event._handler_count()
+            or node.filter is not None
+            or node.keyed
+            or (node.list_changes is not None and node.list_changes._handler_count())
+            or (node.removed is not None and node.removed._handler_count())
+        )
+
+    def __add_list_change(self, node: Node, change: ListChange) -> None:
+        if node.list_changes is None:
+            return
+        node.length += len(change.inserted) - change.removed
+        entry = self.__list_changes.get(id(node))
+        if entry is None:
+            entry = self.__list_changes[id(node)] = (node, [])
+        entry[1].append(change)
+
+    def __reset_list(self, node: Node, value: typing.Any) -> None:
+        # The sequence was replaced, report it as replacing all items
+        try:
+            inserted = value[:]
+        except Exception:
+            inserted = []
+        self.__add_list_change(node, ListChange(0, node.length, inserted))
+
+    def __emit_list_changes(self) -> None:
+        if not self.__list_changes:
+            return
+        collected, self.__list_changes = self.__list_changes, {}
+        for node, changes in collected.values():
+            assert node.list_changes is not None
+            node.list_changes.emit(changes)
+
+    def __accept_stmt(
+        self, rootops: typing.List[PropertyOp], stmt: typing.List[PropertyOp]
+    ) -> bool:
+        node: typing.Optional[Node] = self.__root_node
+        stmt = _touched_path(stmt)
+        for op in itertools.chain(rootops, stmt):
+            assert node is not None
+            # Don't create nodes for paths nobody is interested in
+            node = node.children.get(op.key)
+            if node is None:
+                return True
+        assert node is not None
+        if node.filter is None:
+            return True
+        try:
+            value = self.__get_value_for_ops(rootops + stmt)
+        except (AttributeError, LookupError):
+            # Deleted by a later statement, see __emit_update
+            return True
+        return node.filter(value)
+
+    def __pattern_paths(
+        self, rootops: typing.List[PropertyOp], stmts: typing.List[typing.List[PropertyOp]]
+    ) -> typing.List[typing.List[PropertyOp]]:
+        # The paths to match patterns against. Deleted values match as
+        # MISSING, changes to sequences only match the indices they touched.
+        paths: typing.List[typing.List[PropertyOp]] = []
+        sequences: typing.Dict[
+            typing.Any, typing.Tuple[typing.List[PropertyOp], typing.List[ListChange]]
+        ] = {}
+        for stmt in stmts:
+            path = _touched_path(stmt)
+            change: typing.Optional[ListChange] = getattr(stmt[-1], "change", None)
+            if change is not None and len(path) < len(stmt):
+                try:
+                    entry = sequences.setdefault(
+                        tuple((type(op), op.key) for op in path), (path, [])
+                    )
+                except TypeError:
+                    # unhashable keys
+                    paths.append(path)
+                    continue
+                entry[1].append(change)
+            else:
+                paths.append(stmt if _is_removal(stmt) else path)
+        for path, changes in sequences.values():
+            try:
+                length = len(self.__get_value_for_ops(rootops + path))
+            except Exception:
+                paths.append(path)
+                continue
+            paths.extend(path + [GetItem(index)] for index in _changed_indices(changes, length))
+        return paths
+
+    def __match_path(
+        self,
+        pnode: _PatternNode,
+        path: typing.List[PropertyOp],
+        depth: int,
+        value: typing.Any,
+        keys: typing.Tuple[typing.Any, ...],
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> None:
+        # Walk the touched path and the pattern trie together. Patterns
+        # ending above the end of the path match the value at that point,
+        # patterns continuing below it match everything under the value.
+        if depth == len(path):
+            # No keys bound yet means the expansion finds every match
+            if keys:
+                self.__expand_patterns(pnode, value, keys, False, collected)
+            else:
+                self.__expand_all_patterns(pnode, value, collected)
+            return
+        if pnode.event is not None:
+            self.__add_match(pnode, keys, value, False, collected)
+        op = path[depth]
+        try:
+            child_value = op.get_value(value)
+        except Exception:
+            child_value = MISSING
+        try:
+            child = pnode.children.get(op.key)
+        except TypeError:
+            # unhashable keys, e.g., slices
+            child = None
+        if child is not None and op.key is not ANY:
+            self.__match_path(child, path, depth + 1, child_value, keys, collected)
+        wildcard = pnode.children.get(ANY)
+        if wildcard is not None and _is_item_op(op):
+            self.__match_path(
+                wildcard, path, depth + 1, child_value, keys + (op.key,), collected
+            )
+
+    def __expand_all_patterns(
+        self,
+        pnode: _PatternNode,
+        value: typing.Any,
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> None:
+        # Every pattern below pnode gets its complete matches, even if there
+        # are none, so that observers learn the old ones were removed
+        self.__add_complete(pnode, collected)
+        self.__expand_patterns(pnode, value, (), True, collected)
+
+    def __add_complete(
+        self,
+        pnode: _PatternNode,
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> None:
+        if pnode.event is not None:
+            self.__matches(pnode, collected).complete = True
+        for child in pnode.children.values():
+            self.__add_complete(child, collected)
+
+    def __expand_patterns(
+        self,
+        pnode: _PatternNode,
+        value: typing.Any,
+        keys: typing.Tuple[typing.Any, ...],
+        complete: bool,
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> None:
+        if pnode.event is not None:
+            self.__add_match(pnode, keys, value, complete, collected)
+        for key, child in pnode.children.items():
+            assert child.op is not None
+            if value is MISSING:
+                # Whatever was below a removed value is removed too
+                if key is not ANY:
+                    self.__expand_patterns(child, MISSING, keys, complete, collected)
+            elif key is ANY:
+                for child_key in _wildcard_keys(value):
+                    self.__expand_patterns(
+                        child, value[child_key], keys + (child_key,), complete, collected
+                    )
+            else:
+                try:
+                    child_value = child.op.get_value(value)
+                except Exception:
+                    continue
+                self.__expand_patterns(child, child_value, keys, complete, collected)
+
+    def __add_match(
+        self,
+        pnode: _PatternNode,
+        keys: typing.Tuple[typing.Any, ...],
+        value: typing.Any,
+        complete: bool,
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> None:
+        matches = self.__matches(pnode, collected)
+        matches.values[keys] = value
+        matches.complete |= complete
+
+    @staticmethod
+    def __matches(
+        pnode: _PatternNode,
+        collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]],
+    ) -> _PatternMatches:
+        entry = collected.get(id(pnode))
+        if entry is None:
+            entry = collected[id(pnode)] = (pnode, _PatternMatches())
+        return entry[1]
+
+    def __emit_patterns(
+        self, collected: typing.Dict[int, typing.Tuple[_PatternNode, _PatternMatches]]
+    ) -> None:
+        for pnode, matches in collected.values():
+            assert pnode.event is not None
+            pnode.event.emit(matches)
 
     def __make_proxy(self) -> typing.Any:
         return Proxy()
@@ -335,19 +1256,78 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
     def event(self, property: PropertyCallback[StateT, T]) -> Event[T]:
         return self.__event(property)[0]
 
-    def __fire_all_child_events(self, node: Node, parent: typing.Any) -> None:
+    def __fire_all_child_events(
+        self, node: Node, parent: typing.Any, previous: typing.Any = MISSING
+    ) -> None:
+        # previous is the value parent replaced, if known
         self._logger.debug("Firing all child events: %s", node.event._name)
+        if node.keyed and isinstance(parent, Mapping) and isinstance(previous, Mapping):
+            self.__fire_keyed_child_events(node, parent, previous)
+            return
+        # The value may have been added back
+        node.children.attach()
         for name, child_node in node.children.items():
             try:
                 assert child_node.op is not None
                 child_value = child_node.op.get_value(parent)
+                if child_node.filter is not None:
+                    child_node.filter.reset(child_value)
                 child_node.event.emit(child_value)
-                self.__fire_all_child_events(child_node, child_value)
+                if child_node.list_changes is not None:
+                    self.__reset_list(child_node, child_value)
+                self.__fire_all_child_events(
+                    child_node, child_value, self.__get_previous(child_node, previous)
+                )
             except Exception:
                 # It's common for values to disappear, no need to pepper
                 # info logs. TODO: should GC such child nodes? Probably
                 self._logger.debug(traceback.format_exc())
 
+    def __fire_keyed_child_events(
+        self,
+        node: Node,
+        parent: typing.Mapping[typing.Any, typing.Any],
+        previous: typing.Mapping[typing.Any, typing.Any],
+    ) -> None:
+        # Diff the keys and only look up the nodes of those that changed
+        children = node.children
+        for key in [key for key in previous if key not in parent]:
+            child_node = children.get(key)
+            if child_node is None or not isinstance(child_node.op, GetItem):
+                continue
+            self.__emit_removed(child_node, previous[key])
+            if self.__prune(child_node):
+                children.prune(key)
+        for key, child_value in [
+            (key, value) for key, value in parent.items()
+            if previous.get(key, MISSING) is not value
+        ]:
+            # Pruned nodes whose event is still referenced are added back
+            child_node = children[key] if key in children.detached else children.get(key)
+            if child_node is None or not isinstance(child_node.op, GetItem):
+                continue
+            prev_value = previous.get(key, MISSING)
+            try:
+                if prev_value is not MISSING and not compare.default(prev_value, child_value):
+                    continue
+            except Exception:
+                self._logger.debug("Comparison failed, emitting anyway", exc_info=True)
+            if child_node.filter is not None:
+                child_node.filter.reset(child_value)
+            child_node.event.emit(child_value)
+            if child_node.list_changes is not None:
+                self.__reset_list(child_node, child_value)
+            self.__fire_all_child_events(child_node, child_value, prev_value)
+
+    def __get_previous(self, node: Node, previous: typing.Any) -> typing.Any:
+        if previous is MISSING:
+            return MISSING
+        assert node.op is not None
+        try:
+            return node.op.get_value(previous)
+        except Exception:
+            return MISSING
+
     def __str__(self) -> str:
         return f"#<Model state={self.state}>"
 
@@ -355,8 +1335,163 @@ class Model(typing.Generic[StateT], protocols.Model[StateT]):
         return str(self)
 
 
-def build_model(initial_value: StateT) -> protocols.Model[StateT]:
-    return Model(initial_value)
+class _PropertiesObserver:
+    def __init__(
+        self,
+        paths: typing.List[
+            typing.Tuple[Event[typing.Any], typing.List[PropertyOp], compare.Comparator]
+        ],
+        get_value: typing.Callable[[typing.List[PropertyOp]], typing.Any],
+        logger: _LoggerInterface,
+    ) -> None:
+        self._rank = 0
+        self._queued = False
+        self.event: Event[typing.Tuple[typing.Any, ...]] = Event("PropertiesEvent")
+        self.__paths = paths
+        self.__get_value = get_value
+        self.__logger = logger
+        self.__tokens = [event.connect(self.__on_emit) for event, _, _ in paths]
+        self.__last: typing.List[typing.Any] = [MISSING] * len(paths)
+        self.values: typing.Optional[typing.Tuple[typing.Any, ...]] = None
+        try:
+            self.values = self.__read()
+            self.__remember(self.values)
+        except Exception:
+            # Can fail for many reasons (value doesn't exist yet is a common one)
+            logger.debug("Could not read properties", exc_info=True)
+
+    def __read(self) -> typing.Tuple[typing.Any, ...]:
+        return tuple(self.__get_value(ops) for _, ops, _ in self.__paths)
+
+    def __remember(self, values: typing.Tuple[typing.Any, ...]) -> None:
+        for i, ((_, _, comparator), value) in enumerate(zip(self.__paths, values)):
+            self.__last[i] = copy.deepcopy(value) if compare.needs_copy(comparator) else value
+
+    def __on_emit(self, __value: typing.Any) -> None:
+        if self.event._handler_count() == 0:
+            # Nobody is listening anymore
+            for token in self.__tokens:
+                token.disconnect()
+            return
+        _schedule(self)
+
+    def _propagate(self) -> None:
+        try:
+            values = self.__read()
+        except Exception:
+            self.__logger.debug("Could not read properties", exc_info=True)
+            return
+        changed = False
+        for (_, _, comparator), last, value in zip(self.__paths, self.__last, values):
+            try:
+                changed = last is MISSING or comparator(last, value)
+            except Exception:
+                changed = True
+            if changed:
+                break
+        if not changed:
+            return
+        self.__remember(values)
+        self.values = values
+        self.event.emit(values)
+
+
+@dataclass
+class _IndexState(typing.Generic[K, T]):
+    groups: typing.Dict[K, typing.Dict[typing.Any, T]] = field(default_factory=dict)
+
+
+class _Index(typing.Generic[K, T]):
+    def __init__(self, key: typing.Callable[[T], K]) -> None:
+        self.__key = key
+        self.__model: Model[_IndexState[K, T]] = Model(_IndexState())
+        # element key -> group
+        self.__groups: typing.Dict[typing.Any, K] = {}
+        # group -> number of elements
+        self.__sizes: typing.Dict[K, int] = {}
+        self.groups = self.__model.submodel(lambda x: x.groups)
+
+    def on_matches(self, matches: _PatternMatches) -> None:
+        if matches.complete:
+            self.__rebuild(matches)
+            return
+
+        # Work out the changes first so the update function only writes
+        # them, the bookkeeping is updated once they are applied.
+        moves: typing.List[typing.Tuple[typing.Any, typing.Any, typing.Any, typing.Any]] = []
+        sizes: typing.Dict[K, int] = {}
+        for (elem_key,), value in matches.values.items():
+            old_group = self.__groups.get(elem_key, MISSING)
+            group = MISSING if value is MISSING else self.__key(value)
+            if old_group is not MISSING and (group is MISSING or old_group != group):
+                sizes[old_group] = sizes.get(old_group, self.__sizes[old_group]) - 1
+            if group is not MISSING and (old_group is MISSING or old_group != group):
+                sizes[group] = sizes.get(group, self.__sizes.get(group, 0)) + 1
+            if old_group is not MISSING or group is not MISSING:
+                moves.append((elem_key, old_group, group, value))
+        if not moves:
+            return
+
+        def update(x: _IndexState[K, T]) -> None:
+            added: typing.Dict[K, typing.Dict[typing.Any, T]] = {}
+            for elem_key, old_group, group, value in moves:
+                if old_group is not MISSING and old_group != group and sizes[old_group]:
+                    x.groups[old_group].pop(elem_key)
+                if group is MISSING:
+                    continue
+                if group in self.__sizes:
+                    # Always emit, the element may have changed in place
+                    x.groups[group].update({elem_key: value})
+                else:
+                    added.setdefault(group, {})[elem_key] = value
+            for group, size in sizes.items():
+                if size == 0 and group in self.__sizes:
+                    x.groups.pop(group)
+            for group, elements in added.items():
+                x.groups[group] = elements
+
+        self.__model.update_state(update)
+        for elem_key, _, group, _ in moves:
+            if group is MISSING:
+                del self.__groups[elem_key]
+            else:
+                self.__groups[elem_key] = group
+        for group, size in sizes.items():
+            if size:
+                self.__sizes[group] = size
+            else:
+                self.__sizes.pop(group, None)
+
+    def __rebuild(self, matches: _PatternMatches) -> None:
+        groups: typing.Dict[K, typing.Dict[typing.Any, T]] = {}
+        self.__groups = {}
+        for (elem_key,), value in matches.values.items():
+            if value is MISSING:
+                continue
+            group = self.__key(value)
+            self.__groups[elem_key] = group
+            groups.setdefault(group, {})[elem_key] = value
+        self.__sizes = {group: len(elements) for group, elements in groups.items()}
+        self.__model.update_properties(groups=groups)
+
+
+def build_model(
+    initial_value: StateT,
+    *,
+    queue_updates: bool = False,
+    max_cascade: int = 100,
+    scheduler: typing.Optional[scheduling.Scheduler] = None,
+    thread_safe: bool = False,
+    owner_loop: typing.Optional[asyncio.AbstractEventLoop] = None,
+) -> protocols.Model[StateT]:
+    return Model(
+        initial_value,
+        queue_updates=queue_updates,
+        max_cascade=max_cascade,
+        scheduler=scheduler,
+        thread_safe=thread_safe,
+        owner_loop=owner_loop,
+    )
 
 
 class _SubModel(typing.Generic[RootStateT, StateT], protocols.Model[StateT]):
@@ -368,22 +1503,43 @@ class _SubModel(typing.Generic[RootStateT, StateT], protocols.Model[StateT]):
         self.__parent = parent
         self.__root_property = root_property
 
-    def observe(self, callback: EventCallback[StateT]) -> EventToken:
-        return self.__parent.observe_property(self.__root_property, callback)
+    def observe(self, callback: EventCallback[StateT], weak: bool = False) -> EventToken:
+        return self.__parent.observe_property(self.__root_property, callback, weak)
+
+    def derive(self, func: typing.Callable[[StateT], T]) -> Derived[T]:
+        return _collect(Derived(self, func))
 
     def observe_property(
-        self, property: typing.Callable[[StateT], T], callback: EventCallback[T]
+        self, property: typing.Callable[[StateT], T], callback: EventCallback[T], weak: bool = False
     ) -> EventToken:
         def cb(state: RootStateT) -> T:
             return property(self.__root_property(state))
 
-        return self.__parent.observe_property(cb, callback)
+        return self.__parent.observe_property(cb, callback, weak)
 
     def observe_changes(
         self, callback: typing.Callable[[typing.Optional[StateT], StateT], None]
     ) -> EventToken:
         return self.observe_property_changes(lambda x: x, callback)
 
+    def observe_properties(
+        self,
+        properties: typing.Sequence[typing.Callable[[StateT], typing.Any]],
+        callback: EventCallback[typing.Tuple[typing.Any, ...]],
+        weak: bool = False,
+    ) -> EventToken:
+        def make_property(
+            property: typing.Callable[[StateT], typing.Any]
+        ) -> typing.Callable[[RootStateT], typing.Any]:
+            def observe_properties(state: RootStateT) -> typing.Any:
+                return property(self.__root_property(state))
+
+            return observe_properties
+
+        return self.__parent.observe_properties(
+            [make_property(property) for property in properties], callback, weak
+        )
+
     def observe_property_changes(
         self,
         property: typing.Callable[[StateT], T],
@@ -394,6 +1550,65 @@ class _SubModel(typing.Generic[RootStateT, StateT], protocols.Model[StateT]):
 
         return self.__parent.observe_property_changes(cb, callback)
 
+    def observe_list_changes(
+        self,
+        property: typing.Callable[[StateT], T],
+        callback: EventCallback[typing.List[ListChange]],
+    ) -> EventToken:
+        def observe_list_changes(state: RootStateT) -> T:
+            return property(self.__root_property(state))
+
+        return self.__parent.observe_list_changes(observe_list_changes, callback)
+
+    def observe_property_removed(
+        self, property: typing.Callable[[StateT], T], callback: EventCallback[T]
+    ) -> EventToken:
+        def observe_property_removed(state: RootStateT) -> T:
+            return property(self.__root_property(state))
+
+        return self.__parent.observe_property_removed(observe_property_removed, callback)
+
+    def observe_pattern(
+        self,
+        pattern: typing.Callable[[StateT], T],
+        callback: PatternCallback[T],
+        removed: typing.Optional[typing.Callable[[typing.Any], None]] = None,
+    ) -> EventToken:
+        def observe_pattern(state: RootStateT) -> T:
+            return pattern(self.__root_property(state))
+
+        return self.__parent.observe_pattern(observe_pattern, callback, removed)
+
+    def index(
+        self,
+        collection: typing.Callable[
+            [StateT], typing.Union[typing.Mapping[typing.Any, T], typing.Sequence[T]]
+        ],
+        key: typing.Callable[[T], K],
+    ) -> protocols.Model[typing.Dict[K, typing.Dict[typing.Any, T]]]:
+        def index(
+            state: RootStateT,
+        ) -> typing.Union[typing.Mapping[typing.Any, T], typing.Sequence[T]]:
+            return collection(self.__root_property(state))
+
+        return self.__parent.index(index, key)
+
+    def set_property_filter(
+        self, property: typing.Callable[[StateT], T], change_filter: typing.Optional[ChangeFilter]
+    ) -> None:
+        def set_property_filter(state: RootStateT) -> T:
+            return property(self.__root_property(state))
+
+        self.__parent.set_property_filter(set_property_filter, change_filter)
+
+    def set_property_keyed(
+        self, property: typing.Callable[[StateT], T], keyed: bool = True
+    ) -> None:
+        def set_property_keyed(state: RootStateT) -> T:
+            return property(self.__root_property(state))
+
+        self.__parent.set_property_keyed(set_property_keyed, keyed)
+
     def update_state(self, func: StateUpdateCallback[StateT]) -> None:
         return self.__parent.update_state_root(self.__root_property, func)
 
@@ -436,6 +1651,10 @@ class _SubModel(typing.Generic[RootStateT, StateT], protocols.Model[StateT]):
 
         return self.__parent.wait_for_property_change(wait_for_property_change)
 
+    def read_view(self) -> ReadView[StateT]:
+        view = self.__parent.read_view()
+        return ReadView(self.__root_property(_unwrap(view.state)), view.release)
+
     def snapshot(self) -> StateT:
         return self.__parent.snapshot_property(self.__root_property)
 
@@ -0,0 +1,253 @@
+"""Streaming operators.
+
+A Stream wraps an Event and derives new streams from it. Every operator
+processes a value in O(1), including the rolling aggregates, and nothing
+needs an async task:
+
+    prices = streaming.from_model(model, lambda x: x.price)
+    prices.rolling_min(10).zip(prices.rolling_max(10)).bind(
+        model.submodel(lambda x: x.range))
+
+Stages are connected to their upstream for as long as it lives. close()
+disconnects a stage, and any upstream stage left without subscribers.
+"""
+
+import math
+import typing
+from collections import deque
+
+from soso.state import protocols
+from soso.state.event import Event, EventCallback, EventToken
+
+__all__ = ["Stream", "from_model"]
+
+T = typing.TypeVar("T")
+U = typing.TypeVar("U")
+StateT = typing.TypeVar("StateT")
+
+# A stream this one is connected to
+_Upstream = typing.Tuple["Stream[typing.Any]", EventToken]
+
+
+class Stream(typing.Generic[T]):
+    def __init__(self, event: Event[T], upstream: typing.Sequence[_Upstream] = ()) -> None:
+        self.event = event
+        self.__upstream = list(upstream)
+
+    def connect(self, callback: EventCallback[T]) -> EventToken:
+        return self.event.connect(callback)
+
+    def bind(self, sink: protocols.Model[T]) -> EventToken:
+        """Restore every value into sink"""
+        return self.event.connect(sink.restore)
+
+    def close(self) -> None:
+        upstream, self.__upstream = self.__upstream, []
+        for stream, token in upstream:
+            token.disconnect()
+            if not stream.event._handler_count():
+                stream.close()
+
+    def __then(
+        self, name: str, make: typing.Callable[[Event[U]], EventCallback[T]]
+    ) -> "Stream[U]":
+        event: Event[U] = Event(f"{self.event._name}::{name}")
+        token = self.event.connect(make(event))
+        return Stream(event, [(self, token)])
+
+    def map(self, func: typing.Callable[[T], U]) -> "Stream[U]":
+        return self.__then("map", lambda event: lambda value: event.emit(func(value)))
+
+    def filter(self, predicate: typing.Callable[[T], bool]) -> "Stream[T]":
+        def make(event: Event[T]) -> EventCallback[T]:
+            def on_value(value: T) -> None:
+                if predicate(value):
+                    event.emit(value)
+
+            return on_value
+
+        return self.__then("filter", make)
+
+    def scan(self, func: typing.Callable[[U, T], U], initial: U) -> "Stream[U]":
+        """Emit func(accumulated, value) for each value"""
+
+        def make(event: Event[U]) -> EventCallback[T]:
+            accumulated = initial
+
+            def on_value(value: T) -> None:
+                nonlocal accumulated
+                accumulated = func(accumulated, value)
+                event.emit(accumulated)
+
+            return on_value
+
+        return self.__then("scan", make)
+
+    def zip(self, other: "Stream[U]") -> "Stream[typing.Tuple[T, U]]":
+        """Pair the values of both streams in the order they were emitted"""
+        event: Event[typing.Tuple[T, U]] = Event(f"{self.event._name}::zip")
+        left: typing.Deque[T] = deque()
+        right: typing.Deque[U] = deque()
+
+        def emit() -> None:
+            if left and right:
+                event.emit((left.popleft(), right.popleft()))
+
+        def on_left(value: T) -> None:
+            left.append(value)
+            emit()
+
+        def on_right(value: U) -> None:
+            right.append(value)
+            emit()
+
+        tokens: typing.List[_Upstream] = [
+            (self, self.event.connect(on_left)),
+            (other, other.event.connect(on_right)),
+        ]
+        return Stream(event, tokens)
+
+    def window(self, n: int) -> "Stream[typing.Tuple[T, ...]]":
+        """Emit the last n values once n values have been seen"""
+
+        def make(event: Event[typing.Tuple[T, ...]]) -> EventCallback[T]:
+            values: typing.Deque[T] = deque(maxlen=n)
+
+            def on_value(value: T) -> None:
+                values.append(value)
+                if len(values) == n:
+                    event.emit(tuple(values))
+
+            return on_value
+
+        return self.__then("window", make)
+
+    def rolling_min(self, n: int) -> "Stream[T]":
+        return self.__then("rolling_min", lambda event: _RollingExtreme(n, event, smallest=True))
+
+    def rolling_max(self, n: int) -> "Stream[T]":
+        return self.__then("rolling_max", lambda event: _RollingExtreme(n, event, smallest=False))
+
+    def rolling_sum(self, n: int) -> "Stream[float]":
+        return self.__rolling("rolling_sum", n, _RollingMoments.sum)
+
+    def rolling_mean(self, n: int) -> "Stream[float]":
+        return self.__rolling("rolling_mean", n, _RollingMoments.mean)
+
+    def rolling_std(self, n: int, ddof: int = 1) -> "Stream[float]":
+        return self.__rolling("rolling_std", n, lambda moments: moments.std(ddof))
+
+    def __rolling(
+        self, name: str, n: int, aggregate: typing.Callable[["_RollingMoments"], float]
+    ) -> "Stream[float]":
+        def make(event: Event[float]) -> EventCallback[T]:
+            moments = _RollingMoments(n)
+
+            def on_value(value: T) -> None:
+                moments.add(typing.cast(float, value))
+                if moments.full:
+                    event.emit(aggregate(moments))
+
+            return on_value
+
+        return self.__then(name, make)
+
+
+def from_model(
+    model: protocols.Model[StateT],
+    property: typing.Optional[typing.Callable[[StateT], T]] = None,
+) -> Stream[typing.Any]:
+    """A stream of the values of model, or of a property of it"""
+    if property is None:
+        return Stream(model.wait_for())
+    return Stream(model.wait_for_property(property))
+
+
+class _RollingExtreme(typing.Generic[T]):
+    # Monotonic deque of (index, value), the extreme is always at the front
+    def __init__(self, n: int, event: Event[T], smallest: bool) -> None:
+        self.__n = n
+        self.__event = event
+        self.__smallest = smallest
+        self.__count = 0
+        self.__values: typing.Deque[typing.Tuple[int, T]] = deque()
+
+    def __call__(self, value: T) -> None:
+        values = self.__values
+        index = self.__count
+        self.__count += 1
+        if self.__smallest:
+            while values and not values[-1][1] < value:  # type: ignore
+                values.pop()
+        else:
+            while values and not values[-1][1] > value:  # type: ignore
+                values.pop()
+        values.append((index, value))
+        if values[0][0] <= index - self.__n:
+            values.popleft()
+        if self.__count >= self.__n:
+            self.__event.emit(values[0][1])
+
+
+class _RollingMoments:
+    """Sum, mean and variance of the last n values, updated incrementally.
+
+    Recomputed from scratch every n values so that rounding errors do not
+    accumulate, which is still O(1) amortized.
+    """
+
+    def __init__(self, n: int) -> None:
+        self.__n = n
+        self.__values: typing.Deque[float] = deque()
+        self.__sum = 0.0
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__until_exact = n
+
+    @property
+    def full(self) -> bool:
+        return len(self.__values) == self.__n
+
+    def add(self, value: float) -> None:
+        values = self.__values
+        if len(values) == self.__n:
+            self.__remove(values.popleft())
+        values.append(value)
+        count = len(values)
+        self.__sum += value
+        delta = value - self.__mean
+        self.__mean += delta / count
+        self.__m2 += delta * (value - self.__mean)
+
+        self.__until_exact -= 1
+        if self.__until_exact <= 0:
+            self.__until_exact = self.__n
+            self.__recompute()
+
+    def __remove(self, value: float) -> None:
+        count = len(self.__values)
+        self.__sum -= value
+        if count == 0:
+            self.__mean = self.__m2 = 0.0
+            return
+        delta = value - self.__mean
+        self.__mean -= delta / count
+        self.__m2 -= delta * (value - self.__mean)
+
+    def __recompute(self) -> None:
+        values = self.__values
+        self.__sum = math.fsum(values)
+        self.__mean = self.__sum / len(values)
+        self.__m2 = math.fsum((v - self.__mean) ** 2 for v in values)
+
+    def sum(self) -> float:
+        return self.__sum
+
+    def mean(self) -> float:
+        return self.__mean
+
+    def std(self, ddof: int) -> float:
+        count = len(self.__values)
+        if count - ddof <= 0:
+            return math.nan
+        return math.sqrt(max(self.__m2, 0.0) / (count - ddof))
@@ -1,9 +1,132 @@
-import math
 import typing
-from collections.abc import Mapping, Sequence
-from dataclasses import dataclass, fields, is_dataclass
+from collections.abc import MutableMapping, MutableSequence
+from dataclasses import dataclass, field, fields, is_dataclass
 
-_basic_types = (int, float, str)
+from soso.state import compare
+
+
+class _Missing:
+    def __repr__(self) -> str:
+        return "<MISSING>"
+
+
+# Value of a key or attribute that does not exist
+MISSING: typing.Any = _Missing()
+
+
+class _Wildcard:
+    def __repr__(self) -> str:
+        return "ANY"
+
+
+# Wildcard key for pattern subscriptions, e.g., x.orders[ANY].price
+ANY: typing.Any = _Wildcard()
+
+
+@dataclass(frozen=True)
+class ListChange:
+    """Items removed at start of a sequence were replaced with inserted.
+
+    An append is ListChange(len(seq), 0, [value]), setting seq[i] is
+    ListChange(i, 1, [value]), and clearing it is ListChange(0, len(seq), []).
+    """
+
+    start: int
+    # Number of items removed
+    removed: int
+    # Copy of the items inserted in their place
+    inserted: typing.Sequence[typing.Any]
+
+    @property
+    def removed_range(self) -> range:
+        """Indices of the removed items before the change"""
+        return range(self.start, self.start + self.removed)
+
+    @property
+    def inserted_range(self) -> range:
+        """Indices of the inserted items after the change"""
+        return range(self.start, self.start + len(self.inserted))
+
+
+# Given a receiver and the arguments of one of its methods, where the call
+# will splice it and how many items it will remove. The number of inserted
+# items follows from its length after the call.
+_Splice = typing.Callable[[typing.Any, typing.Tuple[typing.Any, ...]], typing.Tuple[int, int]]
+
+
+def _splice_append(seq: typing.Any, args: typing.Tuple[typing.Any, ...]) -> typing.Tuple[int, int]:
+    return len(seq), 0
+
+
+def _splice_insert(seq: typing.Any, args: typing.Tuple[typing.Any, ...]) -> typing.Tuple[int, int]:
+    index, size = args[0], len(seq)
+    if index < 0:
+        index = max(index + size, 0)
+    return min(index, size), 0
+
+
+def _splice_pop(seq: typing.Any, args: typing.Tuple[typing.Any, ...]) -> typing.Tuple[int, int]:
+    index = args[0] if args else -1
+    return (index + len(seq) if index < 0 else index), 1
+
+
+def _splice_remove(seq: typing.Any, args: typing.Tuple[typing.Any, ...]) -> typing.Tuple[int, int]:
+    return seq.index(args[0]), 1
+
+
+def _splice_all(seq: typing.Any, args: typing.Tuple[typing.Any, ...]) -> typing.Tuple[int, int]:
+    return 0, len(seq)
+
+
+_splices: typing.Dict[str, _Splice] = {
+    "append": _splice_append,
+    "extend": _splice_append,
+    "insert": _splice_insert,
+    "pop": _splice_pop,
+    "remove": _splice_remove,
+    # Reported as replacing every item
+    "clear": _splice_all,
+    "reverse": _splice_all,
+    "sort": _splice_all,
+}
+
+# Sequence types whose changes are recorded -> their recorded methods
+_sequences: typing.Dict[type, typing.FrozenSet[str]] = {}
+
+
+def _register_sequence(klass: type, methods: typing.Iterable[str]) -> None:
+    """Record ListChanges for calls to methods of klass and slice assignment"""
+    methods = frozenset(methods)
+    assert methods <= _splices.keys(), methods - _splices.keys()
+    _sequences[klass] = methods
+
+
+_register_sequence(list, _splices.keys())
+
+
+def _sequence_methods(obj: typing.Any) -> typing.Optional[typing.FrozenSet[str]]:
+    for klass in type(obj).__mro__:
+        methods = _sequences.get(klass)
+        if methods is not None:
+            return methods
+    return None
+
+
+def _splice_slice(obj: typing.Any, key: slice, mutate: typing.Callable[[], None]) -> ListChange:
+    # The change made by mutate() to obj[key] of a sequence
+    before = len(obj)
+    start, stop, step = key.indices(before)
+    if step != 1:
+        # Extended slices are reported as replacing the span they cover
+        indices = range(start, stop, step)
+        if indices:
+            start, stop = min(indices), max(indices) + 1
+        else:
+            stop = start
+    removed = max(stop - start, 0)
+    mutate()
+    inserted = len(obj) - before + removed
+    return ListChange(start, removed, obj[start:start + inserted])
 
 
 class PropertyOp(typing.Protocol):
@@ -24,49 +147,299 @@ class PropertyOp(typing.Protocol):
 def delta(base: typing.Any,
           new: typing.Any,
           prefix: typing.Optional[typing.List[PropertyOp]] = None) -> typing.List[PropertyOp]:
-    if prefix is None:
-        prefix = []
+    """The statements that turn base into new, e.g., [GetAttr('a'), SetItem(2, 2)].
+
+    base and new are dataclasses, mappings, lists or 1-d numpy arrays of
+    the same type. Values that are the same object are skipped without
+    comparing them, so when new shares its unchanged parts with base (as
+    read views do), the cost follows the size of the difference. Keys are
+    added and deleted, lists are resized with one splice and arrays are
+    compared in bulk.
+    """
+    if not _diffable(base, new):
+        raise NotImplementedError("Unhandled types: %s, %s" % (type(base), type(new)))
     ret: typing.List[PropertyOp] = []
+    _delta(base, new, [] if prefix is None else prefix, ret)
+    return ret
+
+
+# Lists are first compared in chunks of this many items at C speed
+_CHUNK = 256
 
+
+def _diffable(base: typing.Any, new: typing.Any) -> bool:
+    if type(base) is not type(new) or isinstance(base, (str, bytes)):
+        return False
+    return (
+        (is_dataclass(base) and not isinstance(base, type))
+        or isinstance(base, (MutableMapping, MutableSequence))
+        or _is_array(base)
+    )
+
+
+def _is_array(value: typing.Any) -> bool:
+    # numpy arrays and array backed sequences, e.g., Column
+    return hasattr(value, "__array__") and hasattr(value, "dtype")
+
+
+def _delta(
+    base: typing.Any, new: typing.Any, prefix: typing.List[PropertyOp], ret: typing.List[PropertyOp]
+) -> bool:
+    # Returns False if new can't be reached by modifying base
+    if base is new:
+        return True
     if is_dataclass(base):
-        assert is_dataclass(new)
         for f in fields(base):
             basevalue = getattr(base, f.name)
             newvalue = getattr(new, f.name)
-            if basevalue != newvalue:
-                if isinstance(basevalue, _basic_types) or newvalue is None:
-                    ret.append(SetAttr(f.name, newvalue))
-                elif isinstance(base, Sequence):
-                    ret.append(SetAttr(f.name, newvalue))
-                else:
-                    ret.extend(delta(basevalue, newvalue, prefix + [GetAttr(f.name)]))
-    elif isinstance(base, Sequence):
-        assert isinstance(new, Sequence)
-        assert len(base) == len(new)
-        idx = 0
-        for baseval, newval in zip(base, new):
-            if baseval != newval:
-                if isinstance(baseval, _basic_types) or newval is None:
-                    ret.extend(prefix + [SetItem(idx, newval)])
-                else:
-                    ret.extend(delta(baseval, newval, prefix + [GetItem(idx)]))
-            idx += 1
-    elif isinstance(base, Mapping):
-        assert isinstance(new, Mapping)
-        for key in base.keys():
-            baseval = base.get(key)
-            if key not in new:
+            if basevalue is newvalue:
                 continue
-            newval = new.get(key)
-            if baseval != newval:
-                if isinstance(baseval, _basic_types) or newval is None:
-                    ret.extend(prefix + [SetItem(key, newval)])
-                else:
-                    ret.extend(delta(baseval, newval, prefix + [GetItem(key)]))
+            comparator = compare.for_field(base, f.name)
+            if comparator is not compare.default:
+                # A field with its own comparator is treated as a single value
+                if comparator(basevalue, newvalue):
+                    ret.extend(prefix + [SetAttr(f.name, newvalue)])
+            else:
+                _delta_child(basevalue, newvalue, prefix, GetAttr(f.name),
+                             SetAttr(f.name, newvalue), ret)
+    elif _is_array(base):
+        return _delta_array(base, new, prefix, ret)
+    elif isinstance(base, MutableSequence):
+        _delta_sequence(base, new, prefix, ret)
     else:
-        raise NotImplementedError("Unhandled types: %s", type(base))
-
-    return ret
+        _delta_mapping(base, new, prefix, ret)
+    return True
+
+
+def _delta_child(
+    base: typing.Any,
+    new: typing.Any,
+    prefix: typing.List[PropertyOp],
+    get_op: PropertyOp,
+    set_op: PropertyOp,
+    ret: typing.List[PropertyOp],
+) -> None:
+    if _diffable(base, new) and _delta(base, new, prefix + [get_op], ret):
+        return
+    if _is_array(base) or _is_array(new):
+        changed = compare.array_equal(base, new)
+    else:
+        changed = compare.default(base, new)
+    if changed:
+        ret.extend(prefix + [set_op])
+
+
+def _same(base: typing.Any, new: typing.Any) -> bool:
+    try:
+        return base is new or not compare.default(base, new)
+    except Exception:
+        return False
+
+
+def _delta_sequence(
+    base: typing.MutableSequence[typing.Any],
+    new: typing.MutableSequence[typing.Any],
+    prefix: typing.List[PropertyOp],
+    ret: typing.List[PropertyOp],
+) -> None:
+    size, new_size = len(base), len(new)
+    if size == new_size:
+        _delta_items(base, new, 0, 0, size, prefix, ret)
+        return
+
+    # Trim the common head and tail, then find the fewest insertions and
+    # deletions between them. Past _MAX_EDITS the whole middle is one gap.
+    common = min(size, new_size)
+    start = _follow(base, new, 0, 0, common)
+    end = _follow_back(base, new, size, new_size, common - start)
+    stop, new_stop = size - end, new_size - end
+    gaps = _edit_gaps(base, new, start, stop, start, new_stop)
+    if gaps is None:
+        gaps = [(start, stop, start, new_stop)]
+
+    # Earlier gaps are applied first, so positions are those of new
+    for lo, hi, new_lo, new_hi in gaps:
+        overlap = min(hi - lo, new_hi - new_lo)
+        _delta_items(base, new, lo, new_lo, overlap, prefix, ret)
+        pos = new_lo + overlap
+        if hi - lo > overlap:
+            ret.extend(prefix + [DelItem(slice(pos, new_lo + hi - lo))])
+        elif new_hi > pos:
+            if hi == size:
+                ret.extend(prefix + [GetAttr("extend"), Call((new[pos:new_hi],), {})])
+            else:
+                ret.extend(prefix + [SetItem(slice(pos, pos), new[pos:new_hi])])
+
+
+# Maximum number of insertions and deletions looked for by _edit_gaps
+_MAX_EDITS = 64
+
+
+def _edit_gaps(
+    base: typing.Sequence[typing.Any],
+    new: typing.Sequence[typing.Any],
+    lo: int,
+    hi: int,
+    new_lo: int,
+    new_hi: int,
+) -> typing.Optional[typing.List[typing.Tuple[int, int, int, int]]]:
+    # The unmatched (lo, hi, new_lo, new_hi) ranges of base[lo:hi] and
+    # new[new_lo:new_hi] in the shortest edit script (Myers' O(ND) diff)
+    n, m = hi - lo, new_hi - new_lo
+    v = {1: 0}
+    trace = []
+    for d in range(min(n + m, _MAX_EDITS) + 1):
+        trace.append(dict(v))
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[k - 1] < v[k + 1]):
+                x = v[k + 1]
+            else:
+                x = v[k - 1] + 1
+            y = x - k
+            if x < n and y < m:
+                x += _follow(base, new, lo + x, new_lo + y, min(n - x, m - y))
+            v[k] = x
+            if x >= n and x - k >= m:
+                return _gaps(trace, n, m, lo, new_lo)
+    return None
+
+
+def _gaps(
+    trace: typing.List[typing.Dict[int, int]], x: int, y: int, lo: int, new_lo: int
+) -> typing.List[typing.Tuple[int, int, int, int]]:
+    gaps: typing.List[typing.Tuple[int, int, int, int]] = []
+    gap_end = (x, y)
+    for d in range(len(trace) - 1, -1, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[k - 1] < v[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = max(v[prev_k], 0)
+        prev_y = max(prev_x - prev_k, 0)
+        # The diagonal ending at (x, y) is matched
+        snake = min(x - prev_x, y - prev_y)
+        if snake and (x, y) != gap_end:
+            gaps.append((lo + x, lo + gap_end[0], new_lo + y, new_lo + gap_end[1]))
+        if snake:
+            gap_end = (x - snake, y - snake)
+        x, y = prev_x, prev_y
+    if gap_end != (0, 0):
+        gaps.append((lo, lo + gap_end[0], new_lo, new_lo + gap_end[1]))
+    gaps.reverse()
+    return gaps
+
+
+def _chunk(base: typing.Sequence[typing.Any]) -> int:
+    return _CHUNK if isinstance(base, list) else 1
+
+
+def _delta_items(
+    base: typing.Sequence[typing.Any],
+    new: typing.Sequence[typing.Any],
+    lo: int,
+    new_lo: int,
+    count: int,
+    prefix: typing.List[PropertyOp],
+    ret: typing.List[PropertyOp],
+) -> None:
+    # Diff base[lo:lo + count] with new[new_lo:new_lo + count], which is
+    # at new_lo in the sequence being modified
+    chunk = _chunk(base)
+    for offset in range(0, count, chunk):
+        n = min(chunk, count - offset)
+        i, j = lo + offset, new_lo + offset
+        if chunk > 1 and _same(base[i:i + n], new[j:j + n]):
+            continue
+        for i, j in zip(range(i, i + n), range(j, j + n)):
+            baseval, newval = base[i], new[j]
+            if baseval is not newval:
+                _delta_child(baseval, newval, prefix, GetItem(j), SetItem(j, newval), ret)
+
+
+def _follow(
+    base: typing.Sequence[typing.Any], new: typing.Sequence[typing.Any], i: int, j: int, limit: int
+) -> int:
+    # Number of equal items from base[i] and new[j] on, at most limit
+    chunk = _chunk(base)
+    count = 0
+    while chunk > 1 and count + chunk <= limit and _same(
+        base[i + count:i + count + chunk], new[j + count:j + count + chunk]
+    ):
+        count += chunk
+    while count < limit and _same(base[i + count], new[j + count]):
+        count += 1
+    return count
+
+
+def _follow_back(
+    base: typing.Sequence[typing.Any], new: typing.Sequence[typing.Any], i: int, j: int, limit: int
+) -> int:
+    # Number of equal items before base[i] and new[j], at most limit
+    chunk = _chunk(base)
+    count = 0
+    while chunk > 1 and count + chunk <= limit and _same(
+        base[i - count - chunk:i - count], new[j - count - chunk:j - count]
+    ):
+        count += chunk
+    while count < limit and _same(base[i - count - 1], new[j - count - 1]):
+        count += 1
+    return count
+
+
+def _delta_mapping(
+    base: typing.MutableMapping[typing.Any, typing.Any],
+    new: typing.Mapping[typing.Any, typing.Any],
+    prefix: typing.List[PropertyOp],
+    ret: typing.List[PropertyOp],
+) -> None:
+    removed = base.keys() - new.keys()
+    if removed:
+        # In the order of base
+        for key in base:
+            if key in removed:
+                ret.extend(prefix + [DelItem(key)])
+    for key, newval in new.items():
+        baseval = base.get(key, MISSING)
+        if baseval is newval:
+            continue
+        if baseval is MISSING:
+            ret.extend(prefix + [SetItem(key, newval)])
+        else:
+            _delta_child(baseval, newval, prefix, GetItem(key), SetItem(key, newval), ret)
+
+
+def _delta_array(
+    base: typing.Any, new: typing.Any, prefix: typing.List[PropertyOp], ret: typing.List[PropertyOp]
+) -> bool:
+    import numpy as np
+
+    old_values, new_values = np.asarray(base), np.asarray(new)
+    if old_values.ndim != 1 or new_values.ndim != 1 or old_values.dtype != new_values.dtype:
+        return False
+    size = len(old_values)
+    growable = "extend" in (_sequence_methods(base) or ())
+    if len(new_values) != size and not (len(new_values) > size and growable):
+        return False
+
+    old_common, new_common = old_values[:size], new_values[:size]
+    changed = old_common != new_common
+    if old_values.dtype.kind in "fc":
+        changed &= ~(np.isnan(old_common) & np.isnan(new_common))
+    elif old_values.dtype.kind in "mM":
+        changed &= ~(np.isnat(old_common) & np.isnat(new_common))
+    indices = np.flatnonzero(changed)
+    if len(indices):
+        # One slice assignment per run of changed items
+        breaks = np.flatnonzero(np.diff(indices) != 1)
+        starts = indices[np.concatenate(([0], breaks + 1))]
+        stops = indices[np.concatenate((breaks, [len(indices) - 1]))] + 1
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            ret.extend(prefix + [SetItem(slice(start, stop), new_values[start:stop].copy())])
+    if len(new_values) > size:
+        ret.extend(prefix + [GetAttr("extend"), Call((new_values[size:].copy(),), {})])
+    return True
 
 
 class Proxy:
@@ -79,6 +452,12 @@ class Proxy:
         else:
             self._proxy_ops.append(SetAttr(name, value))
 
+    def __delattr__(self, name: str) -> None:
+        if name == '_proxy_ops':
+            super().__delattr__(name)
+        else:
+            self._proxy_ops.append(DelAttr(name))
+
     def __getattr__(self, name: str) -> typing.Any:
         if name == '_proxy_ops':
             super().__getattribute__(name)
@@ -89,6 +468,9 @@ class Proxy:
     def __setitem__(self, key: typing.Any, value: typing.Any) -> None:
         self._proxy_ops.append(SetItem(key, value))
 
+    def __delitem__(self, key: typing.Any) -> None:
+        self._proxy_ops.append(DelItem(key))
+
     def __getitem__(self, key: typing.Any) -> "Proxy":
         self._proxy_ops.append(GetItem(key))
         return self
@@ -119,15 +501,18 @@ class GetAttr:
 class SetAttr:
     key: typing.Any
     value: typing.Any
+    # The value that was replaced by execute()
+    previous: typing.Any = field(default=MISSING, init=False, repr=False, compare=False)
 
     def execute(self, obj: typing.Any) -> typing.Tuple[typing.Optional[typing.Any], bool]:
         curr_value = getattr(obj, self.key)
-        changed = curr_value != self.value
-        if changed and isinstance(curr_value, float) and isinstance(self.value, float):
-            # At least one should not be NaN
-            changed = not math.isnan(curr_value) or not math.isnan(self.value)
-        if changed:
+        changed = compare.for_field(obj, self.key)(curr_value, self.value)
+        # The comparator only decides whether to emit, the value is always
+        # stored
+        if curr_value is not self.value:
             setattr(obj, self.key, self.value)
+        if changed:
+            self.previous = curr_value
         return None, changed
 
     def execute_raw(self, obj: typing.Any) -> typing.Optional[typing.Any]:
@@ -156,18 +541,32 @@ class GetItem:
 class SetItem:
     key: typing.Any
     value: typing.Any
+    # The value that was replaced by execute()
+    previous: typing.Any = field(default=MISSING, init=False, repr=False, compare=False)
+
+    # The change to obj if it is a registered sequence
+    change: typing.Optional[ListChange] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def execute(self, obj: typing.Any) -> typing.Tuple[typing.Optional[typing.Any], bool]:
+        if isinstance(self.key, slice) and _sequence_methods(obj) is not None:
+            self.change = _splice_slice(
+                obj, self.key, lambda: obj.__setitem__(self.key, self.value)
+            )
+            return None, True
         try:
             curr_value = obj[self.key]
-            changed = curr_value != self.value
-            if changed and isinstance(curr_value, float):
-                # At least one should not be NaN
-                changed = not math.isnan(curr_value) or not math.isnan(self.value)
+            changed = compare.default(curr_value, self.value)
         except KeyError:
+            curr_value = MISSING
             changed = True
         if changed:
+            self.previous = curr_value
             obj[self.key] = self.value
+            if isinstance(self.key, int) and _sequence_methods(obj) is not None:
+                index = self.key if self.key >= 0 else self.key + len(obj)
+                self.change = ListChange(index, 1, obj[index:index + 1])
         return None, changed
 
     def execute_raw(self, obj: typing.Any) -> typing.Optional[typing.Any]:
@@ -178,14 +577,79 @@ class SetItem:
         return obj[self.key]
 
 
+@dataclass
+class DelAttr:
+    key: typing.Any
+    # The value that was deleted by execute()
+    previous: typing.Any = field(default=MISSING, init=False, repr=False, compare=False)
+
+    def execute(self, obj: typing.Any) -> typing.Tuple[typing.Optional[typing.Any], bool]:
+        self.previous = getattr(obj, self.key, MISSING)
+        delattr(obj, self.key)
+        return None, True
+
+    def execute_raw(self, obj: typing.Any) -> typing.Optional[typing.Any]:
+        delattr(obj, self.key)
+        return None
+
+    def get_value(self, obj: typing.Any) -> typing.Optional[typing.Any]:
+        return getattr(obj, self.key)
+
+
+@dataclass
+class DelItem:
+    key: typing.Any
+    # The value that was deleted by execute()
+    previous: typing.Any = field(default=MISSING, init=False, repr=False, compare=False)
+    # The change to obj if it is a registered sequence
+    change: typing.Optional[ListChange] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    def execute(self, obj: typing.Any) -> typing.Tuple[typing.Optional[typing.Any], bool]:
+        if _sequence_methods(obj) is None:
+            self.previous = obj[self.key]
+            del obj[self.key]
+        elif isinstance(self.key, slice):
+            self.change = _splice_slice(obj, self.key, lambda: obj.__delitem__(self.key))
+        else:
+            index = self.key if self.key >= 0 else self.key + len(obj)
+            self.previous = obj[index]
+            del obj[index]
+            self.change = ListChange(index, 1, obj[index:index])
+        return None, True
+
+    def execute_raw(self, obj: typing.Any) -> typing.Optional[typing.Any]:
+        del obj[self.key]
+        return None
+
+    def get_value(self, obj: typing.Any) -> typing.Any:
+        return obj[self.key]
+
+
 @dataclass
 class Call:
     args: typing.Tuple[typing.Any, ...]
     kwargs: typing.Dict[str, typing.Any]
     key: str = '__call__'
+    # The change to the receiver if obj is a method of a registered sequence
+    change: typing.Optional[ListChange] = field(
+        default=None, init=False, repr=False, compare=False
+    )
 
     def execute(self, obj: typing.Any) -> typing.Tuple[typing.Optional[typing.Any], bool]:
-        return obj(*self.args, **self.kwargs), True
+        # A call always ends the statement, e.g. x.d.pop(key) returns a value
+        receiver: typing.Any = getattr(obj, "__self__", None)
+        methods = _sequence_methods(receiver)
+        if methods is None or obj.__name__ not in methods:
+            obj(*self.args, **self.kwargs)
+            return None, True
+        before = len(receiver)
+        start, removed = _splices[obj.__name__](receiver, self.args)
+        obj(*self.args, **self.kwargs)
+        inserted = len(receiver) - before + removed
+        self.change = ListChange(start, removed, receiver[start:start + inserted])
+        return None, True
 
     def execute_raw(self, obj: typing.Any) -> typing.Optional[typing.Any]:
         return obj(*self.args, **self.kwargs)
@@ -0,0 +1,161 @@
+import copy
+import inspect
+import types
+import typing
+import weakref
+from collections.abc import Mapping, Sequence
+from dataclasses import is_dataclass
+
+from soso.state import util
+
+__all__ = ["ReadOnly", "ReadView"]
+
+T = typing.TypeVar("T")
+
+
+class ReadView(typing.Generic[T]):
+    """A consistent version of a model's state at the time it was taken.
+
+    Later updates to the model do not change it, the model copies the parts
+    of the state it writes to while views are alive instead. The state is
+    a ReadOnly proxy of the version, unless it is immutable, e.g., a number.
+    The version is released when the view
+    is garbage collected or when release() is called, after which it is no
+    longer protected from updates. Use Model.read_view to create:
+
+        with model.read_view() as state:
+            risk = calculate(state.positions, state.prices)
+    """
+
+    def __init__(self, state: T, release: typing.Callable[[], None]) -> None:
+        self.__state: ReadOnly[T] = _read_only(state)
+        self.__finalizer = weakref.finalize(self, release)
+
+    @property
+    def state(self) -> "ReadOnly[T]":
+        return self.__state
+
+    def release(self) -> None:
+        self.__finalizer()
+
+    def __enter__(self) -> "ReadOnly[T]":
+        return self.__state
+
+    def __exit__(self, *args: typing.Any) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return str(self)
+
+    def __str__(self) -> str:
+        return f"#<ReadView state={self.__state}>"
+
+
+def _read_only(value: typing.Any) -> typing.Any:
+    if isinstance(value, ReadOnly):
+        return value
+    if is_dataclass(value) and not isinstance(value, type):
+        return _ReadOnlyObject(value)
+    if isinstance(value, Mapping):
+        return _ReadOnlyMapping(value)
+    if isinstance(value, (str, bytes)):
+        return value
+    if isinstance(value, Sequence) or util._sequence_methods(value) is not None:
+        return _ReadOnlySequence(value)
+    if util._is_array(value) and hasattr(value, "flags"):
+        array = value.view()
+        array.flags.writeable = False
+        return array
+    return value
+
+
+def _unwrap(value: typing.Any) -> typing.Any:
+    return value._value if isinstance(value, ReadOnly) else value
+
+
+class ReadOnly(typing.Generic[T]):
+    """A read-only proxy for a value of type T in a read view.
+
+    Reads work as on the value, and return proxies for the dataclasses,
+    mappings and sequences (including lists and columns) they reach, while
+    writes raise. Arrays are returned as views that are not writeable.
+    Being proxies, they are not instances of T, e.g., for isinstance or
+    dataclasses.asdict; copy.deepcopy returns a writable copy of the value.
+    """
+
+    __slots__ = ("_value",)
+    _value: typing.Any
+
+    def __init__(self, value: T) -> None:
+        object.__setattr__(self, "_value", value)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        raise AttributeError("Read views cannot be modified")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Read views cannot be modified")
+
+    def __deepcopy__(self, memo: typing.Dict[int, typing.Any]) -> T:
+        return typing.cast(T, copy.deepcopy(self._value, memo))
+
+    def __eq__(self, other: typing.Any) -> bool:
+        return bool(self._value == _unwrap(other))
+
+    def __ne__(self, other: typing.Any) -> bool:
+        return bool(self._value != _unwrap(other))
+
+    def __repr__(self) -> str:
+        return repr(self._value)
+
+    __hash__ = None  # type: ignore
+
+    if typing.TYPE_CHECKING:
+        # Reads return proxies, so they are not typed as on T
+        def __getattr__(self, name: str) -> typing.Any: ...
+
+        def __getitem__(self, key: typing.Any) -> typing.Any: ...
+
+        def __iter__(self) -> typing.Iterator[typing.Any]: ...
+
+        def __len__(self) -> int: ...
+
+
+class _ReadOnlyObject(ReadOnly[typing.Any]):
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> typing.Any:
+        value = getattr(self._value, name)
+        if inspect.ismethod(value) and value.__self__ is self._value:
+            # Methods see the wrapper as self
+            return types.MethodType(value.__func__, self)
+        return _read_only(value)
+
+
+class _ReadOnlyMapping(ReadOnly[typing.Any], Mapping[typing.Any, typing.Any]):
+    __slots__ = ()
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        return _read_only(self._value[key])
+
+    def __iter__(self) -> typing.Iterator[typing.Any]:
+        return iter(self._value)
+
+    def __len__(self) -> int:
+        return len(self._value)
+
+
+class _ReadOnlySequence(ReadOnly[typing.Any], Sequence[typing.Any]):
+    __slots__ = ()
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        return _read_only(self._value[key])
+
+    def __len__(self) -> int:
+        return len(self._value)
+
+    def __array__(self, dtype: typing.Any = None, copy: typing.Optional[bool] = None) -> typing.Any:
+        import numpy as np
+
+        if copy:
+            return np.array(self._value, dtype=dtype)
+        return _read_only(np.asarray(self._value, dtype=dtype))
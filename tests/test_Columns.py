@@ -0,0 +1,176 @@
+import copy
+import pickle
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+import pytest
+
+# numpy is not installed for pypy
+pytest.importorskip("numpy")
+
+import numpy as np  # noqa: E402
+
+from soso import state  # noqa: E402
+from soso.state import scheduling  # noqa: E402
+from soso.state.columns import Column  # noqa: E402
+
+
+@dataclass
+class Bars:
+    close: Column = field(default_factory=Column)
+    date: Column = field(default_factory=lambda: Column(dtype="datetime64[m]"))
+
+
+@dataclass
+class State:
+    bars: Bars = field(default_factory=Bars)
+    value: int = 0
+
+
+class TestColumn(unittest.TestCase):
+    def test_append_extend(self) -> None:
+        column = Column()
+        for i in range(100):
+            column.append(i)
+        column.extend(range(100, 150))
+        column.extend(np.arange(150, 200))
+        self.assertEqual(len(column), 200)
+        self.assertEqual(column, list(range(200)))
+        self.assertEqual(column[-1], 199)
+        self.assertTrue(np.array_equal(np.asarray(column), np.arange(200)))
+
+    def test_setitem(self) -> None:
+        column = Column([1.0, 2.0, 3.0, 4.0])
+        column[0] = 10.0
+        column[1:3] = [20.0, 30.0]
+        self.assertEqual(column, [10.0, 20.0, 30.0, 4.0])
+        with self.assertRaises(ValueError):
+            column[1:3] = [1.0, 2.0, 3.0]
+
+    def test_values_view(self) -> None:
+        column = Column([1.0, 2.0])
+        values = column.values
+        with self.assertRaises(ValueError):
+            values[0] = 3.0
+        # Slices are copies
+        items = column[:]
+        items[0] = 3.0
+        self.assertEqual(column[0], 1.0)
+
+    def test_copy(self) -> None:
+        column = Column([1.0, 2.0])
+        for other in (copy.copy(column), copy.deepcopy(column), pickle.loads(pickle.dumps(column))):
+            self.assertEqual(other, column)
+            other.append(3.0)
+            other[0] = 10.0
+            self.assertEqual(column, [1.0, 2.0])
+
+        objects = Column([[1], [2]], dtype=object)
+        deep = copy.deepcopy(objects)
+        deep[0].append(2)
+        self.assertEqual(objects[0], [1])
+
+
+class TestColumnModel(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = state.build_model(State())
+        self.changes: typing.List[typing.List[state.ListChange]] = []
+        self.model.observe_list_changes(lambda x: x.bars.close, self.changes.append)
+
+    def test_initial(self) -> None:
+        model = state.build_model(State(Bars(close=Column([1.0, 2.0]))))
+        changes: typing.List[typing.List[state.ListChange]] = []
+        model.observe_list_changes(lambda x: x.bars.close, changes.append)
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(changes[0][0].start, 0)
+        self.assertEqual(changes[0][0].removed, 0)
+        self.assertEqual(list(changes[0][0].inserted), [1.0, 2.0])
+
+    def test_append(self) -> None:
+        values: typing.List[Column] = []
+        self.model.observe_property(lambda x: x.bars.close, values.append)
+        del self.changes[:]
+
+        def update(x: State) -> None:
+            x.bars.close.append(1.0)
+            x.bars.close.extend([2.0, 3.0])
+
+        self.model.update_state(update)
+        self.assertEqual(self.model.state.bars.close, [1.0, 2.0, 3.0])
+        # Once for each statement
+        self.assertEqual(len(values), 3)
+        # Both changes are delivered together
+        self.assertEqual(len(self.changes), 1)
+        first, second = self.changes[0]
+        self.assertEqual((first.start, first.removed, list(first.inserted)), (0, 0, [1.0]))
+        self.assertEqual(first.inserted_range, range(0, 1))
+        self.assertEqual((second.start, second.removed, list(second.inserted)), (1, 0, [2.0, 3.0]))
+        self.assertEqual(second.inserted_range, range(1, 3))
+
+    def test_submodel(self) -> None:
+        close = self.model.submodel(lambda x: x.bars.close)
+        changes: typing.List[typing.List[state.ListChange]] = []
+        close.observe_list_changes(lambda x: x, changes.append)
+        close.update_state(lambda x: x.append(1.0))
+        self.assertEqual(self.model.state.bars.close, [1.0])
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(
+            [(c.start, c.removed, list(c.inserted)) for [c] in changes],
+            [(0, 0, []), (0, 0, [1.0])],
+        )
+
+    def test_assignment(self) -> None:
+        self.model.update_state(lambda x: x.bars.close.extend([1.0, 2.0, 3.0, 4.0]))
+        del self.changes[:]
+        self.model.update_state(lambda x: x.bars.close.__setitem__(slice(1, 3), [20.0, 30.0]))
+        self.model.update_state(lambda x: x.bars.close.__setitem__(-1, 40.0))
+        self.assertEqual(self.model.state.bars.close, [1.0, 20.0, 30.0, 40.0])
+        self.assertEqual(
+            [(c.start, c.removed, list(c.inserted)) for [c] in self.changes],
+            [(1, 2, [20.0, 30.0]), (3, 1, [40.0])],
+        )
+        self.assertEqual(self.changes[0][0].removed_range, range(1, 3))
+
+    def test_replace(self) -> None:
+        self.model.update_state(lambda x: x.bars.close.extend([1.0, 2.0]))
+        del self.changes[:]
+        self.model.update_properties(bars=Bars(close=Column([5.0])))
+        self.model.restore(State())
+        self.assertEqual(
+            [(c.start, c.removed, list(c.inserted)) for [c] in self.changes],
+            [(0, 2, [5.0]), (0, 1, [])],
+        )
+
+    def test_datetime(self) -> None:
+        self.model.update_state(lambda x: x.bars.date.append(np.datetime64("2020-01-01T09:30")))
+        self.assertEqual(self.model.state.bars.date[0], np.datetime64("2020-01-01T09:30"))
+
+    def test_read_view(self) -> None:
+        self.model.update_state(lambda x: x.bars.close.append(1.0))
+        with self.model.read_view() as view:
+            self.model.update_state(lambda x: x.bars.close.append(2.0))
+            self.assertEqual(view.bars.close, [1.0])
+            with self.assertRaises(AttributeError):
+                view.bars.close.append(3.0)
+            with self.assertRaises(ValueError):
+                np.asarray(view.bars.close)[0] = 3.0
+        self.assertEqual(self.model.state.bars.close, [1.0, 2.0])
+
+    def test_scheduler(self) -> None:
+        idle: typing.List[typing.Callable[[], None]] = []
+
+        class Widget:
+            def after_idle(self, func: typing.Callable[[], None]) -> None:
+                idle.append(func)
+
+        model = state.build_model(State(), scheduler=scheduling.TkScheduler(Widget()))
+        changes: typing.List[typing.List[state.ListChange]] = []
+        model.observe_list_changes(lambda x: x.bars.close, changes.append)
+        for i in range(3):
+            model.update_state(lambda x: x.bars.close.append(float(i)))
+        self.assertEqual(len(changes), 1)
+        for func in idle:
+            func()
+        # Accumulated rather than conflated
+        self.assertEqual([c.start for c in changes[1]], [0, 1, 2])
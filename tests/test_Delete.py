@@ -0,0 +1,228 @@
+import gc
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+from soso import state
+from soso.state import filters
+
+
+@dataclass
+class Order:
+    price: float = 0.0
+    qty: int = 0
+
+
+@dataclass
+class State:
+    orders: typing.Dict[str, Order] = field(default_factory=dict)
+    lst: typing.List[int] = field(default_factory=list)
+
+
+class TestDelete(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = state.build_model(
+            State(orders={"a": Order(1.0, 1), "b": Order(2.0, 2)}, lst=[1, 2, 3])
+        )
+
+    def test_delitem(self) -> None:
+        orders: typing.List[typing.Dict[str, Order]] = []
+        a_prices: typing.List[float] = []
+        b_prices: typing.List[float] = []
+        removed: typing.List[typing.Any] = []
+        self.model.observe_property(lambda x: x.orders, orders.append)
+        self.model.observe_property(lambda x: x.orders["a"].price, a_prices.append)
+        self.model.observe_property(lambda x: x.orders["b"].price, b_prices.append)
+        self.model.observe_property_removed(lambda x: x.orders["a"], removed.append)
+        self.model.observe_property_removed(lambda x: x.orders["a"].price, removed.append)
+
+        def delete(x: State) -> None:
+            del x.orders["a"]
+
+        self.model.update_state(delete)
+        self.assertEqual(list(self.model.state.orders), ["b"])
+        self.assertEqual(len(orders), 2)
+        # Siblings and the deleted value's observers are not emitted
+        self.assertEqual(b_prices, [2.0])
+        self.assertEqual(a_prices, [1.0])
+        self.assertEqual(removed, [Order(1.0, 1), 1.0])
+
+        # Observers still see the key when it is added back
+        self.model.update_state(lambda x: x.orders.__setitem__("a", Order(3.0, 3)))
+        self.assertEqual(a_prices, [1.0, 3.0])
+
+    def test_update_then_delete(self) -> None:
+        orders: typing.List[typing.Dict[str, Order]] = []
+        a_prices: typing.List[float] = []
+        removed: typing.List[typing.Any] = []
+        matches: typing.List[typing.Any] = []
+        self.model.observe_property(lambda x: x.orders, orders.append)
+        self.model.observe_property(lambda x: x.orders["a"].price, a_prices.append)
+        self.model.observe_property_removed(lambda x: x.orders["a"], removed.append)
+        self.model.observe_property_removed(lambda x: x.orders["a"].price, removed.append)
+        self.model.observe_pattern(
+            lambda x: x.orders[state.ANY].price,
+            lambda key, price: matches.append((key, price)),
+            removed.append,
+        )
+        del matches[:]
+        self.model.set_property_filter(
+            lambda x: x.orders["a"].price, filters.absolute_deadband(1.0)
+        )
+
+        def update(x: State) -> None:
+            x.orders["a"].price = 5.0
+            del x.orders["a"]
+
+        # The path written first no longer exists when the update is emitted
+        self.model.update_state(update)
+        self.assertEqual(list(self.model.state.orders), ["b"])
+        self.assertEqual(orders[-1], {"b": Order(2.0, 2)})
+        self.assertEqual(a_prices, [1.0])
+        self.assertEqual(removed, [Order(5.0, 1), 5.0, "a"])
+        self.assertEqual(matches, [])
+
+    def test_update_then_pop(self) -> None:
+        changes: typing.List[state.ListChange] = []
+        values: typing.List[int] = []
+        self.model.observe_list_changes(lambda x: x.lst, changes.extend)
+        self.model.observe_property(lambda x: x.lst[2], values.append)
+        del changes[:]
+
+        def update(x: State) -> None:
+            x.lst[2] = 5
+            x.lst.pop()
+
+        self.model.update_state(update)
+        self.assertEqual(self.model.state.lst, [1, 2])
+        self.assertEqual(values, [3])
+        self.assertEqual(
+            [(c.start, c.removed, list(c.inserted)) for c in changes], [(2, 1, [5]), (2, 1, [])]
+        )
+
+    def test_missing(self) -> None:
+        def delete(x: State) -> None:
+            del x.orders["c"]
+
+        with self.assertRaises(KeyError):
+            self.model.update_state(delete)
+
+    def test_nodes_are_cleaned_up(self) -> None:
+        def add(x: State) -> None:
+            x.orders["c"] = Order(3.0, 3)
+            x.orders["c"].price = 4.0
+
+        def delete(x: State) -> None:
+            del x.orders["c"]
+
+        self.model.update_state(add)
+        root = self.model._Model__root_node  # type: ignore
+        self.assertIn("c", root.children["orders"].children)
+        self.model.update_state(delete)
+        self.assertNotIn("c", root.children["orders"].children)
+
+    def test_held_events(self) -> None:
+        # Events held without handlers, e.g., to be awaited later, survive
+        # the deletion of their value
+        order = self.model.wait_for_property(lambda x: x.orders["a"])
+        price = self.model.wait_for_property(lambda x: x.orders["a"].price)
+
+        def delete(x: State) -> None:
+            del x.orders["a"]
+
+        self.model.update_state(delete)
+        orders: typing.List[Order] = []
+        prices: typing.List[float] = []
+        order.connect(orders.append)
+        self.model.update_state(lambda x: x.orders.__setitem__("a", Order(3.0, 3)))
+        self.assertEqual(orders, [Order(3.0, 3)])
+        price.connect(prices.append)
+        self.model.update_state(lambda x: x.orders["a"].__setattr__("price", 4.0))
+        self.assertEqual(prices, [4.0])
+        self.assertIs(self.model.wait_for_property(lambda x: x.orders["a"]), order)
+        self.assertIs(self.model.wait_for_property(lambda x: x.orders["a"].price), price)
+
+    def test_held_nested_events(self) -> None:
+        # Only the event of something below the deleted value is held
+        def delete(x: State) -> None:
+            del x.orders["a"]
+
+        def set_item(x: State) -> None:
+            x.orders["a"] = Order(5.0, 5)
+
+        def replace(x: State) -> None:
+            x.orders = {"a": Order(5.0, 5)}
+
+        for add in (set_item, replace):
+            model = state.build_model(State(orders={"a": Order(1.0, 1)}))
+            qty = model.wait_for_property(lambda x: x.orders["a"].qty)
+            model.update_state(delete)
+            gc.collect()
+            qtys: typing.List[int] = []
+            qty.connect(qtys.append)
+            model.update_state(add)
+            self.assertEqual(qtys, [5])
+
+    def test_delattr(self) -> None:
+        @dataclass
+        class Holder:
+            value: typing.Optional[Order] = None
+
+        model = state.build_model(Holder())
+        model.update_properties(value=Order(1.0, 1))
+        removed: typing.List[typing.Optional[Order]] = []
+        model.observe_property_removed(lambda x: x.value, removed.append)
+
+        def delete(x: Holder) -> None:
+            del x.value
+
+        model.update_state(delete)
+        self.assertEqual(removed, [Order(1.0, 1)])
+        # Falls back to the class attribute
+        self.assertIsNone(model.state.value)
+
+    def test_sequence(self) -> None:
+        changes: typing.List[state.ListChange] = []
+        values: typing.List[int] = []
+        self.model.observe_list_changes(lambda x: x.lst, changes.extend)
+        self.model.observe_property(lambda x: x.lst[0], values.append)
+        del changes[:]
+
+        def delete(x: State) -> None:
+            del x.lst[0]
+
+        def delete_slice(x: State) -> None:
+            del x.lst[0:1]
+
+        self.model.update_state(delete)
+        self.assertEqual(self.model.state.lst, [2, 3])
+        # The items after it moved
+        self.assertEqual(values, [1, 2])
+        self.model.update_state(delete_slice)
+        self.assertEqual(self.model.state.lst, [3])
+        self.assertEqual(values, [1, 2, 3])
+        self.assertEqual(
+            [(c.start, c.removed, list(c.inserted)) for c in changes], [(0, 1, []), (0, 1, [])]
+        )
+
+    def test_index(self) -> None:
+        # Indexes are kept up to date through pattern matching
+        by_qty = self.model.index(lambda x: x.orders, lambda order: order.qty)
+        self.assertEqual(set(by_qty.state), {1, 2})
+
+        def delete(x: State) -> None:
+            del x.orders["a"]
+
+        self.model.update_state(delete)
+        self.assertEqual(by_qty.state, {2: {"b": Order(2.0, 2)}})
+
+    def test_submodel(self) -> None:
+        orders = self.model.submodel(lambda x: x.orders)
+        removed: typing.List[Order] = []
+        orders.observe_property_removed(lambda x: x["b"], removed.append)
+
+        def delete(x: typing.Dict[str, Order]) -> None:
+            del x["b"]
+
+        orders.update_state(delete)
+        self.assertEqual(removed, [Order(2.0, 2)])
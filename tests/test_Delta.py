@@ -1,8 +1,12 @@
 import copy
+import random
 import typing
 from dataclasses import dataclass, field
 
-from soso.state.util import GetAttr, GetItem, SetAttr, SetItem, delta
+import pytest
+
+from soso.state import compare
+from soso.state.util import Call, DelItem, GetAttr, GetItem, SetAttr, SetItem, delta
 
 
 @dataclass
@@ -104,3 +108,189 @@ def test_nested_dict() -> None:
         GetAttr('a'), GetItem('hello'), GetAttr('a'), GetItem(2), SetItem(2, -4),
     ]
     # yapf: enable
+
+
+@dataclass
+class C8:
+    a: typing.List[int] = field(
+        default_factory=list, metadata=compare.metadata(compare.identity)
+    )
+    b: float = field(default=0.0, metadata=compare.metadata(compare.epsilon(0.5)))
+
+
+def test_field_comparators() -> None:
+    base = C8([1, 2, 3], 1.0)
+    new = C8(list(base.a), 1.25)
+    # equal lists but not identical, replaced as a whole
+    assert delta(base, new) == [SetAttr('a', new.a)]
+
+    new.a = base.a
+    assert delta(base, new) == []
+
+
+def apply(base: typing.Any, ops: typing.List[typing.Any]) -> None:
+    obj = base
+    for op in ops:
+        obj = op.execute_raw(obj)
+        if obj is None:
+            obj = base
+
+
+@dataclass
+class Inner:
+    value: int = 0
+    items: typing.List[int] = field(default_factory=list)
+
+
+@dataclass
+class C9:
+    inner: Inner = field(default_factory=Inner)
+    d: typing.Dict[str, Inner] = field(default_factory=dict)
+    lst: typing.List[int] = field(default_factory=list)
+    t: typing.Tuple[int, ...] = ()
+    opt: typing.Optional[Inner] = None
+
+
+def check(base: typing.Any, new: typing.Any) -> typing.List[typing.Any]:
+    ops = delta(base, new)
+    result = copy.deepcopy(base)
+    apply(result, ops)
+    assert result == new
+    return ops
+
+
+def test_nested_dataclass() -> None:
+    base = C9()
+    new = copy.deepcopy(base)
+    new.inner.value = 1
+    assert check(base, new) == [GetAttr('inner'), SetAttr('value', 1)]
+
+
+def test_lengths() -> None:
+    base = C9(lst=[1, 2, 3, 4])
+    new = copy.deepcopy(base)
+    new.lst.extend([5, 6])
+    assert check(base, new) == [GetAttr('lst'), GetAttr('extend'), Call(([5, 6],), {})]
+    new.lst = [1, 2]
+    assert check(base, new) == [GetAttr('lst'), DelItem(slice(2, 4))]
+    new.lst = [1, 2, 10, 11, 3, 4]
+    assert check(base, new) == [GetAttr('lst'), SetItem(slice(2, 2), [10, 11])]
+    new.lst = [1, 10, 4]
+    assert check(base, new) == [
+        GetAttr('lst'), SetItem(1, 10), GetAttr('lst'), DelItem(slice(2, 3))
+    ]
+    new.lst = [0, 2, 3, 4, 5]
+    assert check(base, new) == [
+        GetAttr('lst'), SetItem(0, 0), GetAttr('lst'), GetAttr('extend'), Call(([5],), {})
+    ]
+    new.lst = []
+    check(base, new)
+
+    # Long lists are compared in chunks
+    base = C9(lst=list(range(1000)))
+    new = C9(lst=list(range(1000)))
+    new.lst.insert(500, -1)
+    new.lst[10] = -2
+    new.lst[990] = -3
+    assert check(base, new) == [
+        GetAttr('lst'), SetItem(10, -2),
+        GetAttr('lst'), SetItem(slice(500, 500), [-1]),
+        GetAttr('lst'), SetItem(990, -3),
+    ]
+
+
+def test_random_edits() -> None:
+    rand = random.Random(42)
+    for _ in range(200):
+        base = C9(lst=[rand.randrange(10) for _ in range(rand.randrange(600))])
+        new = copy.deepcopy(base)
+        for _ in range(rand.randrange(1, 100)):
+            pos = rand.randrange(len(new.lst) + 1)
+            action = rand.randrange(3)
+            if action == 0:
+                new.lst.insert(pos, rand.randrange(10))
+            elif pos < len(new.lst):
+                if action == 1:
+                    del new.lst[pos]
+                else:
+                    new.lst[pos] = rand.randrange(10)
+        check(base, new)
+
+
+def test_mapping_keys() -> None:
+    base = C9(d={"a": Inner(1), "b": Inner(2), "c": Inner(3)})
+    new = copy.deepcopy(base)
+    del new.d["a"]
+    del new.d["c"]
+    new.d["e"] = Inner(5)
+    new.d["b"].items.append(1)
+    assert check(base, new) == [
+        GetAttr('d'), DelItem('a'),
+        GetAttr('d'), DelItem('c'),
+        GetAttr('d'), GetItem('b'), GetAttr('items'), GetAttr('extend'), Call(([1],), {}),
+        GetAttr('d'), SetItem('e', Inner(5)),
+    ]
+
+
+def test_replaced_values() -> None:
+    base = C9(t=(1, 2), opt=Inner(1))
+    new = C9(t=(1, 2, 3), opt=None)
+    assert check(base, new) == [SetAttr('t', (1, 2, 3)), SetAttr('opt', None)]
+    base = C9(lst=[1], opt=None)
+    new = C9(lst=[1], opt=Inner(2))
+    assert check(base, new) == [SetAttr('opt', Inner(2))]
+
+
+class Uncomparable:
+    def __eq__(self, other: object) -> bool:
+        raise AssertionError("compared")
+
+    def __ne__(self, other: object) -> bool:
+        raise AssertionError("compared")
+
+
+@dataclass
+class C10:
+    shared: Uncomparable = field(default_factory=Uncomparable)
+    d: typing.Dict[int, Uncomparable] = field(default_factory=dict)
+    value: int = 0
+
+
+def test_identity() -> None:
+    base = C10(d={i: Uncomparable() for i in range(10)})
+    new = C10(base.shared, dict(base.d), 1)
+    # Shared values are never compared
+    assert delta(base, new) == [SetAttr('value', 1)]
+    assert delta(base, base) == []
+
+
+def test_arrays() -> None:
+    np = pytest.importorskip("numpy")
+
+    from soso.state.columns import Column
+
+    @dataclass
+    class Arrays:
+        array: typing.Any = None
+        column: Column = field(default_factory=Column)
+
+    base = Arrays(np.arange(10.0), Column(np.arange(10.0)))
+    base.array[0] = np.nan
+    new = copy.deepcopy(base)
+    new.array[[2, 3, 7]] = -1.0
+    new.column[5] = -1.0
+    new.column.extend([10.0, 11.0])
+    ops = delta(base, new)
+    # Two runs in the array, one in the column and the appended items
+    assert [op.key for op in ops] == [
+        'array', slice(2, 4), 'array', slice(7, 8),
+        'column', slice(5, 6), 'column', 'extend', '__call__',
+    ]
+    result = copy.deepcopy(base)
+    apply(result, ops)
+    assert np.array_equal(result.array, new.array, equal_nan=True)
+    assert result.column == new.column
+
+    # Arrays can't be resized in place
+    new.array = np.arange(3.0)
+    assert delta(base, new)[0] == SetAttr('array', new.array)
@@ -0,0 +1,167 @@
+import gc
+import typing
+import unittest
+from dataclasses import dataclass, field
+from unittest.mock import MagicMock
+
+from soso import state
+
+NaN = float("nan")
+
+
+@dataclass
+class State:
+    period_10_range: typing.Tuple[float, float] = (NaN, NaN)
+    values: typing.List[int] = field(default_factory=list)
+    other: int = 0
+
+
+class TestDerived(unittest.TestCase):
+    def test_midpoint(self) -> None:
+        model = state.build_model(State(period_10_range=(1.0, 3.0)))
+        calls = MagicMock()
+
+        def midpoint(x: State) -> float:
+            calls()
+            return (x.period_10_range[0] + x.period_10_range[1]) / 2
+
+        derived = model.derive(midpoint)
+        self.assertEqual(derived.state, 2.0)
+        calls.assert_called_once()
+
+        mock = MagicMock()
+        derived.observe(mock)
+        mock.assert_called_once_with(2.0)
+
+        calls.reset_mock()
+        mock.reset_mock()
+        # not a dependency
+        model.update_properties(other=5)
+        calls.assert_not_called()
+        mock.assert_not_called()
+
+        model.update_properties(period_10_range=(3.0, 5.0))
+        self.assertEqual(derived.state, 4.0)
+        mock.assert_called_with(4.0)
+
+    def test_container_dependency(self) -> None:
+        model = state.build_model(State(values=[1, 2, 3]))
+        derived = model.derive(lambda x: sum(x.values))
+        first = model.derive(lambda x: x.values[0])
+        self.assertEqual(derived.state, 6)
+        self.assertEqual(first.state, 1)
+
+        total = MagicMock()
+        head = MagicMock()
+        derived.observe(total)
+        first.observe(head)
+        total.reset_mock()
+        head.reset_mock()
+
+        model.update_state(lambda x: x.values.append(4))
+        total.assert_called_once_with(10)
+        head.assert_not_called()
+
+        def update(x: State) -> None:
+            x.values[0] = 0
+
+        model.update_state(update)
+        total.assert_called_with(9)
+        head.assert_called_once_with(0)
+
+    def test_submodel(self) -> None:
+        model = state.build_model(State(values=[1, 2, 3]))
+        derived = model.submodel(lambda x: x.values).derive(lambda x: len(x))
+        self.assertEqual(derived.state, 3)
+        model.update_properties(values=[])
+        self.assertEqual(derived.state, 0)
+
+    def test_read_only(self) -> None:
+        model = state.build_model(State())
+
+        def update(x: State) -> int:
+            x.other = 5
+            return x.other
+
+        self.assertRaises(AttributeError, lambda: model.derive(update))
+
+    def test_glitch_free(self) -> None:
+        model = state.build_model(State(period_10_range=(1.0, 3.0)))
+        midpoints: typing.List[float] = []
+        midpoint = model.derive(lambda x: (x.period_10_range[0] + x.period_10_range[1]) / 2)
+        midpoint.observe(midpoints.append)
+        width = model.derive(lambda x: x.period_10_range[1] - x.period_10_range[0])
+        # depends on a derived value and on the state
+        ratios: typing.List[float] = []
+        ratio = model.derive(lambda x: width.state / midpoint.state + x.other)
+        ratio.observe(ratios.append)
+        self.assertEqual(ratios, [1.0])
+
+        # both ends change in one update
+        model.update_properties(period_10_range=(2.0, 6.0))
+        self.assertEqual(midpoints, [2.0, 4.0])
+        self.assertEqual(ratios, [1.0])
+
+        model.update_properties(period_10_range=(3.0, 6.0), other=1)
+        self.assertEqual(midpoints, [2.0, 4.0, 4.5])
+        self.assertEqual(ratios, [1.0, 3.0 / 4.5 + 1])
+
+    def test_computed_once_per_update(self) -> None:
+        model = state.build_model(State(values=[1, 2]))
+        calls = MagicMock()
+
+        def total(x: State) -> int:
+            calls()
+            return x.values[0] + x.values[1]
+
+        derived = model.derive(total)
+        calls.reset_mock()
+
+        def update(x: State) -> None:
+            x.values[0] = 3
+            x.values[1] = 4
+
+        model.update_state(update)
+        self.assertEqual(derived.state, 7)
+        calls.assert_called_once()
+
+    def test_lifetime(self) -> None:
+        model = state.build_model(State(other=1))
+        calls = MagicMock()
+
+        def double(x: State) -> int:
+            calls()
+            return x.other * 2
+
+        # Observed, kept alive without a reference
+        values: typing.List[int] = []
+        model.derive(double).observe(values.append)
+        gc.collect()
+        model.update_properties(other=2)
+        self.assertEqual(values, [2, 4])
+
+        # Dropped, no longer recomputed
+        calls.reset_mock()
+        model.derive(lambda x: double(x) + 1)
+        gc.collect()
+        model.update_properties(other=3)
+        # Once when created and once for the observed one
+        self.assertEqual(calls.call_count, 2)
+
+        # Closed
+        calls.reset_mock()
+        derived = model.derive(double)
+        derived.close()
+        model.update_properties(other=4)
+        self.assertEqual(calls.call_count, 2)
+        # The last value
+        self.assertEqual(derived.state, 6)
+
+        group = state.SubscriptionGroup()
+        with group.collect():
+            collected = model.derive(double)
+        group.close()
+        calls.reset_mock()
+        model.update_properties(other=5)
+        self.assertEqual(calls.call_count, 1)
+        self.assertEqual(collected.state, 8)
@@ -3,8 +3,13 @@ import asyncio
 import unittest
 from unittest.mock import MagicMock
 import datetime as dt
+from dataclasses import dataclass, field
+import gc
+import threading
+import weakref
 
-from soso.state.event import Event, TimerEvent
+from soso import state
+from soso.state.event import Event, EventToken, Overflow, SubscriptionGroup, TimerEvent
 
 
 class TestEvent(unittest.TestCase):
@@ -33,6 +38,59 @@ class TestEvent(unittest.TestCase):
 
         mock.assert_called_with(42)
 
+    def test_disconnect_later_handler_during_event(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        mock = MagicMock()
+
+        def cb(*a: typing.Any) -> None:
+            token.disconnect()
+
+        event.connect(cb)
+        token = event.connect(mock)
+        event.emit(42)
+        mock.assert_not_called()
+
+    def test_connect_during_event(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        mock = MagicMock()
+        tokens: typing.List[EventToken] = []
+        event.connect(lambda _: tokens.append(event.connect(mock)) if not tokens else None)
+        event.emit(42)
+        mock.assert_called_once_with(42)
+
+    def test_weak(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        mock = MagicMock()
+
+        def cb(value: int) -> None:
+            mock(value)
+
+        event.connect(cb, weak=True)
+        event.emit(1)
+        mock.assert_called_once_with(1)
+        del cb
+        gc.collect()
+        self.assertEqual(event._handler_count(), 0)
+        event.emit(2)
+        mock.assert_called_once_with(1)
+
+    def test_order_after_disconnect(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        called: typing.List[int] = []
+
+        def make_handler(i: int) -> typing.Callable[[int], None]:
+            return lambda _: called.append(i)
+
+        tokens = [event.connect(make_handler(i)) for i in range(100)]
+        for token in tokens[::2]:
+            token.disconnect()
+        tokens.append(event.connect(make_handler(100)))
+        event.emit(42)
+        self.assertEqual(called, list(range(1, 101, 2)) + [100])
+        self.assertEqual(event._handler_count(), 51)
+        # Disconnected handlers are not kept around
+        self.assertLess(len(event._handlers), 2 * 51 + 10)
+
     def test_sample(self) -> None:
         timer: Event[None] = Event("Timer")
         event: Event[int] = Event("HELLO", int)
@@ -93,5 +151,367 @@ class TestEvent(unittest.TestCase):
         # Technically, should only happen 6 times but we allow flexibility
         assert 5 <= mock.call_count <= 7
 
+    def __new_loop(self) -> asyncio.AbstractEventLoop:
+        # A loop without the timers and tasks of other tests
+        previous = asyncio.get_event_loop()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        def restore() -> None:
+            loop.close()
+            asyncio.set_event_loop(previous)
+
+        self.addCleanup(restore)
+        return loop
+
+    def __fake_clock(self, loop: asyncio.AbstractEventLoop) -> typing.Callable[[float], None]:
+        # Returns a function advancing the loop's time and running what is due
+        now = loop.time()
+        loop.time = lambda: now  # type: ignore
+
+        def advance(seconds: float) -> None:
+            nonlocal now
+            end = now + seconds
+            while now < end:
+                now = min(now + 0.01, end)
+                loop.run_until_complete(asyncio.sleep(0))
+
+        return advance
+
+    def test_shared_timers(self) -> None:
+        loop = self.__new_loop()
+        advance = self.__fake_clock(loop)
+        timers = [TimerEvent("Timer", dt.timedelta(seconds=0.1)) for _ in range(200)]
+        mocks = [MagicMock() for _ in timers]
+        for timer, mock in zip(timers, mocks):
+            timer.connect(mock)
+        # A single loop timer for all of them
+        self.assertEqual(len(loop._scheduled), 1)  # type: ignore
+
+        advance(0.55)
+        self.assertEqual({mock.call_count for mock in mocks}, {5})
+
+    def test_unreferenced_timers(self) -> None:
+        loop = self.__new_loop()
+        advance = self.__fake_clock(loop)
+        event: Event[int] = Event("HELLO", int)
+        timer_mock = MagicMock()
+        sampled_mock = MagicMock()
+        # Neither the timer nor the sampled event are referenced
+        TimerEvent("Timer", dt.timedelta(seconds=0.1)).connect(timer_mock)
+        event.sample(dt.timedelta(seconds=0.1)).connect(sampled_mock)
+        gc.collect()
+        for i in range(5):
+            event.emit(i)
+            advance(0.1)
+        self.assertEqual(timer_mock.call_count, 5)
+        self.assertEqual(sampled_mock.call_args_list, [unittest.mock.call(i) for i in range(5)])
+
+    def test_closed_loops_are_collected(self) -> None:
+        previous = asyncio.get_event_loop()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            mock = MagicMock()
+            TimerEvent("Timer", dt.timedelta(seconds=0.01)).connect(mock)
+            loop.run_until_complete(asyncio.sleep(0.05))
+            self.assertTrue(mock.called)
+        finally:
+            loop.close()
+            asyncio.set_event_loop(previous)
+        ref = weakref.ref(loop)
+        del loop
+        gc.collect()
+        self.assertIsNone(ref())
+
+    def test_sample_stops(self) -> None:
+        loop = self.__new_loop()
+        advance = self.__fake_clock(loop)
+        event: Event[int] = Event("HELLO", int)
+        sampled = event.sample(dt.timedelta(seconds=0.05))
+        mock = MagicMock()
+        token = sampled.connect(mock)
+        event.emit(1)
+        advance(0.12)
+        mock.assert_called_once_with(1)
+
+        # Stops once nobody listens, even though sampled is alive
+        token.disconnect()
+        self.assertEqual(event._handler_count(), 0)
+        advance(0.12)
+        # No more timers
+        self.assertEqual(len(loop._scheduled), 0)  # type: ignore
+
+        # And starts again
+        sampled.connect(mock)
+        event.emit(2)
+        advance(0.06)
+        mock.assert_called_with(2)
+
     async def __sleep(self, interval: dt.timedelta) -> None:
         await asyncio.sleep(interval.total_seconds())
+
+
+class TestEventStream(unittest.IsolatedAsyncioTestCase):
+    async def take(self, stream: typing.AsyncIterator[int], n: int) -> typing.List[int]:
+        return [await stream.__anext__() for _ in range(n)]
+
+    async def test_unbounded(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        stream = event.__aiter__()
+        for i in range(100):
+            event.emit(i)
+        self.assertEqual(await self.take(stream, 100), list(range(100)))
+        self.assertEqual(stream.dropped, 0)
+
+    async def test_wakes_consumer(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        stream = event.stream()
+        task = asyncio.create_task(self.take(stream, 2))
+        await asyncio.sleep(0)
+        event.emit(1)
+        await asyncio.sleep(0)
+        event.emit(2)
+        self.assertEqual(await task, [1, 2])
+
+    async def test_overflow(self) -> None:
+        for overflow, expected, dropped in [
+            (Overflow.DROP_OLDEST, [7, 8, 9], 7),
+            (Overflow.DROP_NEWEST, [0, 1, 2], 7),
+            (Overflow.CONFLATE, [9], 9),
+            # Emitting from the consumer's thread cannot block
+            (Overflow.BLOCK, [0, 1, 2], 7),
+        ]:
+            event: Event[int] = Event("HELLO", int)
+            stream = event.stream(maxsize=3, overflow=overflow)
+            for i in range(10):
+                event.emit(i)
+            self.assertEqual(len(stream), len(expected))
+            self.assertEqual(await self.take(stream, len(expected)), expected)
+            self.assertEqual(stream.dropped, dropped)
+
+    async def test_block(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        stream = event.stream(maxsize=2, overflow=Overflow.BLOCK)
+
+        def produce() -> None:
+            for i in range(20):
+                event.emit(i)
+
+        thread = threading.Thread(target=produce)
+        thread.start()
+        self.assertEqual(await self.take(stream, 20), list(range(20)))
+        thread.join()
+        self.assertEqual(stream.dropped, 0)
+
+    async def test_close(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        stream = event.stream()
+        values: typing.List[int] = []
+
+        async def consume() -> None:
+            async for value in stream:
+                values.append(value)
+
+        task = asyncio.create_task(consume())
+        event.emit(1)
+        await asyncio.sleep(0)
+        stream.close()
+        await task
+        self.assertEqual(values, [1])
+        self.assertEqual(event._handler_count(), 0)
+
+    async def test_garbage_collected(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        stream = event.stream()
+        event.emit(1)
+        self.assertEqual(event._handler_count(), 1)
+        del stream
+        gc.collect()
+        self.assertEqual(event._handler_count(), 0)
+
+
+class TestEventAwait(unittest.IsolatedAsyncioTestCase):
+    async def test_shared(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+
+        async def wait() -> int:
+            return await event
+
+        tasks = [asyncio.create_task(wait()) for _ in range(1000)]
+        await asyncio.sleep(0)
+        self.assertEqual(event._handler_count(), 1)
+
+        event.emit(42)
+        self.assertEqual(await asyncio.gather(*tasks), [42] * 1000)
+        self.assertEqual(event._handler_count(), 0)
+
+        # A new generation
+        task = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        event.emit(43)
+        self.assertEqual(await task, 43)
+
+    async def test_cancel(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+
+        async def wait() -> int:
+            return await event
+
+        task1 = asyncio.create_task(wait())
+        task2 = asyncio.create_task(wait())
+        await asyncio.sleep(0)
+        task1.cancel()
+        await asyncio.sleep(0)
+        event.emit(42)
+        self.assertEqual(await task2, 42)
+        self.assertTrue(task1.cancelled())
+
+
+class TestSubscriptionGroup(unittest.TestCase):
+    def test_close(self) -> None:
+        @dataclass
+        class State:
+            a: int = 0
+            d: typing.Dict[str, int] = field(default_factory=dict)
+
+        model = state.build_model(State())
+        mock = MagicMock()
+        group = SubscriptionGroup()
+        with group.collect():
+            for _ in range(100):
+                model.observe_property(lambda x: x.a, mock)
+            model.submodel(lambda x: x.d).observe(mock)
+            model.derive(lambda x: x.a * 2).observe(mock)
+        # Not collected
+        outside = model.observe_property(lambda x: x.a, mock)
+        # the tokens and the derived value
+        self.assertEqual(len(group), 103)
+
+        event = model.wait_for_property(lambda x: x.a)
+        # and one for the derived value
+        self.assertEqual(event._handler_count(), 102)
+        group.close()
+        self.assertEqual(len(group), 0)
+        self.assertEqual(event._handler_count(), 1)
+        self.assertLess(len(event._handlers), 20)
+
+        mock.reset_mock()
+        model.update_properties(a=1, d={"x": 1})
+        # only outside
+        mock.assert_called_once_with(1)
+        outside.disconnect()
+
+    def test_add(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        mock = MagicMock()
+        with SubscriptionGroup() as group:
+            token = group.add(event.connect(mock))
+            event.emit(1)
+        event.emit(2)
+        mock.assert_called_once_with(1)
+        # Already disconnected
+        token.disconnect()
+
+
+class TestRateLimiting(unittest.IsolatedAsyncioTestCase):
+    interval = dt.timedelta(seconds=0.05)
+
+    async def test_throttle(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        values: typing.List[int] = []
+        throttled = event.throttle(self.interval)
+        throttled.connect(values.append)
+
+        for i in range(10):
+            event.emit(i)
+        # leading edge
+        self.assertEqual(values, [0])
+        await asyncio.sleep(0.08)
+        # trailing edge with the latest value
+        self.assertEqual(values, [0, 9])
+        await asyncio.sleep(0.08)
+        event.emit(10)
+        self.assertEqual(values, [0, 9, 10])
+
+    async def test_debounce(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        values: typing.List[int] = []
+        debounced = event.debounce(self.interval)
+        debounced.connect(values.append)
+
+        for i in range(5):
+            event.emit(i)
+            await asyncio.sleep(0.02)
+        self.assertEqual(values, [])
+        await asyncio.sleep(0.08)
+        self.assertEqual(values, [4])
+
+    async def test_conflate(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        values: typing.List[int] = []
+        conflated = event.conflate()
+        conflated.connect(values.append)
+
+        for i in range(5):
+            event.emit(i)
+        self.assertEqual(values, [])
+        await asyncio.sleep(0)
+        self.assertEqual(values, [4])
+        event.emit(5)
+        await asyncio.sleep(0)
+        self.assertEqual(values, [4, 5])
+
+    async def test_model(self) -> None:
+        @dataclass
+        class State:
+            a: int = 0
+
+        model = state.build_model(State())
+        values: typing.List[int] = []
+        conflated = model.wait_for_property(lambda x: x.a).conflate()
+        conflated.connect(values.append)
+        for i in range(1, 5):
+            model.update_properties(a=i)
+        await asyncio.sleep(0)
+        self.assertEqual(values, [4])
+
+    async def test_inline(self) -> None:
+        @dataclass
+        class State:
+            a: int = 0
+
+        model = state.build_model(State())
+        throttled: typing.List[int] = []
+        # Neither the throttled event nor the token are referenced
+        model.wait_for_property(lambda x: x.a).throttle(self.interval).connect(throttled.append)
+        conflated: typing.List[int] = []
+
+        async def consume() -> None:
+            async for value in model.wait_for_property(lambda x: x.a).conflate():
+                conflated.append(value)
+                if value == 4:
+                    return
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0)
+        gc.collect()
+        for i in range(1, 5):
+            model.update_properties(a=i)
+        await asyncio.wait_for(task, 1)
+        self.assertEqual(conflated, [4])
+        await asyncio.sleep(0.08)
+        self.assertEqual(throttled, [1, 4])
+
+    async def test_released(self) -> None:
+        event: Event[int] = Event("HELLO", int)
+        operators = [event.throttle(self.interval), event.debounce(self.interval),
+                     event.conflate()]
+        # Only connected while they have handlers
+        self.assertEqual(event._handler_count(), 0)
+        tokens = [operator.connect(MagicMock()) for operator in operators]
+        self.assertEqual(event._handler_count(), 3)
+        event.emit(1)
+        for token in tokens:
+            token.disconnect()
+        self.assertEqual(event._handler_count(), 0)
@@ -0,0 +1,42 @@
+import datetime as dt
+import unittest
+
+from soso.state import filters
+
+NaN = float("nan")
+
+
+class TestFilters(unittest.TestCase):
+    def test_absolute_deadband(self) -> None:
+        f = filters.absolute_deadband(0.5)
+        f.reset(1.0)
+        self.assertFalse(f(1.25))
+        self.assertFalse(f(1.5))
+        # compared against the last emitted value, not the last value
+        self.assertTrue(f(1.75))
+        self.assertFalse(f(2.0))
+        self.assertTrue(f(NaN))
+        self.assertFalse(f(NaN))
+        self.assertTrue(f(2.0))
+
+    def test_relative_deadband(self) -> None:
+        f = filters.relative_deadband(0.1)
+        f.reset(100.0)
+        self.assertFalse(f(109.0))
+        self.assertTrue(f(111.0))
+        self.assertFalse(f(101.0))
+
+    def test_min_interval(self) -> None:
+        now = 0.0
+        f = filters.min_interval(dt.timedelta(seconds=1), clock=lambda: now)
+        self.assertTrue(f(1))
+        now = 0.5
+        self.assertFalse(f(2))
+        now = 1.0
+        self.assertTrue(f(3))
+
+    def test_predicate(self) -> None:
+        f = filters.predicate(lambda last, new: new > last)
+        self.assertTrue(f(1))
+        self.assertFalse(f(0))
+        self.assertTrue(f(2))
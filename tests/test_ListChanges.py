@@ -0,0 +1,101 @@
+import random
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+from soso import state
+
+
+@dataclass
+class Item:
+    name: str = ""
+
+
+@dataclass
+class State:
+    lst: typing.List[int] = field(default_factory=list)
+    items: typing.List[Item] = field(default_factory=list)
+
+
+def apply(rows: typing.List[typing.Any], changes: typing.List[state.ListChange]) -> None:
+    for change in changes:
+        rows[change.start:change.start + change.removed] = change.inserted
+
+
+class TestListChanges(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = state.build_model(State(lst=[1, 2, 3]))
+        self.changes: typing.List[state.ListChange] = []
+        self.model.observe_list_changes(lambda x: x.lst, self.changes.extend)
+        del self.changes[:]
+
+    def summary(self) -> typing.List[typing.Tuple[int, int, typing.List[int]]]:
+        changes, self.changes[:] = self.changes[:], []
+        return [(c.start, c.removed, list(c.inserted)) for c in changes]
+
+    def test_methods(self) -> None:
+        updates: typing.List[typing.Tuple[typing.Callable[[State], typing.Any], typing.Any]] = [
+            (lambda x: x.lst.append(4), (3, 0, [4])),
+            (lambda x: x.lst.insert(0, 0), (0, 0, [0])),
+            (lambda x: x.lst.insert(-1, 10), (4, 0, [10])),
+            (lambda x: x.lst.insert(100, 5), (6, 0, [5])),
+            (lambda x: x.lst.pop(), (6, 1, [])),
+            (lambda x: x.lst.pop(1), (1, 1, [])),
+            (lambda x: x.lst.remove(10), (3, 1, [])),
+            (lambda x: x.lst.extend([5, 6]), (4, 0, [5, 6])),
+            (lambda x: x.lst.reverse(), (0, 6, [6, 5, 4, 3, 2, 0])),
+            (lambda x: x.lst.sort(), (0, 6, [0, 2, 3, 4, 5, 6])),
+            (lambda x: x.lst.__setitem__(slice(1, 3), [7, 8, 9]), (1, 2, [7, 8, 9])),
+            (
+                lambda x: x.lst.__setitem__(slice(None, None, 2), [1, 1, 1, 1]),
+                (0, 7, [1, 7, 1, 9, 1, 5, 1]),
+            ),
+            (lambda x: x.lst.__setitem__(-1, 2), (6, 1, [2])),
+            (lambda x: x.lst.clear(), (0, 7, [])),
+        ]
+        for update, expected in updates:
+            self.model.update_state(update)
+            self.assertEqual(self.summary(), [expected])
+
+    def test_unchanged(self) -> None:
+        self.model.update_state(lambda x: x.lst.__setitem__(0, 1))
+        self.assertEqual(self.changes, [])
+
+    def test_replace(self) -> None:
+        self.model.update_properties(lst=[4, 5])
+        self.assertEqual(self.summary(), [(0, 3, [4, 5])])
+        self.model.restore(State())
+        self.assertEqual(self.summary(), [(0, 2, [])])
+
+    def test_children(self) -> None:
+        model = state.build_model(State(items=[Item("a"), Item("b")]))
+        names: typing.List[str] = []
+        model.observe_property(lambda x: x.items[0].name, names.append)
+        model.update_state(lambda x: x.items.insert(0, Item("c")))
+        self.assertEqual(names, ["a", "c"])
+
+    def test_mirror(self) -> None:
+        random.seed(42)
+        rows: typing.List[int] = []
+        self.model.observe_list_changes(lambda x: x.lst, lambda changes: apply(rows, changes))
+
+        def update(x: State) -> None:
+            size = len(self.model.state.lst)
+            op = random.randrange(6)
+            if op == 0 or size == 0:
+                x.lst.append(random.randrange(100))
+            elif op == 1:
+                x.lst.insert(random.randrange(-size, size + 1), random.randrange(100))
+            elif op == 2:
+                x.lst.pop(random.randrange(size))
+            elif op == 3:
+                x.lst[random.randrange(size)] = random.randrange(100)
+            elif op == 4:
+                start = random.randrange(size)
+                x.lst[start:start + 2] = [random.randrange(100)] * random.randrange(3)
+            else:
+                x.lst.sort()
+
+        for _ in range(500):
+            self.model.update_state(update)
+            self.assertEqual(rows, self.model.state.lst)
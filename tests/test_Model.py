@@ -6,7 +6,7 @@ from dataclasses import dataclass, field
 from unittest.mock import MagicMock
 
 from soso import state
-from soso.state import protocols
+from soso.state import compare, filters, protocols
 
 
 @dataclass
@@ -16,6 +16,32 @@ class State:
     lst: typing.List[int] = field(default_factory=list)
 
 
+class NoEq:
+    def __eq__(self, other: object) -> bool:
+        raise AssertionError("Should not be compared")
+
+
+@dataclass
+class ComparatorState:
+    by_identity: typing.Any = field(
+        default_factory=NoEq, metadata=compare.metadata(compare.identity)
+    )
+    always: int = field(default=0, metadata=compare.metadata(compare.always))
+    close: float = field(default=0.0, metadata=compare.metadata(compare.epsilon(0.1)))
+
+
+@dataclass
+class Order:
+    price: float = 0.0
+    qty: int = 0
+
+
+@dataclass
+class Book:
+    orders: typing.Dict[str, Order] = field(default_factory=dict)
+    fills: typing.List[Order] = field(default_factory=list)
+
+
 def Model(s: State = State()) -> protocols.Model[State]:  # noqa
     return state.build_model(s)
 
@@ -159,6 +185,17 @@ class TestModel(unittest.TestCase):
         model.update_state(update)
         mock.assert_called_with([1])
 
+    def test_funcall_returning_value(self) -> None:
+        model = Model(State(d=dict(key="value")))
+
+        def update(state: State) -> None:
+            state.d.pop("key")
+            state.value = 5
+
+        model.update_state(update)
+        self.assertEqual(model.state.d, {})
+        self.assertEqual(model.state.value, 5)
+
     def test_constructor(self) -> None:
         model = Model(State(value=42))
 
@@ -405,6 +442,367 @@ class TestModel(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0], (0, 42))
 
+    def test_field_comparators(self) -> None:
+        model = state.build_model(ComparatorState())
+        identity = MagicMock()
+        always = MagicMock()
+        close = MagicMock()
+        model.observe_property(lambda x: x.by_identity, identity)
+        model.observe_property(lambda x: x.always, always)
+        model.observe_property(lambda x: x.close, close)
+        identity.reset_mock()
+        always.reset_mock()
+        close.reset_mock()
+
+        current = model.state.by_identity
+        model.update_properties(by_identity=current, always=0, close=0.05)
+        identity.assert_not_called()
+        always.assert_called_once_with(0)
+        close.assert_not_called()
+        # the state is still updated
+        self.assertEqual(model.state.close, 0.05)
+        model.update_properties(close=0.1)
+        close.assert_not_called()
+        self.assertEqual(model.state.close, 0.1)
+
+        replacement = NoEq()
+        model.update_properties(by_identity=replacement, close=0.5)
+        identity.assert_called_once_with(replacement)
+        close.assert_called_once_with(0.5)
+
+    def test_observe_property_changes_comparator(self) -> None:
+        model = state.build_model(ComparatorState())
+        mock = MagicMock()
+        first = model.state.by_identity
+        model.observe_property_changes(lambda x: x.by_identity, mock)
+        mock.assert_called_once_with(None, first)
+
+        mock.reset_mock()
+        second = NoEq()
+        model.update_properties(by_identity=second)
+        # no deepcopy for identity comparisons
+        mock.assert_called_once_with(first, second)
+
+    def test_property_filter(self) -> None:
+        model = state.build_model(ComparatorState())
+        mock = MagicMock()
+        root = MagicMock()
+        model.observe_property(lambda x: x.always, mock)
+        model.observe(root)
+        model.set_property_filter(lambda x: x.always, filters.absolute_deadband(5))
+        mock.reset_mock()
+        root.reset_mock()
+
+        model.update_properties(always=3)
+        # the state is updated, but nothing is emitted
+        self.assertEqual(model.state.always, 3)
+        mock.assert_not_called()
+        root.assert_not_called()
+
+        model.update_properties(always=6)
+        mock.assert_called_once_with(6)
+        root.assert_called_once()
+
+        mock.reset_mock()
+        model.set_property_filter(lambda x: x.always, None)
+        model.update_properties(always=7)
+        mock.assert_called_once_with(7)
+
+    def test_keyed_mapping(self) -> None:
+        model = Model(State(d=dict(a="1", b="2", c="3")))
+        model.set_property_keyed(lambda x: x.d)
+        mocks = {key: MagicMock() for key in "abc"}
+        for key, mock in mocks.items():
+            model.observe_property(lambda x, key=key: x.d[key], mock)  # type: ignore
+            mock.reset_mock()
+
+        model.update_properties(d=dict(a="1", b="changed", c="3"))
+        mocks["a"].assert_not_called()
+        mocks["b"].assert_called_once_with("changed")
+        mocks["c"].assert_not_called()
+
+        removed = MagicMock()
+        for key in "abc":
+            model.observe_property_removed(
+                lambda x, key=key: x.d[key], lambda value, key=key: removed(key, value)  # type: ignore
+            )
+        snapshot = model.snapshot()
+        mocks["b"].reset_mock()
+        # removed keys are reported as removals rather than changes
+        model.update_properties(d=dict(a="1"))
+        for mock in mocks.values():
+            mock.assert_not_called()
+        self.assertEqual(
+            removed.call_args_list,
+            [unittest.mock.call("b", "changed"), unittest.mock.call("c", "3")],
+        )
+
+        model.restore(snapshot)
+        mocks["a"].assert_not_called()
+        mocks["b"].assert_called_once_with("changed")
+        mocks["c"].assert_called_once_with("3")
+
+    def test_keyed_mapping_held_events(self) -> None:
+        model = Model(State(d=dict(a="1", b="2")))
+        model.set_property_keyed(lambda x: x.d)
+        # Held without handlers, e.g., to be awaited later
+        event = model.wait_for_property(lambda x: x.d["b"])
+        snapshot = model.snapshot()
+        model.update_properties(d=dict(a="1"))
+        gc.collect()
+        mock = MagicMock()
+        event.connect(mock)
+        model.restore(snapshot)
+        mock.assert_called_once_with("2")
+        self.assertIs(model.wait_for_property(lambda x: x.d["b"]), event)
+
+    def test_observe_pattern(self) -> None:
+        model = state.build_model(Book(orders=dict(a=Order(1.0), b=Order(2.0))))
+        mock = MagicMock()
+        model.observe_pattern(lambda x: x.orders[state.ANY].price, mock)
+        self.assertEqual(
+            mock.call_args_list,
+            [unittest.mock.call("a", 1.0), unittest.mock.call("b", 2.0)],
+        )
+
+        mock.reset_mock()
+
+        def update(x: Book) -> None:
+            x.orders["a"].price = 1.5
+            x.orders["b"].qty = 5
+
+        model.update_state(update)
+        mock.assert_called_once_with("a", 1.5)
+
+        def add(x: Book) -> None:
+            x.orders["c"] = Order(3.0)
+
+        mock.reset_mock()
+        model.update_state(add)
+        mock.assert_called_once_with("c", 3.0)
+
+        mock.reset_mock()
+        model.update_properties(orders=dict(d=Order(4.0)))
+        mock.assert_called_once_with("d", 4.0)
+
+    def test_observe_pattern_nested(self) -> None:
+        model = state.build_model(Book(fills=[Order(1.0, 1)]))
+        submodel = model.submodel(lambda x: x.fills)
+        mock = MagicMock()
+        submodel.observe_pattern(lambda x: x[state.ANY], mock)
+        mock.assert_called_once_with(0, Order(1.0, 1))
+
+        mock.reset_mock()
+        model.update_state(lambda x: x.fills.append(Order(2.0, 2)))
+        # Only the appended element
+        mock.assert_called_once_with(1, Order(2.0, 2))
+
+    def test_observe_pattern_removed(self) -> None:
+        model = state.build_model(
+            Book(orders=dict(a=Order(1.0), b=Order(2.0)), fills=[Order(1.0), Order(2.0)])
+        )
+        orders, fills = MagicMock(), MagicMock()
+        removed = MagicMock()
+        model.observe_pattern(lambda x: x.orders[state.ANY].price, orders, removed)
+        model.observe_pattern(lambda x: x.fills[state.ANY], fills, removed)
+        orders.reset_mock()
+        fills.reset_mock()
+
+        def cancel(x: Book) -> None:
+            del x.orders["a"]
+
+        model.update_state(cancel)
+        removed.assert_called_once_with("a")
+        orders.assert_not_called()
+
+        # Later elements move down
+        removed.reset_mock()
+        def pop(x: Book) -> None:
+            x.fills.pop(0)
+
+        model.update_state(pop)
+        fills.assert_called_once_with(0, Order(2.0))
+        removed.assert_called_once_with(1)
+
+        # Keys missing from a replaced mapping
+        removed.reset_mock()
+        model.update_properties(orders=dict(c=Order(3.0)))
+        removed.assert_called_once_with("b")
+        orders.assert_called_once_with("c", 3.0)
+
+    def test_observe_pattern_emptied(self) -> None:
+        def build() -> Book:
+            return Book(orders=dict(a=Order(1.0), b=Order(2.0)), fills=[Order(1.0)])
+
+        def clear(x: Book) -> None:
+            x.orders.clear()
+            x.fills.clear()
+
+        def reassign(x: Book) -> None:
+            x.orders = {}
+            x.fills = []
+
+        empties: typing.List[typing.Callable[[protocols.Model[Book]], None]] = [
+            lambda model: model.update_state(clear),
+            lambda model: model.update_state(reassign),
+            lambda model: model.restore(Book()),
+        ]
+        for empty in empties:
+            model = state.build_model(build())
+            removed = MagicMock()
+            model.observe_pattern(lambda x: x.orders[state.ANY].price, MagicMock(), removed)
+            model.observe_pattern(lambda x: x.fills[state.ANY], MagicMock(), removed)
+            empty(model)
+            self.assertEqual({c.args for c in removed.call_args_list}, {(0,), ("a",), ("b",)})
+
+    def test_observe_pattern_requires_wildcard(self) -> None:
+        model = state.build_model(Book())
+        self.assertRaises(ValueError, lambda: model.observe_pattern(lambda x: x.orders, print))
+
+    def test_index(self) -> None:
+        model = state.build_model(
+            Book(orders=dict(a=Order(1.0, 1), b=Order(2.0, 2), c=Order(3.0, 1)))
+        )
+        by_qty = model.index(lambda x: x.orders, lambda order: order.qty)
+        self.assertEqual(by_qty.state, {1: dict(a=Order(1.0, 1), c=Order(3.0, 1)),
+                                        2: dict(b=Order(2.0, 2))})
+
+        mock = MagicMock()
+        by_qty.observe_property(lambda x: x[2], mock)
+        mock.reset_mock()
+
+        def update(x: Book) -> None:
+            x.orders["a"].qty = 2
+            x.orders["c"].price = 3.5
+
+        model.update_state(update)
+        self.assertEqual(by_qty.state, {1: dict(c=Order(3.5, 1)),
+                                        2: dict(b=Order(2.0, 2), a=Order(1.0, 2))})
+        mock.assert_called_once_with(dict(b=Order(2.0, 2), a=Order(1.0, 2)))
+
+        def move(x: Book) -> None:
+            # empties group 1 and moves b into a new group
+            del x.orders["c"]
+            x.orders["b"].qty = 3
+            x.orders["e"] = Order(5.0, 1)
+
+        model.update_state(move)
+        self.assertEqual(by_qty.state, {1: dict(e=Order(5.0, 1)), 2: dict(a=Order(1.0, 2)),
+                                        3: dict(b=Order(2.0, 3))})
+        model.update_state(lambda x: x.orders["e"].__setattr__("qty", 2))
+        self.assertEqual(by_qty.state, {2: dict(a=Order(1.0, 2), e=Order(5.0, 2)),
+                                        3: dict(b=Order(2.0, 3))})
+
+        model.update_properties(orders=dict(d=Order(4.0, 4)))
+        self.assertEqual(by_qty.state, {4: dict(d=Order(4.0, 4))})
+
+    def test_index_emptied(self) -> None:
+        def build() -> Book:
+            return Book(orders=dict(a=Order(1.0, 1), b=Order(2.0, 2)),
+                        fills=[Order(1.0, 1), Order(2.0, 2)])
+
+        def clear(x: Book) -> None:
+            x.orders.clear()
+            x.fills.clear()
+
+        def reassign(x: Book) -> None:
+            x.orders = {}
+            x.fills = []
+
+        empties: typing.List[typing.Callable[[protocols.Model[Book]], None]] = [
+            lambda model: model.update_state(clear),
+            lambda model: model.update_state(reassign),
+            lambda model: model.restore(Book()),
+        ]
+        for empty in empties:
+            model = state.build_model(build())
+            orders = model.index(lambda x: x.orders, lambda order: order.qty)
+            fills = model.index(lambda x: x.fills, lambda fill: fill.qty)
+            self.assertEqual(set(orders.state), {1, 2})
+            self.assertEqual(set(fills.state), {1, 2})
+            empty(model)
+            self.assertEqual(orders.state, {})
+            self.assertEqual(fills.state, {})
+
+    def test_observe_properties(self) -> None:
+        model = Model(State(value=1, lst=[1]))
+        mock = MagicMock()
+        token = model.observe_properties([lambda x: x.value, lambda x: x.lst], mock)
+        mock.assert_called_once_with((1, [1]))
+        mock.reset_mock()
+
+        def update(x: State) -> None:
+            x.value = 2
+            x.lst.append(2)
+
+        model.update_state(update)
+        mock.assert_called_once_with((2, [1, 2]))
+        mock.reset_mock()
+
+        # unrelated sibling
+        model.update_state(lambda x: x.d.update(key="value"))
+        mock.assert_not_called()
+
+        # emitted, but not actually changed
+        model.restore(model.snapshot())
+        mock.assert_not_called()
+
+        token.disconnect()
+        model.update_properties(value=3)
+        mock.assert_not_called()
+
+    def test_reentrant_updates(self) -> None:
+        for queue_updates, expected in [
+            (False, [("value", 1), ("value", 2), ("lst", [1])]),
+            (True, [("value", 1), ("lst", [1]), ("value", 2)]),
+        ]:
+            model = state.build_model(State(), queue_updates=queue_updates)
+            seen: typing.List[typing.Tuple[str, typing.Any]] = []
+            model.observe_property(lambda x: x.value, lambda v: seen.append(("value", v)))
+            model.observe_property(lambda x: x.lst, lambda v: seen.append(("lst", v)))
+            seen.clear()
+
+            def on_value(value: int) -> None:
+                if value == 1:
+                    model.update_properties(value=2)
+
+            model.observe_property(lambda x: x.value, on_value)
+            model.update_properties(value=1, lst=[1])
+            self.assertEqual(seen, expected)
+            self.assertEqual(model.state.value, 2)
+
+    def test_cascade_limit(self) -> None:
+        model = state.build_model(State(), queue_updates=True, max_cascade=10)
+        model.observe_property(
+            lambda x: x.value, lambda v: model.update_properties(value=v + 1)
+        )
+        self.assertRaisesRegex(
+            RuntimeError, "cascading", lambda: model.update_properties(value=1)
+        )
+        self.assertEqual(model.state.value, 11)
+
+    def test_weak_observer(self) -> None:
+        calls: typing.List[int] = []
+
+        class Widget:
+            def update(self, value: int) -> None:
+                calls.append(value)
+
+        model = state.build_model(State())
+        event = model.wait_for_property(lambda x: x.value)
+        widget = Widget()
+        model.observe_property(lambda x: x.value, widget.update, weak=True)
+        model.submodel(lambda x: x.value).observe(widget.update, weak=True)
+        model.update_properties(value=1)
+        self.assertEqual(calls, [0, 0, 1, 1])
+        self.assertEqual(event._handler_count(), 2)
+
+        del widget
+        gc.collect()
+        self.assertEqual(event._handler_count(), 0)
+        model.update_properties(value=2)
+        self.assertEqual(calls, [0, 0, 1, 1])
+
     # TODO: figure out how to do this
     """
     def test_update_context(self) -> None:
@@ -1,7 +1,16 @@
 import unittest
 import typing
 
-from soso.state.util import GetAttr, GetItem, Proxy, SetAttr, SetItem, _get_ops
+from soso.state.util import (
+    DelAttr,
+    DelItem,
+    GetAttr,
+    GetItem,
+    Proxy,
+    SetAttr,
+    SetItem,
+    _get_ops,
+)
 
 
 class ProxyMethods:
@@ -62,6 +71,16 @@ class TestProxy(unittest.TestCase):
         path = _get_ops(proxy)
         self.assertEqual(path, [GetAttr("nested"), GetAttr("value"), GetItem(1)])
 
+    def test_delete(self) -> None:
+        proxy = Proxy()
+        del proxy.nested.value["key"]
+        del proxy.other
+
+        path = _get_ops(proxy)
+        self.assertEqual(
+            path, [GetAttr("nested"), GetAttr("value"), DelItem("key"), DelAttr("other")]
+        )
+
     def test_access(self) -> None:
         proxy = Proxy()
         proxy.nested.value
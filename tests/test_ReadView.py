@@ -0,0 +1,180 @@
+import copy
+import gc
+import threading
+import typing
+import unittest
+from dataclasses import asdict, dataclass, field, is_dataclass
+
+from soso import state
+from soso.state.views import _unwrap
+
+
+@dataclass
+class Position:
+    qty: int = 0
+    price: float = 0.0
+
+
+@dataclass
+class State:
+    value: int = 0
+    positions: typing.Dict[str, Position] = field(default_factory=dict)
+    other: typing.Dict[str, Position] = field(default_factory=dict)
+    lst: typing.List[int] = field(default_factory=list)
+
+
+class TestReadView(unittest.TestCase):
+    def setUp(self) -> None:
+        self.model = state.build_model(State())
+        self.model.update_state(
+            lambda x: x.positions.update({"a": Position(1, 10.0), "b": Position(2, 20.0)})
+        )
+        self.model.update_properties(other={"c": Position(3, 30.0)})
+
+    def set_qty(self, key: str, qty: int) -> None:
+        def update(x: State) -> None:
+            x.positions[key].qty = qty
+
+        self.model.update_state(update)
+
+    def test_consistent(self) -> None:
+        view = self.model.read_view()
+        self.set_qty("a", 100)
+        self.model.update_properties(value=42)
+        self.model.update_state(lambda x: x.lst.append(1))
+
+        self.assertEqual(view.state.positions["a"].qty, 1)
+        self.assertEqual(view.state.value, 0)
+        self.assertEqual(view.state.lst, [])
+        self.assertEqual(self.model.state.positions["a"].qty, 100)
+        self.assertEqual(self.model.state.value, 42)
+        self.assertEqual(self.model.state.lst, [1])
+
+    def test_only_changed_path_is_copied(self) -> None:
+        view = self.model.read_view()
+        self.set_qty("a", 100)
+        self.set_qty("a", 200)
+        current = self.model.state
+        snapshot = _unwrap(view.state)
+        self.assertIsNot(current, snapshot)
+        self.assertIsNot(current.positions, snapshot.positions)
+        self.assertIsNot(current.positions["a"], snapshot.positions["a"])
+        self.assertIs(current.positions["b"], snapshot.positions["b"])
+        self.assertIs(current.other, snapshot.other)
+
+        # The second update wrote to the copies
+        position = current.positions["a"]
+        self.set_qty("a", 300)
+        self.assertIs(self.model.state.positions["a"], position)
+
+    def test_read_only(self) -> None:
+        self.model.update_state(lambda x: x.lst.append(1))
+        view = self.model.read_view()
+        snapshot = view.state
+        with self.assertRaises(AttributeError):
+            snapshot.value = 1
+        with self.assertRaises(AttributeError):
+            snapshot.positions["a"].qty = 1
+        with self.assertRaises(TypeError):
+            snapshot.positions["c"] = Position()
+        with self.assertRaises(AttributeError):
+            snapshot.lst.append(2)
+        with self.assertRaises(TypeError):
+            snapshot.lst[0] = 2
+        # Reads work as usual
+        self.assertEqual(snapshot.positions["a"], Position(1, 10.0))
+        self.assertEqual(dict(snapshot.positions), {"a": Position(1, 10.0), "b": Position(2, 20.0)})
+        self.assertEqual(snapshot.lst, [1])
+        self.assertEqual(list(snapshot.lst), [1])
+        self.assertEqual(_unwrap(snapshot).lst, [1])
+
+    def test_proxy(self) -> None:
+        view = self.model.read_view()
+        # The state is a proxy rather than the model's objects
+        self.assertIsInstance(view.state, state.ReadOnly)
+        self.assertNotIsInstance(view.state, State)
+        self.assertFalse(is_dataclass(view.state))
+        self.assertIsInstance(view.state.positions["a"], state.ReadOnly)
+        # A deep copy is the actual, writable, value
+        copied = typing.cast(State, copy.deepcopy(view.state))
+        self.assertIsInstance(copied, State)
+        self.assertEqual(asdict(copied), asdict(self.model.state))
+        copied.positions["a"].qty = 100
+        self.assertEqual(view.state.positions["a"].qty, 1)
+        positions = copy.deepcopy(view.state.positions)
+        self.assertEqual(type(positions), dict)
+
+    def test_multiple_views(self) -> None:
+        view1 = self.model.read_view()
+        self.set_qty("a", 100)
+        view2 = self.model.read_view()
+        self.set_qty("a", 200)
+        self.assertEqual(view1.state.positions["a"].qty, 1)
+        self.assertEqual(view2.state.positions["a"].qty, 100)
+        self.assertEqual(self.model.state.positions["a"].qty, 200)
+
+    def test_released(self) -> None:
+        with self.model.read_view() as snapshot:
+            self.set_qty("a", 100)
+            self.assertEqual(snapshot.positions["a"].qty, 1)
+
+        # No views, updates are in place
+        current = self.model.state
+        self.set_qty("a", 200)
+        self.assertIs(self.model.state, current)
+
+        view = self.model.read_view()
+        del view
+        gc.collect()
+        self.set_qty("a", 300)
+        self.assertIs(self.model.state, current)
+
+    def test_observers(self) -> None:
+        values: typing.List[int] = []
+        self.model.observe_property(lambda x: x.positions["a"].qty, values.append)
+        view = self.model.read_view()
+        self.set_qty("a", 100)
+        self.assertEqual(values, [1, 100])
+        self.assertEqual(view.state.positions["a"].qty, 1)
+
+    def test_submodel(self) -> None:
+        submodel = self.model.submodel(lambda x: x.positions)
+        view = submodel.read_view()
+        self.set_qty("a", 100)
+        self.assertEqual(view.state["a"].qty, 1)
+        view.release()
+        current = self.model.state
+        self.set_qty("a", 200)
+        self.assertIs(self.model.state, current)
+
+    def test_concurrent_readers(self) -> None:
+        model = state.build_model(State(), thread_safe=True)
+        model.update_state(
+            lambda x: x.positions.update({"a": Position(0, 0.0), "b": Position(0, 0.0)})
+        )
+        done = threading.Event()
+        errors: typing.List[str] = []
+
+        def reader() -> None:
+            while not done.is_set():
+                with model.read_view() as snapshot:
+                    a, b = snapshot.positions["a"].qty, snapshot.positions["b"].qty
+                    if a != b:
+                        errors.append(f"{a} != {b}")
+
+        def update(i: int) -> typing.Callable[[State], None]:
+            def update(x: State) -> None:
+                x.positions["a"].qty = i
+                x.positions["b"].qty = i
+
+            return update
+
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        for t in readers:
+            t.start()
+        for i in range(1, 2000):
+            model.update_state(update(i))
+        done.set()
+        for t in readers:
+            t.join()
+        self.assertEqual(errors, [])
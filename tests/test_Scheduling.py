@@ -0,0 +1,169 @@
+import asyncio
+import concurrent.futures
+import gc
+import threading
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+from soso import state
+from soso.state import scheduling
+
+
+@dataclass
+class State:
+    value: int = 0
+    other: int = 0
+    d: typing.Dict[str, int] = field(default_factory=dict)
+
+
+class FakeWidget:
+    def __init__(self) -> None:
+        self.idle: typing.List[typing.Callable[[], None]] = []
+
+    def after_idle(self, func: typing.Callable[[], None]) -> None:
+        self.idle.append(func)
+
+    def run_idle(self) -> None:
+        idle, self.idle = self.idle, []
+        for func in idle:
+            func()
+
+
+class TestScheduling(unittest.TestCase):
+    def setUp(self) -> None:
+        self.widget = FakeWidget()
+        self.scheduler = scheduling.TkScheduler(self.widget)
+        self.model = state.build_model(State(), scheduler=self.scheduler)
+
+    def test_synchronous(self) -> None:
+        model = state.build_model(State(), scheduler=scheduling.Synchronous())
+        values: typing.List[int] = []
+        model.observe_property(lambda x: x.value, values.append)
+        model.update_properties(value=1)
+        model.update_properties(value=2)
+        self.assertEqual(values, [0, 1, 2])
+
+    def test_conflate(self) -> None:
+        values: typing.List[int] = []
+        others: typing.List[int] = []
+        self.model.observe_property(lambda x: x.value, values.append)
+        self.model.observe_property(lambda x: x.other, others.append)
+        # initial call is synchronous
+        self.assertEqual(values, [0])
+
+        self.model.update_properties(value=1)
+        self.model.update_properties(value=2, other=1)
+        self.model.update_properties(value=3)
+        self.assertEqual(values, [0])
+        self.assertEqual(len(self.widget.idle), 1)
+
+        self.widget.run_idle()
+        self.assertEqual(values, [0, 3])
+        self.assertEqual(others, [0, 1])
+
+        self.model.update_properties(value=4)
+        self.widget.run_idle()
+        self.assertEqual(values, [0, 3, 4])
+
+    def test_observe_property_changes(self) -> None:
+        changes: typing.List[typing.Tuple[typing.Optional[int], int]] = []
+        self.model.observe_property_changes(
+            lambda x: x.value, lambda prev, new: changes.append((prev, new))
+        )
+        self.model.update_properties(value=1)
+        self.model.update_properties(value=2)
+        self.widget.run_idle()
+        self.model.update_properties(value=2)
+        self.widget.run_idle()
+        self.assertEqual(changes, [(None, 0), (0, 2)])
+
+    def test_observe_pattern(self) -> None:
+        seen: typing.List[typing.Tuple[str, int]] = []
+        self.model.observe_pattern(
+            lambda x: x.d[state.ANY], lambda key, value: seen.append((key, value))
+        )
+        self.model.update_state(lambda x: x.d.update({"a": 1, "b": 1}))
+        self.model.update_state(lambda x: x.d.update({"a": 2}))
+        self.widget.run_idle()
+        self.assertEqual(sorted(seen), [("a", 2), ("b", 1)])
+
+    def test_submodel(self) -> None:
+        values: typing.List[int] = []
+        submodel = self.model.submodel(lambda x: x.d)
+        submodel.observe_property(lambda x: x["a"], values.append)
+        for i in [1, 2]:
+            submodel.update_state(lambda x: x.__setitem__("a", i))
+        self.widget.run_idle()
+        self.assertEqual(values, [2])
+
+    def test_wrap(self) -> None:
+        model = state.build_model(State())
+        values: typing.List[int] = []
+        model.observe_property(lambda x: x.value, self.scheduler.wrap(values.append))
+        model.update_properties(value=1)
+        model.update_properties(value=2)
+        self.assertEqual(values, [])
+        self.widget.run_idle()
+        self.assertEqual(values, [2])
+
+    def test_exception(self) -> None:
+        values: typing.List[int] = []
+
+        def fail(value: int) -> None:
+            raise RuntimeError()
+
+        self.model.observe_property(lambda x: x.other, fail)
+        self.model.observe_property(lambda x: x.value, values.append)
+        self.model.update_properties(value=1, other=1)
+        self.widget.run_idle()
+        self.assertEqual(values, [0, 1])
+
+    def test_executor(self) -> None:
+        threads: typing.List[threading.Thread] = []
+        done = threading.Event()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            model = state.build_model(
+                State(), scheduler=scheduling.ExecutorScheduler(executor)
+            )
+
+            def on_value(value: int) -> None:
+                threads.append(threading.current_thread())
+                if value == 1:
+                    done.set()
+
+            model.observe_property(lambda x: x.value, on_value)
+            model.update_properties(value=1)
+            self.assertTrue(done.wait(5))
+        self.assertIs(threads[0], threading.current_thread())
+        self.assertIsNot(threads[1], threading.current_thread())
+
+    def test_weak(self) -> None:
+        values: typing.List[int] = []
+
+        class Widget:
+            def update(self, value: int) -> None:
+                values.append(value)
+
+        widget = Widget()
+        self.model.observe_property(lambda x: x.value, widget.update, weak=True)
+        self.model.update_properties(value=1)
+        self.widget.run_idle()
+        del widget
+        gc.collect()
+        self.model.update_properties(value=2)
+        self.widget.run_idle()
+        self.assertEqual(values, [0, 1])
+        self.assertEqual(self.model.wait_for_property(lambda x: x.value)._handler_count(), 0)
+
+
+class TestAsyncioScheduling(unittest.IsolatedAsyncioTestCase):
+    async def test_asyncio(self) -> None:
+        model = state.build_model(State(), scheduler=scheduling.AsyncioScheduler())
+        values: typing.List[int] = []
+        model.observe_property(lambda x: x.value, values.append)
+        for i in range(1, 10):
+            model.update_properties(value=i)
+        self.assertEqual(values, [0])
+        await asyncio.sleep(0)
+        self.assertEqual(values, [0, 9])
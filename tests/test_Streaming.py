@@ -0,0 +1,93 @@
+import math
+import random
+import statistics
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+from soso import state
+from soso.state import streaming
+
+NaN = float("nan")
+
+
+@dataclass
+class State:
+    sensor_value: float = NaN
+    period_10_range: typing.Tuple[float, float] = field(default_factory=lambda: (NaN, NaN))
+
+
+class TestStreaming(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event: state.Event[float] = state.Event("Source")
+        self.stream = streaming.Stream(self.event)
+        random.seed(42)
+        self.values = [random.uniform(-100, 100) for _ in range(1000)]
+
+    def collect(self, stream: streaming.Stream[typing.Any]) -> typing.List[typing.Any]:
+        result: typing.List[typing.Any] = []
+        stream.connect(result.append)
+        return result
+
+    def emit_all(self) -> None:
+        for value in self.values:
+            self.event.emit(value)
+
+    def test_operators(self) -> None:
+        mapped = self.collect(self.stream.map(lambda x: x * 2))
+        filtered = self.collect(self.stream.filter(lambda x: x > 0))
+        scanned = self.collect(self.stream.scan(lambda acc, x: acc + 1, 0))
+        windows = self.collect(self.stream.window(3))
+        self.emit_all()
+
+        self.assertEqual(mapped, [x * 2 for x in self.values])
+        self.assertEqual(filtered, [x for x in self.values if x > 0])
+        self.assertEqual(scanned, list(range(1, len(self.values) + 1)))
+        self.assertEqual(
+            windows, [tuple(self.values[i - 3:i]) for i in range(3, len(self.values) + 1)]
+        )
+
+    def test_rolling(self) -> None:
+        n = 10
+        results: typing.Dict[
+            typing.Callable[[typing.List[float]], float], typing.List[float]
+        ] = {
+            min: self.collect(self.stream.rolling_min(n)),
+            max: self.collect(self.stream.rolling_max(n)),
+            math.fsum: self.collect(self.stream.rolling_sum(n)),
+            statistics.mean: self.collect(self.stream.rolling_mean(n)),
+            statistics.stdev: self.collect(self.stream.rolling_std(n)),
+            statistics.pstdev: self.collect(self.stream.rolling_std(n, ddof=0)),
+        }
+        self.emit_all()
+
+        windows = [self.values[i - n:i] for i in range(n, len(self.values) + 1)]
+        for func, result in results.items():
+            expected = [func(window) for window in windows]
+            self.assertEqual(len(result), len(expected))
+            for actual, exact in zip(result, expected):
+                self.assertAlmostEqual(actual, exact, places=9)
+
+    def test_zip_and_bind(self) -> None:
+        model = state.build_model(State())
+        source = streaming.from_model(model, lambda x: x.sensor_value)
+        source.rolling_min(10).zip(source.rolling_max(10)).bind(
+            model.submodel(lambda x: x.period_10_range)
+        )
+        for value in self.values[:9]:
+            model.update_properties(sensor_value=value)
+        self.assertTrue(math.isnan(model.state.period_10_range[0]))
+        for value in self.values[9:]:
+            model.update_properties(sensor_value=value)
+        window = self.values[-10:]
+        self.assertEqual(model.state.period_10_range, (min(window), max(window)))
+
+    def test_close(self) -> None:
+        mean = self.stream.map(lambda x: x * 2).rolling_mean(10)
+        other = self.stream.map(lambda x: x)
+        self.assertEqual(self.event._handler_count(), 2)
+        mean.close()
+        # The map stage is closed too as it has no other subscribers
+        self.assertEqual(self.event._handler_count(), 1)
+        other.close()
+        self.assertEqual(self.event._handler_count(), 0)
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import typing
+import unittest
+from dataclasses import dataclass, field
+
+from soso import state
+
+NUM_THREADS = 8
+NUM_UPDATES = 500
+
+
+@dataclass
+class State:
+    value: int = 0
+    d: typing.Dict[int, int] = field(default_factory=dict)
+
+
+def incrementer(model: state.protocols.Model[State]) -> typing.Callable[[State], None]:
+    # The update function receives a proxy, read the current value from the
+    # model while holding its lock
+    def increment(x: State) -> None:
+        x.value = model.state.value + 1
+
+    return increment
+
+
+def run_threads(target: typing.Callable[[int], None]) -> None:
+    threads = [threading.Thread(target=target, args=(i,)) for i in range(NUM_THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+class TestThreadSafe(unittest.TestCase):
+    def test_updates_are_serialized(self) -> None:
+        model = state.build_model(State(), thread_safe=True)
+        increment = incrementer(model)
+        values: typing.List[int] = []
+        model.observe_property(lambda x: x.value, values.append)
+
+        def writer(i: int) -> None:
+            for _ in range(NUM_UPDATES):
+                model.update_state(increment)
+
+        run_threads(writer)
+        total = NUM_THREADS * NUM_UPDATES
+        self.assertEqual(model.state.value, total)
+        self.assertEqual(values, list(range(total + 1)))
+
+    def test_subscriptions(self) -> None:
+        model = state.build_model(State(), thread_safe=True)
+        counts = [0] * NUM_THREADS
+
+        def worker(i: int) -> None:
+            def on_value(value: int) -> None:
+                counts[i] += 1
+
+            for j in range(NUM_UPDATES):
+                token = model.observe_property(lambda x: x.d[j % 10], on_value)
+                model.update_state(lambda x: x.d.__setitem__(j % 10, i))
+                token.disconnect()
+
+        run_threads(worker)
+        self.assertEqual(len(model.state.d), 10)
+        self.assertTrue(all(count >= NUM_UPDATES for count in counts))
+
+
+class TestOwnerLoop(unittest.IsolatedAsyncioTestCase):
+    async def test_marshalled_to_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        model = state.build_model(State(), owner_loop=loop)
+        increment = incrementer(model)
+        threads: typing.Set[threading.Thread] = set()
+        model.observe_property(lambda x: x.value, lambda _: threads.add(threading.current_thread()))
+
+        def writer(i: int) -> None:
+            for _ in range(NUM_UPDATES):
+                model.update_state(increment)
+
+        # The loop is blocked so nothing is applied until it runs again
+        run_threads(writer)
+        self.assertEqual(model.state.value, 0)
+        await asyncio.sleep(0)
+        self.assertEqual(model.state.value, NUM_THREADS * NUM_UPDATES)
+        self.assertEqual(threads, {threading.current_thread()})
+
+        # Updates on the loop are applied immediately
+        model.update_state(increment)
+        self.assertEqual(model.state.value, NUM_THREADS * NUM_UPDATES + 1)
@@ -2,6 +2,8 @@
 
 from dataclasses import dataclass
 
+import pytest
+
 from soso import state
 
 
@@ -48,3 +50,176 @@ def test_fancy(benchmark):
         model.update_state(update)
 
     assert emitted
+
+
+def test_threaded(benchmark):
+    import threading
+
+    @dataclass
+    class State:
+        value: int = 0
+
+    num_threads = 4
+    model = state.build_model(State(), thread_safe=True)
+    emitted = []
+    model.observe_property(lambda x: x.value, emitted.append)
+
+    def increment(state):
+        state.value = model.state.value + 1
+
+    def writer():
+        for _ in range(250):
+            model.update_state(increment)
+
+    @benchmark
+    def doit():
+        threads = [threading.Thread(target=writer) for _ in range(num_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert model.state.value == len(emitted) - 1
+
+
+def test_await_many(benchmark):
+    import asyncio
+
+    event = state.Event("Event")
+    loop = asyncio.new_event_loop()
+
+    async def wait():
+        return await event
+
+    async def run():
+        tasks = [loop.create_task(wait()) for _ in range(1000)]
+        await asyncio.sleep(0)
+        event.emit(42)
+        return await asyncio.gather(*tasks)
+
+    try:
+        result = benchmark(lambda: loop.run_until_complete(run()))
+    finally:
+        loop.close()
+
+    assert result == [42] * 1000
+
+
+def test_connect_disconnect(benchmark):
+    event = state.Event("Event")
+    for _ in range(10000):
+        event.connect(lambda _: None)
+
+    @benchmark
+    def doit():
+        tokens = [event.connect(lambda _: None) for _ in range(1000)]
+        for token in tokens:
+            token.disconnect()
+
+    assert event._handler_count() == 10000
+
+
+def test_rolling_window(benchmark):
+    from soso.state import streaming
+
+    event = state.Event("Event")
+    source = streaming.Stream(event)
+    emitted = []
+    source.rolling_max(10000).zip(source.rolling_std(10000)).connect(emitted.append)
+    for i in range(10000):
+        event.emit(float(i % 100))
+
+    value = 0.0
+
+    @benchmark
+    def doit():
+        nonlocal value
+        value = (value + 37.0) % 101
+        event.emit(value)
+
+    assert emitted
+
+
+def test_column_append(benchmark):
+    from dataclasses import field
+
+    pytest.importorskip("numpy")
+
+    from soso.state.columns import Column
+
+    @dataclass
+    class State:
+        close: Column = field(default_factory=Column)
+
+    model = state.build_model(State(close=Column(range(100000))))
+    changes = []
+    model.observe_list_changes(lambda x: x.close, changes.append)
+
+    @benchmark
+    def doit():
+        model.update_state(lambda x: x.close.append(42.0))
+
+    assert changes[-1][0].inserted[0] == 42.0
+
+
+def _delta_state():
+    from dataclasses import field
+
+    @dataclass
+    class Item:
+        value: float = 0.0
+
+    @dataclass
+    class State:
+        values: list = field(default_factory=list)
+        items: dict = field(default_factory=dict)
+
+    return Item, State
+
+
+def test_delta_list(benchmark):
+    from soso.state.util import delta
+
+    _, State = _delta_state()
+    base = State(values=[float(i) for i in range(100000)])
+    # Equal but not identical values
+    new = State(values=[float(i) for i in range(100000)])
+    new.values[50000] = -1.0
+    new.values.append(1.0)
+
+    ops = benchmark(delta, base, new)
+    assert len(ops) == 5
+
+
+def test_delta_shared_dict(benchmark):
+    import copy
+
+    from soso.state.util import delta
+
+    Item, State = _delta_state()
+    base = State(items={i: Item(float(i)) for i in range(100000)})
+    # Copied on write, unchanged items are shared
+    new = State(items=copy.copy(base.items))
+    new.items[5] = Item(-1.0)
+    del new.items[6]
+    new.items[100000] = Item(0.0)
+
+    ops = benchmark(delta, base, new)
+    assert len(ops) == 7
+
+
+def test_delta_array(benchmark):
+    np = pytest.importorskip("numpy")
+
+    from soso.state.util import delta
+
+    @dataclass
+    class State:
+        values: np.ndarray = None
+
+    base = State(np.arange(100000.0))
+    new = State(base.values.copy())
+    new.values[[10, 50000]] = -1.0
+
+    ops = benchmark(delta, base, new)
+    assert len(ops) == 4